@@ -32,6 +32,8 @@ bl_info = {
 
 if "bpy" in locals():
     import importlib
+    if "bvh_motion" in locals():
+        importlib.reload(bvh_motion)
     if "import_bvh" in locals():
         importlib.reload(import_bvh)
     if "export_bvh" in locals():
@@ -44,6 +46,7 @@ from bpy.props import (
         IntProperty,
         BoolProperty,
         EnumProperty,
+        CollectionProperty,
         )
 from bpy_extras.io_utils import (
         ImportHelper,
@@ -140,6 +143,94 @@ class ImportBVH(bpy.types.Operator, ImportHelper, ImportBVHOrientationHelper):
         return import_bvh.load(context, report=self.report, **keywords)
 
 
+class ImportBVHBatch(bpy.types.Operator, ImportHelper, ImportBVHOrientationHelper):
+    """Load many BVH motion capture files as actions of one armature"""
+    bl_idname = "import_anim.bvh_batch"
+    bl_label = "Import BVH Batch"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = ".bvh"
+    filter_glob = StringProperty(default="*.bvh", options={'HIDDEN'})
+
+    files = CollectionProperty(
+            name="File Path",
+            type=bpy.types.OperatorFileListElement,
+            )
+    directory = StringProperty(
+            subtype='DIR_PATH',
+            )
+
+    global_scale = FloatProperty(
+            name="Scale",
+            description="Scale the BVH by this value",
+            min=0.0001, max=1000000.0,
+            soft_min=0.001, soft_max=100.0,
+            default=1.0,
+            )
+    frame_start = IntProperty(
+            name="Start Frame",
+            description="Starting frame for the animation",
+            default=1,
+            )
+    use_fps_scale = BoolProperty(
+            name="Scale FPS",
+            description=("Scale the framerate from the BVH to the current scenes, "
+                         "otherwise each BVH frame maps directly to a Blender frame"),
+            default=False,
+            )
+    use_cyclic = BoolProperty(
+            name="Loop",
+            description="Loop the animation playback",
+            default=False,
+            )
+    rotate_mode = EnumProperty(
+            name="Rotation",
+            description="Rotation conversion",
+            items=(('QUATERNION', "Quaternion",
+                    "Convert rotations to quaternions"),
+                   ('NATIVE', "Euler (Native)",
+                              "Use the rotation order defined in the BVH file"),
+                   ('XYZ', "Euler (XYZ)", "Convert rotations to euler XYZ"),
+                   ('XZY', "Euler (XZY)", "Convert rotations to euler XZY"),
+                   ('YXZ', "Euler (YXZ)", "Convert rotations to euler YXZ"),
+                   ('YZX', "Euler (YZX)", "Convert rotations to euler YZX"),
+                   ('ZXY', "Euler (ZXY)", "Convert rotations to euler ZXY"),
+                   ('ZYX', "Euler (ZYX)", "Convert rotations to euler ZYX"),
+                   ),
+            default='NATIVE',
+            )
+    workers = IntProperty(
+            name="Workers",
+            description="Number of worker processes parsing the files (0 for one per CPU)",
+            min=0, max=256,
+            default=0,
+            )
+
+    def execute(self, context):
+        import os
+
+        keywords = self.as_keywords(ignore=("axis_forward",
+                                            "axis_up",
+                                            "filter_glob",
+                                            "filepath",
+                                            "files",
+                                            "directory",
+                                            ))
+
+        global_matrix = axis_conversion(from_forward=self.axis_forward,
+                                        from_up=self.axis_up,
+                                        ).to_4x4()
+
+        keywords["global_matrix"] = global_matrix
+
+        filepaths = [os.path.join(self.directory, f.name) for f in self.files if f.name]
+        if not filepaths:
+            filepaths = [self.filepath]
+
+        from . import import_bvh
+        return import_bvh.load_batch(context, filepaths, report=self.report, **keywords)
+
+
 class ExportBVH(bpy.types.Operator, ExportHelper):
     """Save a BVH motion capture file from an armature"""
     bl_idname = "export_anim.bvh"
@@ -212,6 +303,7 @@ class ExportBVH(bpy.types.Operator, ExportHelper):
 
 def menu_func_import(self, context):
     self.layout.operator(ImportBVH.bl_idname, text="Motion Capture (.bvh)")
+    self.layout.operator(ImportBVHBatch.bl_idname, text="Motion Capture Batch (.bvh)")
 
 
 def menu_func_export(self, context):
@@ -0,0 +1,114 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Reading of BVH files which doesn't depend on Blender modules,
+# so it can also run as a worker process of the batch importer:
+#
+#   python bvh_motion.py input.bvh output_base
+#
+# writes output_base.txt (hierarchy) and output_base.npy (float32 motion).
+
+import re
+
+import numpy
+
+
+def split_motion(text):
+    """
+    Split the BVH text in the hierarchy part (including the MOTION header)
+    and the text of the motion data, which is converted in bulk.
+    """
+    motion = re.search(r'^[ \t]*motion[ \t]*$', text, re.IGNORECASE | re.MULTILINE)
+    if motion is None:
+        return text, ""
+
+    # 'Frames:' and 'Frame Time:' are the next two non empty lines.
+    pos = motion.end()
+    header_lines = 0
+    while header_lines < 2 and pos < len(text):
+        end = text.find('\n', pos + 1)
+        if end == -1:
+            end = len(text)
+        if text[pos:end].strip():
+            header_lines += 1
+        pos = end
+
+    return text[:pos], text[pos:]
+
+
+def reshape_motion(values, channel_count):
+    """
+    Reshape flat motion values to a frames x channels array.
+    read_bvh_motion only returns complete frames, this is used when the
+    declared channel counts don't match the channels the hierarchy lists,
+    then an incomplete last frame is dropped.
+    """
+    if not channel_count:
+        return values[:0].reshape(0, 0)
+    frame_count = len(values) // channel_count
+    return values[:frame_count * channel_count].reshape(frame_count, channel_count)
+
+
+def read_bvh_motion(file_path, dtype=numpy.float64):
+    """
+    Read a BVH file, returns the hierarchy text (including the MOTION header)
+    and the motion data as a frames x channels array.
+
+    Raises ValueError when the motion data isn't frames x channels numbers.
+    """
+    # newline=None: universal newlines
+    with open(file_path, 'r', newline=None) as file:
+        text = file.read()
+
+    # Non standard carrage returns?
+    if '\n' not in text:
+        text = text.replace('\r', '\n')
+
+    # Only the hierarchy is parsed line by line, motion data is converted in one go.
+    text, motion_text = split_motion(text)
+
+    channel_count = sum(int(count) for count in re.findall(r'\bchannels\s+(\d+)', text, re.IGNORECASE))
+    frames = re.search(r'^\s*frames\s*:\s*(\d+)', text, re.IGNORECASE | re.MULTILINE)
+    frame_count = int(frames.group(1)) if frames else 0
+
+    # Raises ValueError on tokens which aren't numbers,
+    # parsed straight to floats without a list of strings in between.
+    values = numpy.fromstring(motion_text, dtype=dtype, sep=' ')
+    del motion_text
+
+    if len(values) != frame_count * channel_count:
+        raise ValueError("BVH motion has %d values, expected %d frames x %d channels"
+                         % (len(values), frame_count, channel_count))
+
+    return text, values.reshape(frame_count, channel_count)
+
+
+def main(argv):
+    file_path, output_base = argv
+    text, motion = read_bvh_motion(file_path, dtype=numpy.float32)
+
+    with open(output_base + ".txt", 'w') as file:
+        file.write(text)
+    numpy.save(output_base + ".npy", motion)
+
+
+if __name__ == "__main__":
+    import sys
+    main(sys.argv[1:])
@@ -20,10 +20,14 @@
 
 # Script copyright (C) Campbell Barton
 
-from math import radians, ceil
+from math import ceil, floor, pi
 
 import bpy
-from mathutils import Vector, Euler, Matrix
+from mathutils import Vector, Matrix
+
+import numpy
+
+from .bvh_motion import read_bvh_motion, reshape_motion
 
 
 class BVH_Node:
@@ -38,7 +42,7 @@ class BVH_Node:
         'channels',  # list of 6 ints, -1 for an unused channel, otherwise an index for the BVH motion data lines, loc triple then rot triple
         'rot_order',  # a triple of indices as to the order rotation is applied. [0,1,2] is x/y/z - [None, None, None] if no rotation.
         'rot_order_str',  # same as above but a string 'XYZ' format.
-        'anim_data',  # a list one tuple's one for each frame. (locx, locy, locz, rotx, roty, rotz), euler rotation ALWAYS stored xyz order, even when native used.
+        'anim_data',  # a (frames + 1) x 6 array, one row for each frame: (locx, locy, locz, rotx, roty, rotz), euler rotation ALWAYS stored xyz order, even when native used. Row 0 is the zero rest pose.
         'has_loc',  # Convenience function, bool, same as (channels[0]!=-1 or channels[1]!=-1 or channels[2]!=-1)
         'has_rot',  # Convenience function, bool, same as (channels[3]!=-1 or channels[4]!=-1 or channels[5]!=-1)
         'index',  # index from the file, not strictly needed but nice to maintain order
@@ -73,10 +77,11 @@ class BVH_Node:
 
         self.children = []
 
-        # list of 6 length tuples: (lx,ly,lz, rx,ry,rz)
+        # array of 6 length rows: (lx,ly,lz, rx,ry,rz)
         # even if the channels aren't used they will just be zero
+        # filled by read_bvh once the motion data is known
         #
-        self.anim_data = [(0, 0, 0, 0, 0, 0)]
+        self.anim_data = numpy.zeros((1, 6))
 
     def __repr__(self):
         return ("BVH name: '%s', rest_loc:(%.3f,%.3f,%.3f), rest_tail:(%.3f,%.3f,%.3f)" %
@@ -92,18 +97,21 @@ def sorted_nodes(bvh_nodes):
 
 
 def read_bvh(context, file_path, rotate_mode='XYZ', global_scale=1.0):
-    # File loading stuff
-    # Open the file for importing
-    file = open(file_path, 'rU')
+    text, motion = read_bvh_motion(file_path)
+    return read_bvh_data(text, motion, global_scale=global_scale)
 
+
+def read_bvh_data(text, motion, global_scale=1.0):
+    """
+    Create the BVH nodes from the hierarchy text and
+    the frames x channels motion array, see bvh_motion.read_bvh_motion
+    """
     # Seperate into a list of lists, each line a list of words.
-    file_lines = file.readlines()
-    # Non standard carrage returns?
-    if len(file_lines) == 1:
-        file_lines = file_lines[0].split('\r')
+    file_lines = text.split('\n')
 
     # Split by whitespace.
     file_lines = [ll for ll in [l.split() for l in file_lines] if ll]
+    del text
 
     # Create hierarchy as empties
     if file_lines[0][0].lower() == 'hierarchy':
@@ -234,31 +242,23 @@ def read_bvh(context, file_path, rotate_mode='XYZ', global_scale=1.0):
     # second life expects it, which isn't to spec.
     bvh_nodes_list = sorted_nodes(bvh_nodes)
 
-    while lineIdx < len(file_lines):
-        line = file_lines[lineIdx]
-        for bvh_node in bvh_nodes_list:
-            #for bvh_node in bvh_nodes_serial:
-            lx = ly = lz = rx = ry = rz = 0.0
-            channels = bvh_node.channels
-            anim_data = bvh_node.anim_data
-            if channels[0] != -1:
-                lx = global_scale * float(line[channels[0]])
-
-            if channels[1] != -1:
-                ly = global_scale * float(line[channels[1]])
-
-            if channels[2] != -1:
-                lz = global_scale * float(line[channels[2]])
-
-            if channels[3] != -1 or channels[4] != -1 or channels[5] != -1:
+    # Motion data as a frames x channels array.
+    channel_count = channelIndex + 1
+    if motion.shape[1:] != (channel_count,):
+        # declared channel counts don't match the listed channels
+        motion = reshape_motion(motion.ravel(), channel_count)
 
-                rx = radians(float(line[channels[3]]))
-                ry = radians(float(line[channels[4]]))
-                rz = radians(float(line[channels[5]]))
+    for bvh_node in bvh_nodes_list:
+        channels = bvh_node.channels
+        anim_data = bvh_node.anim_data = numpy.zeros((len(motion) + 1, 6))
+        for i in range(3):
+            if channels[i] != -1:
+                anim_data[1:, i] = motion[:, channels[i]] * global_scale
 
-            # Done importing motion data #
-            anim_data.append((lx, ly, lz, rx, ry, rz))
-        lineIdx += 1
+        if bvh_node.has_rot:
+            # Note: a missing rotation channel reads the last channel of the frame.
+            anim_data[1:, 3:] = numpy.radians(motion[:, channels[3:]])
+    del motion
 
     # Assign children
     for bvh_node in bvh_nodes_list:
@@ -482,10 +482,48 @@ def bvh_node_dict2armature(context,
     context.scene.update()
 
     arm_ob.animation_data_create()
-    action = bpy.data.actions.new(name=bvh_name)
+    action = bvh_node_dict2action(context, arm_ob, bvh_name, bvh_nodes, bvh_frame_time,
+                                  rotate_mode=rotate_mode,
+                                  frame_start=frame_start,
+                                  IMPORT_LOOP=IMPORT_LOOP,
+                                  use_fps_scale=use_fps_scale,
+                                  )
     arm_ob.animation_data.action = action
 
-    # Replace the bvh_node.temp (currently an editbone)
+    # finally apply matrix (left to the caller when None)
+    if global_matrix is not None:
+        arm_ob.matrix_world = global_matrix
+        bpy.ops.object.transform_apply(rotation=True)
+
+    return arm_ob
+
+
+def bvh_node_dict2action(context,
+                         arm_ob,
+                         bvh_name,
+                         bvh_nodes,
+                         bvh_frame_time,
+                         rotate_mode='XYZ',
+                         frame_start=1,
+                         IMPORT_LOOP=False,
+                         use_fps_scale=False,
+                         ):
+    """
+    Create a new action animating the bones of arm_ob,
+    bvh_node.temp holds the name of the bone of each node (None to skip the node).
+    """
+    if frame_start < 1:
+        frame_start = 1
+
+    scene = context.scene
+    arm_data = arm_ob.data
+    pose_bones = arm_ob.pose.bones
+    action = bpy.data.actions.new(name=bvh_name)
+
+    # Nodes without a bone in the armature are not animated.
+    bvh_nodes_list = [bvh_node for bvh_node in sorted_nodes(bvh_nodes) if bvh_node.temp is not None]
+
+    # Replace the bvh_node.temp (currently the bone name)
     # With a tuple  (pose_bone, armature_bone, bone_rest_matrix, bone_rest_matrix_inv)
     num_frame = 0
     for bvh_node in bvh_nodes_list:
@@ -499,7 +537,7 @@ def bvh_node_dict2armature(context,
 
         bone_rest_matrix_inv.resize_4x4()
         bone_rest_matrix.resize_4x4()
-        bvh_node.temp = (pose_bone, bone, bone_rest_matrix, bone_rest_matrix_inv)
+        bvh_node.temp = (pose_bone, rest_bone, bone_rest_matrix, bone_rest_matrix_inv)
 
         if 0 == num_frame:
             num_frame = len(bvh_node.anim_data)
@@ -512,86 +550,52 @@ def bvh_node_dict2armature(context,
         num_frame = num_frame - skip_frame
 
     # Create a shared time axis for all animation curves.
-    time = [float(frame_start)] * num_frame
     if use_fps_scale:
         dt = scene.render.fps * bvh_frame_time
-        for frame_i in range(1, num_frame):
-            time[frame_i] += float(frame_i) * dt
     else:
-        for frame_i in range(1, num_frame):
-            time[frame_i] += float(frame_i)
+        dt = 1.0
+    time = float(frame_start) + numpy.arange(num_frame) * dt
 
     #print("bvh_frame_time = %f, dt = %f, num_frame = %d"
     #      % (bvh_frame_time, dt, num_frame]))
 
     for i, bvh_node in enumerate(bvh_nodes_list):
         pose_bone, bone, bone_rest_matrix, bone_rest_matrix_inv = bvh_node.temp
+        anim_data = bvh_node.anim_data[skip_frame:skip_frame + num_frame]
+        rest_matrix = numpy.array(bone_rest_matrix.to_3x3())
+        rest_matrix_inv = numpy.array(bone_rest_matrix_inv.to_3x3())
 
         if bvh_node.has_loc:
             # Not sure if there is a way to query this or access it in the
             # PoseBone structure.
             data_path = 'pose.bones["%s"].location' % pose_bone.name
 
-            location = [(0.0, 0.0, 0.0)] * num_frame
-            for frame_i in range(num_frame):
-                bvh_loc = bvh_node.anim_data[frame_i + skip_frame][:3]
-
-                bone_translate_matrix = Matrix.Translation(
-                        Vector(bvh_loc) - bvh_node.rest_head_local)
-                location[frame_i] = (bone_rest_matrix_inv *
-                                     bone_translate_matrix).to_translation()
+            location = ((anim_data[:, :3] - numpy.array(bvh_node.rest_head_local)) @
+                        rest_matrix_inv.T)
 
-            # For each location x, y, z.
-            for axis_i in range(3):
-                curve = action.fcurves.new(data_path=data_path, index=axis_i)
-                keyframe_points = curve.keyframe_points
-                keyframe_points.add(num_frame)
-
-                for frame_i in range(num_frame):
-                    keyframe_points[frame_i].co = \
-                            (time[frame_i], location[frame_i][axis_i])
+            _fcurves_from_array(action, data_path, time, location)
 
         if bvh_node.has_rot:
-            data_path = None
-            rotate = None
+            # apply rotation order and convert to XYZ
+            # note that the rot_order_str is reversed.
+            bone_rotation_matrix = _euler_to_matrix_array(
+                    anim_data[:, 3:], bvh_node.rot_order_str[::-1])
+            bone_rotation_matrix = (rest_matrix_inv @
+                                    bone_rotation_matrix @
+                                    rest_matrix)
 
             if 'QUATERNION' == rotate_mode:
-                rotate = [(1.0, 0.0, 0.0, 0.0)] * num_frame
+                rotate = _matrix_to_quaternion_array(bone_rotation_matrix)
                 data_path = ('pose.bones["%s"].rotation_quaternion'
                              % pose_bone.name)
             else:
-                rotate = [(0.0, 0.0, 0.0)] * num_frame
+                rotate = _matrix_to_euler_array(bone_rotation_matrix,
+                                                pose_bone.rotation_mode)
                 data_path = ('pose.bones["%s"].rotation_euler' %
                              pose_bone.name)
 
-            prev_euler = Euler((0.0, 0.0, 0.0))
-            for frame_i in range(num_frame):
-                bvh_rot = bvh_node.anim_data[frame_i + skip_frame][3:]
-
-                # apply rotation order and convert to XYZ
-                # note that the rot_order_str is reversed.
-                euler = Euler(bvh_rot, bvh_node.rot_order_str[::-1])
-                bone_rotation_matrix = euler.to_matrix().to_4x4()
-                bone_rotation_matrix = (bone_rest_matrix_inv *
-                                        bone_rotation_matrix *
-                                        bone_rest_matrix)
-
-                if 4 == len(rotate[frame_i]):
-                    rotate[frame_i] = bone_rotation_matrix.to_quaternion()
-                else:
-                    rotate[frame_i] = bone_rotation_matrix.to_euler(
-                            pose_bone.rotation_mode, prev_euler)
-                    prev_euler = rotate[frame_i]
-
             # For each Euler angle x, y, z (or Quaternion w, x, y, z).
-            for axis_i in range(len(rotate[0])):
-                curve = action.fcurves.new(data_path=data_path, index=axis_i)
-                keyframe_points = curve.keyframe_points
-                curve.keyframe_points.add(num_frame)
-
-                for frame_i in range(0, num_frame):
-                    keyframe_points[frame_i].co = \
-                            (time[frame_i], rotate[frame_i][axis_i])
+            _fcurves_from_array(action, data_path, time, rotate)
 
     for cu in action.fcurves:
         if IMPORT_LOOP:
@@ -600,11 +604,177 @@ def bvh_node_dict2armature(context,
         for bez in cu.keyframe_points:
             bez.interpolation = 'LINEAR'
 
-    # finally apply matrix
-    arm_ob.matrix_world = global_matrix
-    bpy.ops.object.transform_apply(rotation=True)
-
-    return arm_ob
+    return action
+
+
+def _fcurves_from_array(action, data_path, time, values):
+    """
+    Create an F-Curve for each column of values (frames x axes) and
+    write all its keyframes in one go.
+    """
+    num_frame = len(time)
+    co = numpy.empty((num_frame, 2), dtype=numpy.float32)
+    co[:, 0] = time
+
+    for axis_i in range(values.shape[1]):
+        curve = action.fcurves.new(data_path=data_path, index=axis_i)
+        keyframe_points = curve.keyframe_points
+        keyframe_points.add(num_frame)
+
+        co[:, 1] = values[:, axis_i]
+        keyframe_points.foreach_set("co", co.ravel())
+        curve.update()
+
+
+def _axis_rotation_array(angles, axis):
+    """
+    Rotation matrices (n x 3 x 3) around one axis (0, 1, 2) for an array of angles.
+    """
+    mat = numpy.zeros((len(angles), 3, 3))
+    c = numpy.cos(angles)
+    s = numpy.sin(angles)
+    i, j = (axis + 1) % 3, (axis + 2) % 3
+    mat[:, axis, axis] = 1.0
+    mat[:, i, i] = c
+    mat[:, j, j] = c
+    mat[:, j, i] = s
+    mat[:, i, j] = -s
+    return mat
+
+
+def _euler_to_matrix_array(eul, order):
+    """
+    Bulk version of Euler(eul, order).to_matrix(),
+    eul is a n x 3 array of (x, y, z) angles.
+    """
+    mat = None
+    for axis in ('XYZ'.index(a) for a in order):
+        rot = _axis_rotation_array(eul[:, axis], axis)
+        mat = rot if mat is None else rot @ mat
+    return mat
+
+
+def _compatible_euler(eul, prev):
+    """
+    Same as Euler.make_compatible(prev), on (x, y, z) lists.
+    """
+    pi_thresh = 5.1
+    pi_x2 = 2.0 * pi
+
+    # Correct differences of about 360 degrees first.
+    deul = [0.0, 0.0, 0.0]
+    for i in range(3):
+        deul[i] = eul[i] - prev[i]
+        if deul[i] > pi_thresh:
+            eul[i] -= floor((deul[i] / pi_x2) + 0.5) * pi_x2
+            deul[i] = eul[i] - prev[i]
+        elif deul[i] < -pi_thresh:
+            eul[i] += floor((-deul[i] / pi_x2) + 0.5) * pi_x2
+            deul[i] = eul[i] - prev[i]
+
+    # One of the axis rotations larger than 180 degrees and the others small.
+    for i, j, k in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+        if abs(deul[i]) > 3.2 and abs(deul[j]) < 1.6 and abs(deul[k]) < 1.6:
+            if deul[i] > 0.0:
+                eul[i] -= pi_x2
+            else:
+                eul[i] += pi_x2
+
+    return eul
+
+
+def _matrix_to_euler_array(mat, order):
+    """
+    Bulk version of Matrix.to_euler(order, prev_euler) for n x 3 x 3 rotation matrices,
+    where prev_euler is the result of the previous frame (zero for the first one).
+
+    Both euler solutions are computed for all frames at once,
+    choosing the one closest to the previous frame has to be done frame by frame.
+    """
+    i, j, k = ('XYZ'.index(a) for a in order)
+    parity = order not in {'XYZ', 'YZX', 'ZXY'}
+
+    cy = numpy.hypot(mat[:, i, i], mat[:, j, i])
+    regular = cy > 16.0 * numpy.finfo(numpy.float32).eps
+
+    eul1 = numpy.empty((len(mat), 3))
+    eul1[:, i] = numpy.where(regular,
+                             numpy.arctan2(mat[:, k, j], mat[:, k, k]),
+                             numpy.arctan2(-mat[:, j, k], mat[:, j, j]))
+    eul1[:, j] = numpy.arctan2(-mat[:, k, i], cy)
+    eul1[:, k] = numpy.where(regular, numpy.arctan2(mat[:, j, i], mat[:, i, i]), 0.0)
+
+    eul2 = eul1.copy()
+    eul2[regular, i] = numpy.arctan2(-mat[regular, k, j], -mat[regular, k, k])
+    eul2[regular, j] = numpy.arctan2(-mat[regular, k, i], -cy[regular])
+    eul2[regular, k] = numpy.arctan2(-mat[regular, j, i], -mat[regular, i, i])
+
+    if parity:
+        eul1 = -eul1
+        eul2 = -eul2
+
+    eul = eul1
+    prev = [0.0, 0.0, 0.0]
+    for frame_i, (e1, e2) in enumerate(zip(eul1.tolist(), eul2.tolist())):
+        e1 = _compatible_euler(e1, prev)
+        e2 = _compatible_euler(e2, prev)
+        d1 = sum(abs(a - b) for a, b in zip(e1, prev))
+        d2 = sum(abs(a - b) for a, b in zip(e2, prev))
+        prev = e2 if d1 > d2 else e1
+        eul[frame_i] = prev
+
+    return eul
+
+
+def _matrix_to_quaternion_array(mat):
+    """
+    Bulk version of Matrix.to_quaternion() for n x 3 x 3 rotation matrices,
+    returns a n x 4 array of (w, x, y, z).
+    """
+    quat = numpy.empty((len(mat), 4))
+    m = mat
+    tr = 0.25 * (1.0 + m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2])
+
+    # Same branches as Blender uses, to get the same signs.
+    use_tr = tr > 1e-4
+    use_x = ~use_tr & (m[:, 0, 0] > m[:, 1, 1]) & (m[:, 0, 0] > m[:, 2, 2])
+    use_y = ~use_tr & ~use_x & (m[:, 1, 1] > m[:, 2, 2])
+    use_z = ~use_tr & ~use_x & ~use_y
+
+    sel = use_tr
+    s = numpy.sqrt(tr[sel])
+    quat[sel, 0] = s
+    s = 1.0 / (4.0 * s)
+    quat[sel, 1] = (m[sel, 2, 1] - m[sel, 1, 2]) * s
+    quat[sel, 2] = (m[sel, 0, 2] - m[sel, 2, 0]) * s
+    quat[sel, 3] = (m[sel, 1, 0] - m[sel, 0, 1]) * s
+
+    sel = use_x
+    s = 2.0 * numpy.sqrt(1.0 + m[sel, 0, 0] - m[sel, 1, 1] - m[sel, 2, 2])
+    quat[sel, 1] = 0.25 * s
+    s = 1.0 / s
+    quat[sel, 0] = (m[sel, 2, 1] - m[sel, 1, 2]) * s
+    quat[sel, 2] = (m[sel, 0, 1] + m[sel, 1, 0]) * s
+    quat[sel, 3] = (m[sel, 0, 2] + m[sel, 2, 0]) * s
+
+    sel = use_y
+    s = 2.0 * numpy.sqrt(1.0 + m[sel, 1, 1] - m[sel, 0, 0] - m[sel, 2, 2])
+    quat[sel, 2] = 0.25 * s
+    s = 1.0 / s
+    quat[sel, 0] = (m[sel, 0, 2] - m[sel, 2, 0]) * s
+    quat[sel, 1] = (m[sel, 0, 1] + m[sel, 1, 0]) * s
+    quat[sel, 3] = (m[sel, 1, 2] + m[sel, 2, 1]) * s
+
+    sel = use_z
+    s = 2.0 * numpy.sqrt(1.0 + m[sel, 2, 2] - m[sel, 0, 0] - m[sel, 1, 1])
+    quat[sel, 3] = 0.25 * s
+    s = 1.0 / s
+    quat[sel, 0] = (m[sel, 1, 0] - m[sel, 0, 1]) * s
+    quat[sel, 1] = (m[sel, 0, 2] + m[sel, 2, 0]) * s
+    quat[sel, 2] = (m[sel, 1, 2] + m[sel, 2, 1]) * s
+
+    quat /= numpy.linalg.norm(quat, axis=1)[:, None]
+    return quat
 
 
 def load(context,
@@ -688,6 +858,179 @@ def load(context,
     return {'FINISHED'}
 
 
+def _read_bvh_worker(file_path, temp_dir, index):
+    """
+    Parse one BVH file in a worker process (bvh_motion.py run by Blender's python),
+    returns (hierarchy text, motion array, seconds) or None when parsing failed.
+    """
+    import os
+    import subprocess
+    import time
+
+    t1 = time.time()
+    output_base = os.path.join(temp_dir, "%d" % index)
+    script = os.path.join(os.path.dirname(__file__), "bvh_motion.py")
+    try:
+        subprocess.check_call([bpy.app.binary_path_python, script, file_path, output_base])
+    except (subprocess.CalledProcessError, OSError) as ex:
+        print("\tparsing bvh %r failed: %s" % (file_path, ex))
+        return None
+
+    with open(output_base + ".txt", 'r') as file:
+        text = file.read()
+    motion = numpy.load(output_base + ".npy")
+
+    return text, motion, time.time() - t1
+
+
+def read_bvh_batch(filepaths, workers=0):
+    """
+    Parse many BVH files in parallel worker processes,
+    returns a list with (hierarchy text, motion array, seconds) or None for each file.
+    """
+    import os
+    import shutil
+    import tempfile
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not bpy.app.binary_path_python:
+        # No python binary to run workers with, parse here.
+        results = []
+        for file_path in filepaths:
+            t1 = time.time()
+            try:
+                text, motion = read_bvh_motion(file_path, dtype=numpy.float32)
+            except ValueError:
+                results.append(None)
+                continue
+            results.append((text, motion, time.time() - t1))
+        return results
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    # Threads only wait for the worker processes, which do the actual parsing.
+    temp_dir = tempfile.mkdtemp(prefix="bvh_batch_")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_read_bvh_worker,
+                                     filepaths,
+                                     [temp_dir] * len(filepaths),
+                                     range(len(filepaths))))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def load_batch(context,
+               filepaths,
+               *,
+               rotate_mode='NATIVE',
+               global_scale=1.0,
+               use_cyclic=False,
+               frame_start=1,
+               global_matrix=None,
+               use_fps_scale=False,
+               workers=0,
+               report=print
+               ):
+    """
+    Import many BVH clips as actions of one armature, built from the first file.
+    Files are parsed in parallel, keyframes are created in the main process.
+    """
+    import time
+    t1 = time.time()
+    print("\tparsing %d bvh files..." % len(filepaths), end="")
+
+    results = read_bvh_batch(filepaths, workers)
+
+    print("%.4f" % (time.time() - t1))
+
+    scene = context.scene
+    frame_orig = scene.frame_current
+
+    arm_ob = None
+    bone_names = {}  # bvh joint name -> bone name
+    actions = []
+
+    for filepath, result in zip(filepaths, results):
+        if result is None:
+            report({'WARNING'}, "Unable to parse BVH file %r" % filepath)
+            continue
+
+        text, motion, parse_time = result
+        t2 = time.time()
+
+        try:
+            bvh_nodes, bvh_frame_time, bvh_frame_count = read_bvh_data(text, motion, global_scale=global_scale)
+        except Exception as ex:
+            # A broken hierarchy only skips this file.
+            report({'WARNING'}, "Unable to read BVH hierarchy of %r: %s" % (filepath, ex))
+            continue
+        finally:
+            del text, motion
+
+        clip_fps_scale = use_fps_scale
+        if bvh_frame_time is None:
+            report({'WARNING'}, "%r does not contain frame duration in its MOTION section, "
+                                "assuming the BVH and Blender scene have the same frame rate" % filepath)
+            bvh_frame_time = scene.render.fps_base / scene.render.fps
+            clip_fps_scale = False
+
+        bvh_name = bpy.path.display_name_from_filepath(filepath)
+
+        if arm_ob is None:
+            # The global matrix is applied once all actions are created.
+            arm_ob = bvh_node_dict2armature(context, bvh_name, bvh_nodes, bvh_frame_time,
+                                            rotate_mode=rotate_mode,
+                                            frame_start=frame_start,
+                                            IMPORT_LOOP=use_cyclic,
+                                            global_matrix=None,
+                                            use_fps_scale=clip_fps_scale,
+                                            )
+            action = arm_ob.animation_data.action
+            for bvh_node in bvh_nodes.values():
+                bone_names[bvh_node.name] = bvh_node.temp[0].name
+        else:
+            missing = 0
+            for bvh_node in bvh_nodes.values():
+                bvh_node.temp = bone_names.get(bvh_node.name)
+                if bvh_node.temp is None:
+                    missing += 1
+            if missing:
+                report({'WARNING'}, "%r: %d joints not found in armature %r" % (filepath, missing, arm_ob.name))
+
+            action = bvh_node_dict2action(context, arm_ob, bvh_name, bvh_nodes, bvh_frame_time,
+                                          rotate_mode=rotate_mode,
+                                          frame_start=frame_start,
+                                          IMPORT_LOOP=use_cyclic,
+                                          use_fps_scale=clip_fps_scale,
+                                          )
+
+        # Keep the actions which are not assigned to the armature.
+        action.use_fake_user = True
+        actions.append(action)
+
+        report({'INFO'}, "%s: parsed in %.3f sec, keyframed in %.3f sec, %d frames" %
+               (bvh_name, parse_time, time.time() - t2, bvh_frame_count or 0))
+
+    if arm_ob is None:
+        report({'ERROR'}, "None of the BVH files could be imported")
+        return {'CANCELLED'}
+
+    # finally apply matrix
+    if global_matrix is not None:
+        arm_ob.matrix_world = global_matrix
+        bpy.ops.object.transform_apply(rotation=True)
+
+    report({'INFO'}, "Imported %d of %d BVH files in %.3f sec" %
+           (len(actions), len(filepaths), time.time() - t1))
+
+    context.scene.frame_set(frame_orig)
+
+    return {'FINISHED'}
+
+
 def _update_scene_fps(context, report, bvh_frame_time):
     """Update the scene's FPS settings from the BVH, but only if the BVH contains enough info."""
 
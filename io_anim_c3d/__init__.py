@@ -47,6 +47,7 @@ import os
 import math
 from mathutils import Vector
 from . import import_c3d
+from .import_c3d import numpy
 
 
 class C3DAnimateCloud(bpy.types.Operator):
@@ -205,6 +206,13 @@ class C3DImporter(bpy.types.Operator):
         min=-1., max=1000000.0,
         soft_min=-1., soft_max=100.0,
     )
+    use_mmap = BoolProperty(
+        name="Memory-mapped",
+        default=False,
+        description="Read the markers from the file one at a time "
+                    "instead of loading the whole capture, "
+                    "for captures bigger than the memory",
+    )
 
     filter_glob = StringProperty(default="*.c3d;*.csv", options={'HIDDEN'})
 
@@ -305,6 +313,68 @@ class C3DImporter(bpy.types.Operator):
         bpy.ops.object.mode_set(mode='POSE')
         bpy.ops.pose.select_all(action='SELECT')
 
+    def can_animate_bulk(self, ms):
+        """
+            Bulk keyframing needs NumPy and a C3D file, bone locations are
+            only converted for bones without parent
+        """
+        if import_c3d.numpy is None or not hasattr(ms, 'dataBlock'):
+            return False
+        if self.properties.create_armature:
+            bones = bpy.context.active_object.pose.bones
+            for ml in ms.markerLabels:
+                name = self.properties.prefix + ml
+                if name in bones and bones[name].parent:
+                    return False
+        return True
+
+    def animate_bulk(self, ms, scale, unames=None):
+        """
+            Keyframe all frames of the markers at once from a FrameArray
+        """
+        props = self.properties
+        fa = ms.readFrameArray(lazy=props.use_mmap)
+        ms.infile.close()
+        sel = numpy.arange(0, len(fa), props.frame_skip)
+        if props.use_frame_no:
+            times = (sel + ms.startFrame).astype(numpy.float32)
+        else:
+            times = (sel // props.frame_skip).astype(numpy.float32)
+        if props.create_armature:
+            ob = bpy.context.active_object
+            bones = ob.pose.bones
+        # all markers of the used frames, reading the data once
+        markers = fa.markers(sel)
+        for idx, ml in enumerate(ms.markerLabels):
+            name = props.prefix + ml
+            if props.create_armature:
+                if name not in bones:
+                    continue
+                data_path = 'pose.bones["{}"].location'.format(name)
+                group = name
+                rest = numpy.array(bones[name].bone.matrix_local)
+            else:
+                ob = bpy.context.scene.objects[unames[name]]
+                data_path = 'location'
+                group = None
+            records = markers[idx]
+            valid = records[:, 3] >= props.confidence
+            pos = records[valid, :3] * scale
+            if props.Y_up:
+                pos = pos[:, (0, 2, 1)] * (1., -1., 1.)
+            if props.create_armature:
+                # pose space translation to location of the unparented bone
+                pos = (pos - rest[:3, 3]) @ rest[:3, :3]
+            if ob.animation_data is None:
+                ob.animation_data_create()
+            if ob.animation_data.action is None:
+                ob.animation_data.action = bpy.data.actions.new(ob.name)
+            action = ob.animation_data.action
+            for axis in range(3):
+                keyframes_set(action, data_path, axis, group,
+                              times[valid], pos[:, axis])
+        bpy.context.scene.frame_set(bpy.context.scene.frame_current)
+
     def execute(self, context):
         ms = import_c3d.read(self.properties.filepath, onlyHeader=True)
         ms.readNextFrameData()
@@ -326,6 +396,11 @@ class C3DImporter(bpy.types.Operator):
         else:
             unames = self.create_empties(ms)
 
+        if self.can_animate_bulk(ms):
+            self.animate_bulk(ms, scale, None if self.properties.create_armature
+                              else unames)
+            return {'FINISHED'}
+
         # start animating the empties
         C3DAnimateCloud.markerset = ms
         C3DAnimateCloud.is_armature = self.properties.create_armature
@@ -347,6 +422,34 @@ class C3DImporter(bpy.types.Operator):
         return {'RUNNING_MODAL'}
 
 
+def keyframes_set(action, data_path, index, group, frames, values):
+    """
+        Write the keyframes of an F-Curve at once, keys of an existing
+        F-Curve are kept unless replaced by a key on the same frame
+    """
+    fc = action.fcurves.find(data_path, index)
+    if fc is not None:
+        old = numpy.empty(len(fc.keyframe_points) * 2, dtype=numpy.float32)
+        fc.keyframe_points.foreach_get('co', old)
+        old = old.reshape(-1, 2)
+        old = old[~numpy.in1d(old[:, 0], frames)]
+        frames = numpy.concatenate((old[:, 0], frames))
+        values = numpy.concatenate((old[:, 1], values))
+        order = numpy.argsort(frames, kind='mergesort')
+        frames, values = frames[order], values[order]
+        action.fcurves.remove(fc)
+    if group:
+        fc = action.fcurves.new(data_path, index, group)
+    else:
+        fc = action.fcurves.new(data_path, index)
+    co = numpy.empty((len(frames), 2), dtype=numpy.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    fc.keyframe_points.add(len(co))
+    fc.keyframe_points.foreach_set('co', co.ravel())
+    fc.update()
+
+
 def menu_func(self, context):
     self.layout.operator(C3DImporter.bl_idname,
                          text="Graphics Lab Motion Capture (.c3d)")
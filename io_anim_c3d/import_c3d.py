@@ -29,10 +29,13 @@
 # and Jaap Harlaar, Amsterdam, april 2002
 
 
+import os
 import struct
 try:
+    import numpy
     from numpy import array as vec  # would be nice to have NumPy in Blender
 except:
+    numpy = None
     from mathutils import Vector as vec
 
 
@@ -172,11 +175,14 @@ class MarkerSet:
         if self.scale < 0:
             if self.procType == 2:
                 self.readMarker = self.readFloatMarkerInvOrd
+                self.dataType = 'FLOAT_INV'
             else:
                 self.readMarker = self.readFloatMarker
+                self.dataType = 'FLOAT'
             self.scale *= -1
         else:
             self.readMarker = self.readShortMarker
+            self.dataType = 'SHORT'
 
     def readParameters(self, infile):
         infile.seek(512 * (self.firstParameterBlock - 1))
@@ -251,6 +257,14 @@ class MarkerSet:
             frame = [self.readMarker(infile) for m in range(self.markerCount)]
             self.frames.append(frame)
 
+    def readFrameArray(self, lazy=False):
+        """
+            Read the marker data of all frames as a FrameArray,
+            memory-mapped and converted on access when lazy
+        """
+        self.frameArray = FrameArray(self, lazy)
+        return self.frameArray
+
     def readNextFrameData(self):
         if len(self.frames) < (self.endFrame - self.startFrame + 1):
             frame = [self.readMarker(self.infile)
@@ -271,6 +285,95 @@ class MarkerSet:
         return self.frames[frame - self.startFrame][idx]
 
 
+class FrameArray:
+    """
+        Marker data as a (frames x markers x 4) NumPy array of
+        (x, y, z, confidence), positions already scaled.
+        The data block is read at once, or memory-mapped when lazy so
+        only the accessed frames or markers are read and converted.
+    """
+    def __init__(self, markerset, lazy=False):
+        ms = markerset
+        self.markerCount = ms.markerCount
+        self.scale = ms.scale
+        self.invOrd = ms.dataType == 'FLOAT_INV'
+        dtype = numpy.dtype('<i2' if ms.dataType == 'SHORT' else '<f4')
+        offset = 512 * (ms.dataBlock - 1)
+        # truncated files: only use the complete frames
+        frameSize = self.markerCount * 4 * dtype.itemsize
+        available = max(os.path.getsize(ms.fileName) - offset, 0)
+        self.frameCount = min(ms.endFrame - ms.startFrame + 1,
+                              available // frameSize if frameSize else 0)
+        shape = (self.frameCount, self.markerCount, 4)
+        self.markerData = None  # converted marker() records when lazy
+        if lazy:
+            self.raw = numpy.memmap(ms.fileName, dtype=dtype, mode='r',
+                                    offset=offset, shape=shape)
+            self.data = None
+        else:
+            with open(ms.fileName, 'rb') as infile:
+                infile.seek(offset)
+                raw = numpy.fromfile(infile, dtype=dtype,
+                                     count=numpy.prod(shape))
+            self.raw = None
+            self.data = self.convert(raw.reshape(shape))
+
+    def __len__(self):
+        return self.frameCount
+
+    def convert(self, raw):
+        """
+            Convert raw marker records (... x 4) to scaled float32 values
+        """
+        if self.invOrd:
+            # swap the 16 bit words of each float
+            words = numpy.ascontiguousarray(raw).view('<u2')
+            words = words.reshape(raw.shape + (2,))[..., ::-1]
+            raw = numpy.ascontiguousarray(words).view('<f4')
+            raw = raw.reshape(words.shape[:-1])
+        data = raw.astype(numpy.float32)
+        data[..., :3] *= self.scale
+        return data
+
+    def __getitem__(self, frames):
+        """
+            Records of the frames (index or slice, 0 is the first frame)
+        """
+        if self.data is not None:
+            return self.data[frames]
+        return self.convert(self.raw[frames])
+
+    def markers(self, frames=slice(None)):
+        """
+            Records of all markers over the frames (index array or slice),
+            a (markers x frames x 4) array. When lazy the mapped data is
+            read once, converting blocks of consecutive frames.
+        """
+        if self.data is not None:
+            return self.data[frames].transpose(1, 0, 2)
+        frames = numpy.arange(self.frameCount)[frames]
+        data = numpy.empty((self.markerCount, len(frames), 4), numpy.float32)
+        # about 1M values per block
+        blockFrames = max(1, (1 << 20) // max(1, self.markerCount * 4))
+        for start in range(0, len(frames), blockFrames):
+            block = frames[start:start + blockFrames]
+            data[:, start:start + len(block)] = \
+                self.convert(self.raw[block]).transpose(1, 0, 2)
+        return data
+
+    def marker(self, idx):
+        """
+            Records of one marker over all frames, a (frames x 4) array
+        """
+        if self.data is not None:
+            return self.data[:, idx]
+        # slicing one marker from the mapped frames would read all of
+        # them again for every marker, so they are converted once
+        if self.markerData is None:
+            self.markerData = self.markers()
+        return self.markerData[idx]
+
+
 def read(filename, *a, **kw):
     return MarkerSet(filename, *a, **kw)
 
@@ -278,7 +381,6 @@ def read(filename, *a, **kw):
 
 
 if __name__ == '__main__':
-    import os
     import sys
 
     sys.argv.pop(0)
@@ -41,7 +41,7 @@ if "bpy" in locals():
 
 
 import bpy
-from bpy.props import StringProperty
+from bpy.props import StringProperty, BoolProperty
 from bpy_extras.io_utils import ImportHelper
 
 
@@ -54,6 +54,23 @@ class ImportSVG(bpy.types.Operator, ImportHelper):
     filename_ext = ".svg"
     filter_glob = StringProperty(default="*.svg", options={'HIDDEN'})
 
+    use_streaming = BoolProperty(
+            name="Streaming",
+            description="Create curves while reading the file instead of "
+                        "loading the whole document first, uses less memory "
+                        "on big files but only resolves references to "
+                        "elements defined earlier in the file",
+            default=False,
+            )
+    use_instancing = BoolProperty(
+            name="Instancing",
+            description="Share one curve between all paths with the same "
+                        "data and style (including <use> references), "
+                        "objects get the transformation instead of the "
+                        "curve points (skewed paths are never shared)",
+            default=False,
+            )
+
     def execute(self, context):
         from . import import_svg
 
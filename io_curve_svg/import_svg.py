@@ -20,6 +20,7 @@
 
 import re
 import xml.dom.minidom
+import xml.etree.ElementTree
 from math import cos, sin, tan, atan2, pi, ceil
 
 import bpy
@@ -45,6 +46,20 @@ SVGUnits = {"": 1.0,
 SVGEmptyStyles = {'useFill': None,
                   'fill': None}
 
+# Namespaces of prefixed attributes used by importer, needed to access
+# attributes of ElementTree elements in streaming mode
+SVGNamespaces = {'svg': 'http://www.w3.org/2000/svg',
+                 'xlink': 'http://www.w3.org/1999/xlink',
+                 'inkscape': 'http://www.inkscape.org/namespaces/inkscape',
+                 'sodipodi': 'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd'}
+
+# Tokens of path data: commands and floats (including Inkscape's "1." form)
+SVGPathTokens = re.compile(r'[MmLlHhVvCcSsQqTtAaZz]|'
+                           r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+# Maximal number of parsed paths kept around for instancing
+SVGPathsCacheSize = 1024
+
 def srgb_to_linearrgb(c):
     if c < 0.04045:
         return 0.0 if c < 0.0 else c * (1.0 / 12.92);
@@ -118,12 +133,16 @@ def SVGParseFloat(s, i=0):
     return token, i
 
 
-def SVGCreateCurve():
+def SVGCreateCurve(cu=None):
     """
     Create new curve object to hold splines in
+
+    cu - already created curve to be shared with new object
     """
 
-    cu = bpy.data.curves.new("Curve", 'CURVE')
+    if cu is None:
+        cu = bpy.data.curves.new("Curve", 'CURVE')
+
     obj = bpy.data.objects.new("Curve", cu)
     bpy.context.scene.objects.link(obj)
 
@@ -138,6 +157,23 @@ def SVGFinishCurve():
     pass
 
 
+def SVGTransformCoords(coords, matrix):
+    """
+    Transform flat list of SVG-file coords (x0, y0, x1, y1, ...)
+
+    Returns flat list of 3D coordinates suitable for foreach_set()
+    """
+
+    (a, b, _, c), (d, e, _, f), (g, h, _, i) = matrix[0], matrix[1], matrix[2]
+    result = [0.0] * (len(coords) // 2 * 3)
+
+    result[0::3] = [a * x + b * y + c for x, y in zip(coords[0::2], coords[1::2])]
+    result[1::3] = [d * x + e * y + f for x, y in zip(coords[0::2], coords[1::2])]
+    result[2::3] = [g * x + h * y + i for x, y in zip(coords[0::2], coords[1::2])]
+
+    return result
+
+
 def SVGFlipHandle(x, y, x1, y1):
     """
     Flip handle around base point
@@ -281,12 +317,14 @@ def SVGGetMaterial(color, context):
 
     diff = None
     if color.startswith('#'):
-        color = color[1:]
+        # Keep original color as materials key, so materials are reused
+        # (and so are curves when instancing)
+        hex_color = color[1:]
 
-        if len(color) == 3:
-            color = color[0] * 2 + color[1] * 2 + color[2] * 2
+        if len(hex_color) == 3:
+            hex_color = hex_color[0] * 2 + hex_color[1] * 2 + hex_color[2] * 2
 
-        diff = (int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16))
+        diff = (int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16))
     elif color in svg_colors.SVGColors:
         diff = svg_colors.SVGColors[color]
     elif rgb_re.match(color):
@@ -397,6 +435,25 @@ def SVGTransformRotate(params):
 
     return tm * rm * tm.inverted()
 
+
+def SVGMatrixHasShear(matrix):
+    """
+    Check whether matrix can't be stored as object location, rotation and scale
+
+    Such matrices have non-orthogonal axes, which happens with skewing and
+    with non-uniform scale applied after rotation.
+    """
+
+    axes = matrix.to_3x3().col
+    eps = 1e-6
+
+    for i, j in ((0, 1), (0, 2), (1, 2)):
+        limit = eps * axes[i].length * axes[j].length
+        if abs(axes[i].dot(axes[j])) > limit:
+            return True
+
+    return False
+
 SVGTransforms = {'translate': SVGTransformTranslate,
                  'scale': SVGTransformScale,
                  'skewX': SVGTransformSkewX,
@@ -461,6 +518,56 @@ def SVGParseStyles(node, context):
 #### SVG path helpers ####
 
 
+def SVGSplineArrays(points, closed):
+    """
+    Convert parsed spline points to flat coordinate arrays
+
+    Returns (co, handles_left, handles_right) lists of SVG-file coords.
+    Handles which are not set explicitly (VECTOR handles) are calculated
+    the same way Blender does, so the arrays could be assigned in bulk
+    without relying on handles recalculation.
+    """
+
+    n = len(points)
+    xs = [point['x'] for point in points]
+    ys = [point['y'] for point in points]
+
+    co = [0.0] * (n * 2)
+    co[0::2] = xs
+    co[1::2] = ys
+
+    handles_left = []
+    handles_right = []
+
+    for i, point in enumerate(points):
+        x, y = xs[i], ys[i]
+
+        handle = point['handle_left']
+        if handle is None:
+            if i > 0 or closed:
+                px, py = xs[i - 1], ys[i - 1]
+            elif n > 1:
+                px, py = x + x - xs[1], y + y - ys[1]
+            else:
+                px, py = x, y
+            handle = (x + (px - x) / 3.0, y + (py - y) / 3.0)
+        handles_left.extend(handle)
+
+        handle = point['handle_right']
+        if handle is None:
+            if i < n - 1 or closed:
+                nx, ny = xs[(i + 1) % n], ys[(i + 1) % n]
+            elif n > 1:
+                nx, ny = x + x - xs[i - 1], y + y - ys[i - 1]
+            else:
+                nx, ny = x, y
+            handle = (x + (nx - x) / 3.0, y + (ny - y) / 3.0)
+        handles_right.extend(handle)
+
+    return co, handles_left, handles_right
+
+
+
 class SVGPathData:
     """
     SVG Path data token supplier
@@ -477,33 +584,9 @@ class SVGPathData:
         d - the definition of the outline of a shape
         """
 
-        spaces = ' ,\t'
-        commands = {'m', 'l', 'h', 'v', 'c', 's', 'q', '', 't', 'a', 'z'}
-        tokens = []
-
-        i = 0
-        n = len(d)
-        while i < n:
-            c = d[i]
-
-            if c in spaces:
-                pass
-            elif c.lower() in commands:
-                tokens.append(c)
-            elif c in ['-', '.'] or c.isdigit():
-                token, last_char = SVGParseFloat(d, i)
-                tokens.append(token)
-
-                # in most cases len(token) and (last_char - i) are the same
-                # but with whitespace or ',' prefix they are not.
-
-                i += (last_char - i) - 1
-
-            i += 1
-
-        self._data = tokens
+        self._data = SVGPathTokens.findall(d)
         self._index = 0
-        self._len = len(tokens)
+        self._len = len(self._data)
 
     def eof(self):
         """
@@ -1143,13 +1226,13 @@ class SVGGeometryContainer(SVGGeometry):
         Parse XML node to memory
         """
 
-        if type(self._node) is xml.dom.minidom.Element:
+        if type(self._node) in SVGElementTypes:
             self._styles = SVGParseStyles(self._node, self._context)
 
         self._pushStyle(self._styles)
 
         for node in self._node.childNodes:
-            if type(node) is not xml.dom.minidom.Element:
+            if type(node) not in SVGElementTypes:
                 continue
 
             ob = parseAbstractNode(node, self._context)
@@ -1180,7 +1263,8 @@ class SVGGeometryPATH(SVGGeometry):
     """
 
     __slots__ = ('_splines',  # List of splines after parsing
-                 '_styles')  # Styles, used for displaying
+                 '_styles',  # Styles, used for displaying
+                 '_key')  # Normalized path data, key of caches
 
     def __init__(self, node, context):
         """
@@ -1191,6 +1275,7 @@ class SVGGeometryPATH(SVGGeometry):
 
         self._splines = []
         self._styles = SVGEmptyStyles
+        self._key = ''
 
     def parse(self):
         """
@@ -1200,18 +1285,65 @@ class SVGGeometryPATH(SVGGeometry):
         d = self._node.getAttribute('d')
 
         self._styles = SVGParseStyles(self._node, self._context)
+        self._key = ' '.join(SVGPathTokens.findall(d))
+
+        # When instancing, identical path data is parsed only once
+        paths = self._context['paths']
+        key = (self._key, self._styles['useFill'])
+        use_cache = self._context['use_instancing']
+
+        self._splines = paths.get(key) if use_cache else None
+        if self._splines is None:
+            pathParser = SVGPathParser(self._key, self._styles['useFill'])
+            pathParser.parse()
+
+            self._splines = pathParser.getSplines()
 
-        pathParser = SVGPathParser(d, self._styles['useFill'])
-        pathParser.parse()
+            if use_cache:
+                if len(paths) >= SVGPathsCacheSize:
+                    # Drop the oldest entry
+                    del paths[next(iter(paths))]
 
-        self._splines = pathParser.getSplines()
+                paths[key] = self._splines
 
     def _doCreateGeom(self, instancing):
         """
         Create real geometries
         """
 
-        ob = SVGCreateCurve()
+        matrix = self._context['matrix']
+
+        if self._context['use_instancing'] and not SVGMatrixHasShear(matrix):
+            # Curve is created in path space once per path data and style,
+            # objects only differ by their transformation.
+            # Mirroring is kept in the curve, so objects never get
+            # negative scale.
+            mirror = matrix.to_3x3().determinant() < 0.0
+            curves = self._context['curves']
+            key = (self._key, self._styles['useFill'], self._styles['fill'],
+                   mirror)
+
+            cu = curves.get(key)
+            if cu is not None:
+                self._context['instances'] += 1
+
+            ob = SVGCreateCurve(cu)
+
+            if mirror:
+                flip = Matrix.Scale(-1.0, 4, Vector((0.0, 1.0, 0.0)))
+                ob.matrix_world = matrix * flip
+                matrix = flip
+            else:
+                ob.matrix_world = matrix
+                matrix = Matrix()
+
+            if cu is not None:
+                return
+
+            curves[key] = ob.data
+        else:
+            ob = SVGCreateCurve()
+
         cu = ob.data
 
         if self._node.getAttribute('id'):
@@ -1224,30 +1356,29 @@ class SVGGeometryPATH(SVGGeometry):
             cu.dimensions = '3D'
 
         for spline in self._splines:
-            act_spline = None
-            for point in spline['points']:
-                co = self._transformCoord((point['x'], point['y']))
+            points = spline['points']
+            if not points:
+                continue
 
-                if act_spline is None:
-                    cu.splines.new('BEZIER')
+            co, handles_left, handles_right = \
+                SVGSplineArrays(points, spline['closed'])
 
-                    act_spline = cu.splines[-1]
-                    act_spline.use_cyclic_u = spline['closed']
-                else:
-                    act_spline.bezier_points.add()
+            cu.splines.new('BEZIER')
 
-                bezt = act_spline.bezier_points[-1]
-                bezt.co = co
+            act_spline = cu.splines[-1]
+            act_spline.use_cyclic_u = spline['closed']
+            act_spline.bezier_points.add(len(points) - 1)
 
+            for bezt, point in zip(act_spline.bezier_points, points):
                 bezt.handle_left_type = point['handle_left_type']
-                if point['handle_left'] is not None:
-                    handle = point['handle_left']
-                    bezt.handle_left = self._transformCoord(handle)
-
                 bezt.handle_right_type = point['handle_right_type']
-                if point['handle_right'] is not None:
-                    handle = point['handle_right']
-                    bezt.handle_right = self._transformCoord(handle)
+
+            bezier_points = act_spline.bezier_points
+            bezier_points.foreach_set('co', SVGTransformCoords(co, matrix))
+            bezier_points.foreach_set('handle_left',
+                SVGTransformCoords(handles_left, matrix))
+            bezier_points.foreach_set('handle_right',
+                SVGTransformCoords(handles_right, matrix))
 
         SVGFinishCurve()
 
@@ -1789,6 +1920,17 @@ class SVGGeometrySVG(SVGGeometryContainer):
         Create real geometries
         """
 
+        self.pushViewport()
+
+        super()._doCreateGeom(False)
+
+        self.popViewport()
+
+    def pushViewport(self):
+        """
+        Push display rectangle and matrix of this SVG element
+        """
+
         rect = SVGRectFromNode(self._node, self._context)
 
         matrix = self.getNodeMatrix()
@@ -1803,7 +1945,10 @@ class SVGGeometrySVG(SVGGeometryContainer):
         self._pushMatrix(matrix)
         self._pushRect(rect)
 
-        super()._doCreateGeom(False)
+    def popViewport(self):
+        """
+        Pop display rectangle and matrix of this SVG element
+        """
 
         self._popRect()
         self._popMatrix()
@@ -1824,30 +1969,214 @@ class SVGLoader(SVGGeometryContainer):
 
         return None
 
-    def __init__(self, filepath, do_colormanage):
+    def __init__(self, filepath, do_colormanage, use_instancing=False):
         """
         Initialize SVG loader
         """
 
         node = xml.dom.minidom.parse(filepath)
 
-        m = Matrix()
-        m = m * Matrix.Scale(1.0 / 90.0 * 0.3048 / 12.0, 4, Vector((1.0, 0.0, 0.0)))
-        m = m * Matrix.Scale(-1.0 / 90.0 * 0.3048 / 12.0, 4, Vector((0.0, 1.0, 0.0)))
+        self._context = SVGCreateContext(do_colormanage, use_instancing)
 
-        rect = (0, 0)
+        super().__init__(node, self._context)
 
-        self._context = {'defines': {},
-                         'transform': [],
-                         'rects': [rect],
-                         'rect': rect,
-                         'matrix': m,
-                         'materials': {},
-                         'styles': [None],
-                         'style': None,
-                         'do_colormanage': do_colormanage}
 
-        super().__init__(node, self._context)
+class SVGStreamElement:
+    """
+    Wrapper of ElementTree element which provides subset of DOM element API
+    used by geometries
+    """
+
+    __slots__ = ('_element',  # Wrapped ElementTree element
+                 'tagName')  # Tag name without namespace
+
+    def __init__(self, element):
+        """
+        Initialize new element wrapper
+        """
+
+        self._element = element
+        self.tagName = element.tag.rpartition('}')[2]
+
+    def getAttribute(self, name):
+        """
+        Get attribute value, empty string if attribute is not set
+        """
+
+        prefix, _, local = name.rpartition(':')
+        if prefix:
+            name = '{' + SVGNamespaces.get(prefix, prefix) + '}' + local
+
+        return self._element.get(name, '')
+
+    @property
+    def childNodes(self):
+        """
+        Wrapped child elements
+        """
+
+        return [SVGStreamElement(child) for child in self._element]
+
+
+SVGElementTypes = {xml.dom.minidom.Element, SVGStreamElement}
+
+
+class SVGStreamLoader:
+    """
+    Streaming SVG file loader
+
+    Geometries are created as soon as their elements are parsed and
+    elements are released afterwards, so the whole document is never kept
+    in memory. Groups and nested SVG elements push their styles, transforms
+    and viewports when they are opened and pop them when closed.
+    Definitions (<defs>, <symbol> and elements with id) are kept, so only
+    references to elements defined earlier in the file could be resolved.
+    Groups with id keep their whole subtree and are parsed when closed,
+    so they can be referenced by <use> like in the DOM loader.
+    """
+
+    def __init__(self, filepath, do_colormanage, use_instancing=False):
+        """
+        Initialize streaming SVG loader
+        """
+
+        self._filepath = filepath
+        self._context = SVGCreateContext(do_colormanage, use_instancing)
+
+    def _openContainer(self, node):
+        """
+        Push state of opened group or nested SVG element
+        """
+
+        context = self._context
+        geom = svgGeometryClasses[node.tagName.lower()](node, context)
+        styles = SVGParseStyles(node, context)
+        geom._pushStyle(styles)
+
+        matrix = geom.getTransformMatrix()
+        if matrix is not None:
+            geom._pushMatrix(matrix)
+
+        if isinstance(geom, SVGGeometrySVG):
+            geom.pushViewport()
+
+        return geom, matrix
+
+    def _closeContainer(self, geom, matrix):
+        """
+        Pop state of closed group or nested SVG element
+        """
+
+        if isinstance(geom, SVGGeometrySVG):
+            geom.popViewport()
+
+        if matrix is not None:
+            geom._popMatrix()
+
+        geom._popStyle()
+
+    def load(self):
+        """
+        Parse file and create geometries
+
+        Returns number of objects which reused already created curve
+        """
+
+        context = self._context
+        containers = []  # Stack of opened groups and their matrices
+        elements = []  # Stack of opened elements and their kinds
+        id_groups = 0  # Number of opened groups with id
+
+        for event, element in xml.etree.ElementTree.iterparse(
+                self._filepath, events=('start', 'end')):
+            name = element.tag.rpartition('}')[2].lower()
+
+            if event == 'start':
+                parent_kind = elements[-1][1] if elements else 'CONTAINER'
+
+                if parent_kind in {'DEFINITION', 'DEFS'}:
+                    kind = 'DEFS'
+                elif parent_kind == 'IGNORE':
+                    kind = 'IGNORE'
+                elif parent_kind != 'CONTAINER':
+                    # Children of geometries are not handled by DOM loader
+                    kind = 'IGNORE'
+                elif name in {'defs', 'symbol'}:
+                    kind = 'DEFINITION'
+                elif name in {'svg', 'g'}:
+                    kind = 'CONTAINER'
+                    containers.append(self._openContainer(
+                        SVGStreamElement(element)))
+                    if name == 'g' and element.get('id'):
+                        id_groups += 1
+                elif name in svgGeometryClasses:
+                    kind = 'GEOMETRY'
+                else:
+                    kind = 'IGNORE'
+
+                elements.append((element, kind))
+                continue
+
+            kind = elements.pop()[1]
+            keep = False
+
+            if kind == 'DEFINITION':
+                # Register the whole definition subtree, geometry is
+                # created later by <use> elements
+                parseAbstractNode(SVGStreamElement(element), context)
+                keep = True
+            elif kind == 'DEFS':
+                keep = True
+            elif kind == 'CONTAINER':
+                geom, matrix = containers.pop()
+                self._closeContainer(geom, matrix)
+                if name == 'g' and element.get('id'):
+                    # Referenced group, registered when opened: parse its
+                    # children for <use> elements
+                    id_groups -= 1
+                    geom.parse()
+                    keep = True
+            elif kind == 'GEOMETRY':
+                geom = parseAbstractNode(SVGStreamElement(element), context)
+                geom.createGeom(False)
+                keep = bool(element.get('id'))
+
+            if id_groups:
+                # Part of a group which could be referenced
+                keep = True
+
+            if not keep:
+                element.clear()
+                if elements:
+                    elements[-1][0].remove(element)
+
+        return context['instances']
+
+
+def SVGCreateContext(do_colormanage, use_instancing=False):
+    """
+    Create global SVG context
+    """
+
+    m = Matrix()
+    m = m * Matrix.Scale(1.0 / 90.0 * 0.3048 / 12.0, 4, Vector((1.0, 0.0, 0.0)))
+    m = m * Matrix.Scale(-1.0 / 90.0 * 0.3048 / 12.0, 4, Vector((0.0, 1.0, 0.0)))
+
+    rect = (0, 0)
+
+    return {'defines': {},
+            'transform': [],
+            'rects': [rect],
+            'rect': rect,
+            'matrix': m,
+            'materials': {},
+            'styles': [None],
+            'style': None,
+            'do_colormanage': do_colormanage,
+            'paths': {},  # Parsed splines by path data and fill usage
+            'use_instancing': use_instancing,
+            'curves': {},  # Shared curves by path data and style
+            'instances': 0}  # Number of objects which reused a curve
 
 
 svgGeometryClasses = {
@@ -1882,31 +2211,47 @@ def parseAbstractNode(node, context):
     return None
 
 
-def load_svg(filepath, do_colormanage):
+def load_svg(filepath, do_colormanage, use_streaming=False,
+             use_instancing=False):
     """
     Load specified SVG file
+
+    Returns number of objects which reused already created curve
     """
 
     if bpy.ops.object.mode_set.poll():
         bpy.ops.object.mode_set(mode='OBJECT')
 
-    loader = SVGLoader(filepath, do_colormanage)
+    if use_streaming:
+        loader = SVGStreamLoader(filepath, do_colormanage, use_instancing)
+        return loader.load()
+
+    loader = SVGLoader(filepath, do_colormanage, use_instancing)
     loader.parse()
     loader.createGeom(False)
 
+    return loader._context['instances']
 
-def load(operator, context, filepath=""):
+
+def load(operator, context, filepath="", use_streaming=False,
+         use_instancing=False):
 
     # error in code should raise exceptions but loading
     # non SVG files can give useful messages.
     do_colormanage = context.scene.display_settings.display_device != 'NONE'
     try:
-        load_svg(filepath, do_colormanage)
-    except (xml.parsers.expat.ExpatError, UnicodeEncodeError) as e:
+        instances = load_svg(filepath, do_colormanage, use_streaming,
+                             use_instancing)
+    except (xml.parsers.expat.ExpatError,
+            xml.etree.ElementTree.ParseError,
+            UnicodeEncodeError) as e:
         import traceback
         traceback.print_exc()
 
         operator.report({'WARNING'}, "Unable to parse XML, %s:%s for file %r" % (type(e).__name__, e, filepath))
         return {'CANCELLED'}
 
+    if use_instancing:
+        operator.report({'INFO'}, "%d objects share already created curves" % instances)
+
     return {'FINISHED'}
@@ -48,7 +48,7 @@ from bpy_extras.io_utils import ExportHelper
 from os import remove
 import time
 import math
-import struct
+import point_cache
 
 def get_sampled_frames(start, end, sampling):
     return [math.modf(start + x * sampling) for x in range(int((end - start) / sampling) + 1)]
@@ -66,13 +66,26 @@ def do_export(context, props, filepath):
     sampletimes = get_sampled_frames(start, end, sampling)
     sampleCount = len(sampletimes)
 
-    # Create the header
-    headerFormat='<12siiffi'
-    headerStr = struct.pack(headerFormat, b'POINTCACHE2\0',
-                            1, vertCount, start, sampling, sampleCount)
-
     file = open(filepath, "wb")
-    file.write(headerStr)
+    point_cache.pc2_header_write(file, vertCount, start, sampling, sampleCount)
+
+    if props.use_workers:
+        # Background Blender processes evaluate the frames and write them in place.
+        file.close()
+        try:
+            point_cache.export_frames_parallel(ob, filepath, point_cache.PC2,
+                                               point_cache.PC2_HEADER_SIZE, 0,
+                                               [start + x * sampling for x in range(sampleCount)],
+                                               vertCount,
+                                               workers=props.workers,
+                                               apply_modifiers=apply_modifiers,
+                                               use_world_space=props.world_space,
+                                               matrix=mat_x90 if props.rot_x90 else None)
+        except point_cache.VertexCountError:
+            remove(filepath)
+            print('Export failed. Vertexcount of Object is not constant')
+            return False
+        return True
 
     for frame in sampletimes:
         sc.frame_set(int(frame[1]), frame[0])  # stupid modf() gives decimal part first!
@@ -95,11 +108,7 @@ def do_export(context, props, filepath):
         if props.rot_x90:
             me.transform(mat_x90)
 
-        for v in me.vertices:
-            thisVertex = struct.pack('<fff', float(v.co[0]),
-                                             float(v.co[1]),
-                                             float(v.co[2]))
-            file.write(thisVertex)
+        point_cache.write_floats(file, point_cache.frame_coords(me.vertices), point_cache.PC2)
 
         bpy.data.meshes.remove(me, do_unlink=True)
 
@@ -137,6 +146,16 @@ class Export_pc2(bpy.types.Operator, ExportHelper):
             description='Last frame to use for Export',
             default=250,
             )
+    use_workers = BoolProperty(name="Parallel Export",
+            description="Evaluate the frame range in background Blender processes "
+                        "(the blend-file is saved to a temporary copy for them)",
+            default=False,
+            )
+    workers = IntProperty(name="Workers",
+            description="Number of worker processes evaluating frames (0 for one per CPU)",
+            min=0, max=256,
+            default=0,
+            )
     sampling = EnumProperty(name='Sampling',
             description='Sampling --> frames per sample (0.1 yields 10 samples per frame)',
             items=(('0.01', '0.01', ''),
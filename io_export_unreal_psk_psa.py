@@ -163,6 +163,11 @@ from bpy.types import (
         )
 from struct import pack
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 # REFERENCE MATERIAL JUST IN CASE:
 #
@@ -559,15 +564,27 @@ class FileSection:
     def __init__(self, name, type_size):
         self.Header = VChunkHeader(name, type_size)
         self.Data = []  # list of datatypes
+        self.Arrays = []  # numpy structured arrays of the same datatype, stored after Data
 
     def dump(self):
-        data = self.Header.dump()
-        for i in range(len(self.Data)):
-            data = data + self.Data[i].dump()
-        return data
+        return self.Header.dump() + \
+               b"".join(data.dump() for data in self.Data) + \
+               b"".join(array.tobytes() for array in self.Arrays)
+
+    def write(self, file):
+        file.write(self.Header.dump())
+        file.write(b"".join(data.dump() for data in self.Data))
+        for array in self.Arrays:
+            array.tofile(file)
+
+    def AddArray(self, array):
+        self.Arrays.append(array)
+
+    def Count(self):
+        return len(self.Data) + sum(len(array) for array in self.Arrays)
 
     def UpdateHeader(self):
-        self.Header.DataCount = len(self.Data)
+        self.Header.DataCount = self.Count()
 
 
 # ===========================================================================
@@ -631,6 +648,13 @@ class PSKFile:
                self.Faces.dump() + self.Materials.dump() + self.Bones.dump() + self.Influences.dump()
         return data
 
+    def write(self, file):
+        self.UpdateHeaders()
+        file.write(self.GeneralHeader.dump())
+        for section in (self.Points, self.Wedges, self.Faces,
+                        self.Materials, self.Bones, self.Influences):
+            section.write(file)
+
     def GetMatByIndex(self, mat_index):
         if mat_index >= 0 and len(self.Materials.Data) > mat_index:
             return self.Materials.Data[mat_index]
@@ -642,12 +666,12 @@ class PSKFile:
             return m
 
     def PrintOut(self):
-        print("{:>16} {:}".format("Points", len(self.Points.Data)))
-        print("{:>16} {:}".format("Wedges", len(self.Wedges.Data)))
-        print("{:>16} {:}".format("Faces", len(self.Faces.Data)))
-        print("{:>16} {:}".format("Materials", len(self.Materials.Data)))
-        print("{:>16} {:}".format("Bones", len(self.Bones.Data)))
-        print("{:>16} {:}".format("Influences", len(self.Influences.Data)))
+        print("{:>16} {:}".format("Points", self.Points.Count()))
+        print("{:>16} {:}".format("Wedges", self.Wedges.Count()))
+        print("{:>16} {:}".format("Faces", self.Faces.Count()))
+        print("{:>16} {:}".format("Materials", self.Materials.Count()))
+        print("{:>16} {:}".format("Bones", self.Bones.Count()))
+        print("{:>16} {:}".format("Influences", self.Influences.Count()))
 
 
 # ===========================================================================
@@ -726,10 +750,16 @@ class PSAFile:
         self.UpdateHeaders()
         return self.GeneralHeader.dump() + self.Bones.dump() + self.Animations.dump() + self.RawKeys.dump()
 
+    def write(self, file):
+        self.UpdateHeaders()
+        file.write(self.GeneralHeader.dump())
+        for section in (self.Bones, self.Animations, self.RawKeys):
+            section.write(file)
+
     def PrintOut(self):
-        print("{:>16} {:}".format("Bones", len(self.Bones.Data)))
-        print("{:>16} {:}".format("Animations", len(self.Animations.Data)))
-        print("{:>16} {:}".format("Raw keys", len(self.RawKeys.Data)))
+        print("{:>16} {:}".format("Bones", self.Bones.Count()))
+        print("{:>16} {:}".format("Animations", self.Animations.Count()))
+        print("{:>16} {:}".format("Raw keys", self.RawKeys.Count()))
 
 
 # ===========================================================================
@@ -933,6 +963,8 @@ def build_neighbors_tree(smoothgroup_list):
 
 # ===========================================================================
 # parse_smooth_groups
+# Recursive reference implementation, the export uses smooth_group_ids,
+# tests/io_export_unreal_psk_psa_smooth_groups.py compares both
 # ===========================================================================
 def parse_smooth_groups(mesh):
 
@@ -969,6 +1001,164 @@ def parse_smooth_groups(mesh):
     return smoothgroup_list
 
 
+# ===========================================================================
+# smooth_group_ids
+#
+# Same grouping as parse_smooth_groups without the recursive flood fill:
+# faces joined by edges that aren't sharp are merged with a union-find over
+# the edge-face adjacency (min-label hooking with numpy), then the groups
+# are colored greedily so groups meeting at a sharp edge get different bits
+# ===========================================================================
+def smooth_group_components(mesh):
+    """
+    Returns the group of every tessface, numbered in order of their first
+    face, and the (group, group) pairs of faces sharing a sharp edge.
+    """
+    face_count = len(mesh.tessfaces)
+    vert_count = len(mesh.vertices)
+
+    if numpy is None:
+        sharp = {edge.key for edge in mesh.edges if edge.use_edge_sharp}
+        edge_faces = {}
+        for face in mesh.tessfaces:
+            for key in face.edge_keys:
+                edge_faces.setdefault(key, []).append(face.index)
+
+        # union-find, the root of a set is its lowest face
+        parent = list(range(face_count))
+
+        def find(i):
+            root = i
+            while parent[root] != root:
+                root = parent[root]
+            while parent[i] != root:
+                parent[i], i = root, parent[i]
+            return root
+
+        sharp_pairs = []
+        for key, faces in edge_faces.items():
+            if key in sharp:
+                sharp_pairs.extend((a, b) for i, a in enumerate(faces) for b in faces[i + 1:])
+            else:
+                for face in faces[1:]:
+                    a, b = find(faces[0]), find(face)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+
+        roots = {}
+        face_groups = [roots.setdefault(find(i), len(roots)) for i in range(face_count)]
+        group_pairs = {(face_groups[a], face_groups[b]) for a, b in sharp_pairs}
+        return face_groups, [(a, b) for a, b in group_pairs if a != b]
+
+    face_verts = numpy.empty(face_count * 4, dtype=numpy.int64)
+    mesh.tessfaces.foreach_get("vertices_raw", face_verts)
+    face_verts = face_verts.reshape(-1, 4)
+    is_quad = face_verts[:, 3] != 0  # only triangles have a 0 4th index
+
+    # edge keys of all face corners, as lo * vert_count + hi
+    next_verts = numpy.where(is_quad[:, None], numpy.roll(face_verts, -1, axis=1),
+                             numpy.roll(face_verts[:, (0, 1, 2, 0)], -1, axis=1))
+    corner_faces = numpy.repeat(numpy.arange(face_count), 4)
+    corner_keys = (numpy.minimum(face_verts, next_verts) * vert_count +
+                   numpy.maximum(face_verts, next_verts)).ravel()
+    is_corner = numpy.ones((face_count, 4), dtype=bool)
+    is_corner[:, 3] = is_quad
+    corner_faces = corner_faces[is_corner.ravel()]
+    corner_keys = corner_keys[is_corner.ravel()]
+
+    edge_verts = numpy.empty(len(mesh.edges) * 2, dtype=numpy.int64)
+    mesh.edges.foreach_get("vertices", edge_verts)
+    edge_verts = edge_verts.reshape(-1, 2)
+    edge_sharp = numpy.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get("use_edge_sharp", edge_sharp)
+    edge_verts = edge_verts[edge_sharp]
+    sharp_keys = numpy.sort(edge_verts.min(axis=1) * vert_count + edge_verts.max(axis=1))
+
+    # corners sorted by edge, every run of a key are the faces of one edge
+    order = numpy.argsort(corner_keys, kind='mergesort')
+    corner_keys = corner_keys[order]
+    corner_faces = corner_faces[order]
+    corner_sharp = numpy.zeros(len(corner_keys), dtype=bool)
+    if len(sharp_keys):
+        found = numpy.searchsorted(sharp_keys, corner_keys).clip(0, len(sharp_keys) - 1)
+        corner_sharp = sharp_keys[found] == corner_keys
+    run_first = numpy.ones(len(corner_keys), dtype=bool)
+    run_first[1:] = corner_keys[1:] != corner_keys[:-1]
+    run_start = numpy.flatnonzero(run_first)[numpy.cumsum(run_first) - 1]
+
+    # every face is joined to the first face of its smooth edges
+    smooth = ~corner_sharp & ~run_first
+    link_a = corner_faces[run_start[smooth]]
+    link_b = corner_faces[smooth]
+
+    # min-label hooking with pointer jumping, labels end up as the lowest face
+    labels = numpy.arange(face_count)
+    while True:
+        label_a = labels[link_a]
+        label_b = labels[link_b]
+        differ = label_a != label_b
+        if not differ.any():
+            break
+        numpy.minimum.at(labels, numpy.maximum(label_a, label_b)[differ],
+                         numpy.minimum(label_a, label_b)[differ])
+        while True:
+            jumped = labels[labels]
+            if (jumped == labels).all():
+                break
+            labels = jumped
+
+    face_groups = numpy.unique(labels, return_inverse=True)[1]
+
+    # all pairs of faces sharing a sharp edge
+    pairs = []
+    run_index = numpy.cumsum(run_first) - 1
+    sharp_corners = numpy.flatnonzero(corner_sharp)
+    offset = 1
+    while len(sharp_corners):
+        sharp_corners = sharp_corners[sharp_corners + offset < len(corner_keys)]
+        same_run = run_index[sharp_corners] == run_index[sharp_corners + offset]
+        sharp_corners = sharp_corners[same_run]
+        pairs.append(numpy.column_stack((face_groups[corner_faces[sharp_corners]],
+                                         face_groups[corner_faces[sharp_corners + offset]])))
+        offset += 1
+    group_pairs = numpy.concatenate(pairs) if pairs else numpy.zeros((0, 2), dtype=numpy.intp)
+    group_pairs = group_pairs[group_pairs[:, 0] != group_pairs[:, 1]]
+    return face_groups, group_pairs.tolist()
+
+
+def smooth_group_ids(mesh):
+    """
+    Smoothing group bits of every tessface of the mesh,
+    replaces parse_smooth_groups for the export.
+    """
+    print("Parsing smooth groups...")
+
+    t = time.clock()
+    face_groups, group_pairs = smooth_group_components(mesh)
+    group_count = max(face_groups) + 1 if len(face_groups) else 0
+
+    neighbors = [[] for i in range(group_count)]
+    for a, b in group_pairs:
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+
+    # greedy coloring, in order of the groups first face
+    group_ids = [0] * group_count
+    for group in range(group_count):
+        used = 0
+        for neighbor in neighbors[group]:
+            used |= group_ids[neighbor]
+        group_id = ~used & (used + 1)  # lowest unused bit
+        if group_id > 0x80000000:
+            raise Error("Smoothing Group ID Overflowed, "
+                        "Smoothing Group evidently has more than 31 neighboring groups")
+        group_ids[group] = group_id
+
+    verbose("len(smoothgroup_list)={}".format(group_count))
+    print("Smooth group parsing completed in {:.2f}s".format(time.clock() - t))
+    return [group_ids[group] for group in face_groups]
+
+
 # ===========================================================================
 # http://en.wikibooks.org/wiki/Blender_3D:_Blending_Into_Python/Cookbook#Triangulate_NMesh
 # blender 2.50 format using the Operators/command convert the mesh to tri mesh
@@ -1071,6 +1261,123 @@ def sortmesh(selectmesh):
         return meshmerge(selectmesh)  # return merge object mesh
 
 
+# ===========================================================================
+# Columnar export
+#
+# With numpy, points, wedges, faces, influences and animation keys are built
+# as structured arrays laid out like the UDN structs above (packed, little
+# endian), deduplicated with one sort instead of hashing struct objects and
+# written to the file with tofile.
+# ===========================================================================
+if numpy is not None:
+    VPOINT_DTYPE = numpy.dtype([
+            ('Point', '<f4', 3),
+            ])
+    VVERTEX_DTYPE = numpy.dtype([
+            ('PointIndex', '<u2'),
+            ('Padding0', '<u2'),
+            ('U', '<f4'),
+            ('V', '<f4'),
+            ('MatIndex', 'u1'),
+            ('Reserved', 'u1'),
+            ('Padding1', '<u2'),
+            ])
+    VTRIANGLE_DTYPE = numpy.dtype([
+            ('WedgeIndex', '<u2', 3),
+            ('MatIndex', 'u1'),
+            ('AuxMatIndex', 'u1'),
+            ('SmoothingGroups', '<u4'),
+            ])
+    VRAWBONEINFLUENCE_DTYPE = numpy.dtype([
+            ('Weight', '<f4'),
+            ('PointIndex', '<i4'),
+            ('BoneIndex', '<i4'),
+            ])
+    VQUATANIMKEY_DTYPE = numpy.dtype([
+            ('Position', '<f4', 3),
+            ('Orientation', '<f4', 4),
+            ('Time', '<f4'),
+            ])
+    # PSKFile.VertexGroups values: point index and weight
+    VERTEXGROUP_DTYPE = numpy.dtype([
+            ('PointIndex', '<i4'),
+            ('Weight', '<f4'),
+            ])
+
+
+def unique_rows(*columns):
+    """
+    Deduplicate the rows formed by columns of equal length, numbered in
+    order of first appearance like ObjMap. Returns the new index of every
+    row and the first row of every unique one.
+    """
+    count = len(columns[0])
+    if count == 0:
+        return numpy.zeros(0, dtype=numpy.intp), numpy.zeros(0, dtype=numpy.intp)
+
+    order = numpy.lexsort(columns[::-1])
+    is_first = numpy.zeros(count, dtype=bool)
+    is_first[0] = True
+    for column in columns:
+        column = column[order]
+        is_first[1:] |= column[1:] != column[:-1]
+
+    group = numpy.cumsum(is_first) - 1
+    first = order[is_first]  # lexsort is stable, lowest row first
+    rank = numpy.argsort(first)
+    remap = numpy.empty(len(first), dtype=numpy.intp)
+    remap[rank] = numpy.arange(len(first))
+
+    index = numpy.empty(count, dtype=numpy.intp)
+    index[order] = remap[group]
+    return index, first[rank]
+
+
+def matrix_to_quaternion(matrix):
+    """
+    Quaternions (W, X, Y, Z) of an array of 3x3 matrices,
+    as Matrix.to_quaternion().normalized() does for each one.
+    """
+    m = matrix / numpy.linalg.norm(matrix, axis=-2, keepdims=True)
+    m00 = m[..., 0, 0]
+    m11 = m[..., 1, 1]
+    m22 = m[..., 2, 2]
+    quat = numpy.empty(m.shape[:-2] + (4,))
+
+    trace = 0.25 * (1.0 + m00 + m11 + m22)
+    use_w = trace > 1e-4
+    use_x = ~use_w & (m00 > m11) & (m00 > m22)
+    use_y = ~use_w & ~use_x & (m11 > m22)
+    use_z = ~use_w & ~use_x & ~use_y
+
+    r = m[use_w]
+    s = numpy.sqrt(trace[use_w])
+    quat[use_w] = numpy.stack((s,
+                               (r[:, 2, 1] - r[:, 1, 2]) / (4.0 * s),
+                               (r[:, 0, 2] - r[:, 2, 0]) / (4.0 * s),
+                               (r[:, 1, 0] - r[:, 0, 1]) / (4.0 * s)), axis=-1)
+    r = m[use_x]
+    s = 2.0 * numpy.sqrt(1.0 + r[:, 0, 0] - r[:, 1, 1] - r[:, 2, 2])
+    quat[use_x] = numpy.stack(((r[:, 2, 1] - r[:, 1, 2]) / s,
+                               0.25 * s,
+                               (r[:, 0, 1] + r[:, 1, 0]) / s,
+                               (r[:, 0, 2] + r[:, 2, 0]) / s), axis=-1)
+    r = m[use_y]
+    s = 2.0 * numpy.sqrt(1.0 + r[:, 1, 1] - r[:, 0, 0] - r[:, 2, 2])
+    quat[use_y] = numpy.stack(((r[:, 0, 2] - r[:, 2, 0]) / s,
+                               (r[:, 0, 1] + r[:, 1, 0]) / s,
+                               0.25 * s,
+                               (r[:, 1, 2] + r[:, 2, 1]) / s), axis=-1)
+    r = m[use_z]
+    s = 2.0 * numpy.sqrt(1.0 + r[:, 2, 2] - r[:, 0, 0] - r[:, 1, 1])
+    quat[use_z] = numpy.stack(((r[:, 1, 0] - r[:, 0, 1]) / s,
+                               (r[:, 0, 2] + r[:, 2, 0]) / s,
+                               (r[:, 1, 2] + r[:, 2, 1]) / s,
+                               0.25 * s), axis=-1)
+
+    return quat / numpy.linalg.norm(quat, axis=-1, keepdims=True)
+
+
 import binascii
 
 
@@ -1127,13 +1434,32 @@ def parse_mesh(mesh, psk):
     # object_material_index = mesh.active_material_index
     # FIXME ^ this is redundant due to "= face.material_index" in face loop
 
+    if numpy is not None:
+        parse_mesh_arrays(mesh, psk)
+    else:
+        parse_mesh_objects(mesh, psk)
+
+    # remove the temporary triangulated mesh
+    if bpy.context.scene.udk_option_triangulate is True:
+        verbose("Removing temporary triangle mesh: {}".format(mesh.name))
+        bpy.ops.object.mode_set(mode='OBJECT')    # OBJECT mode
+        mesh.parent = None                        # unparent to avoid phantom links
+        bpy.context.scene.objects.unlink(mesh)    # unlink
+
+
+# ===========================================================================
+# Faces, points, wedges and vertex groups of the triangulated mesh,
+# one struct object at a time (used without numpy)
+# ===========================================================================
+def parse_mesh_objects(mesh, psk):
+
     wedges = ObjMap()
     points = ObjMap()  # vertex
     points_linked = {}
 
     discarded_face_count = 0
-    sys.setrecursionlimit(1000000)
-    smoothgroup_list = parse_smooth_groups(mesh.data)
+    if bpy.context.scene.udk_option_smoothing_groups:
+        face_smoothgroup_ids = smooth_group_ids(mesh.data)
 
     print("{} faces".format(len(mesh.data.tessfaces)))
 
@@ -1142,11 +1468,8 @@ def parse_mesh(mesh, psk):
     for face in mesh.data.tessfaces:
 
         smoothgroup_id = 0x80000000
-
-        for smooth_group in smoothgroup_list:
-            if smooth_group.contains_face(face):
-                smoothgroup_id = smooth_group.id
-                break
+        if bpy.context.scene.udk_option_smoothing_groups:
+            smoothgroup_id = face_smoothgroup_ids[face.index]
 
         # modified by VendorX
         object_material_index = face.material_index
@@ -1392,12 +1715,174 @@ def parse_mesh(mesh, psk):
         # print("Add Vertex Group:",obj_vertex_group.name, " No. Points:",len(vertex_list))
         psk.VertexGroups[obj_vertex_group.name] = vertex_list
 
-    # remove the temporary triangulated mesh
-    if bpy.context.scene.udk_option_triangulate is True:
-        verbose("Removing temporary triangle mesh: {}".format(mesh.name))
-        bpy.ops.object.mode_set(mode='OBJECT')    # OBJECT mode
-        mesh.parent = None                        # unparent to avoid phantom links
-        bpy.context.scene.objects.unlink(mesh)    # unlink
+
+# ===========================================================================
+# Columnar version of parse_mesh_objects, the same points, wedges, faces
+# and vertex groups computed for all faces at once
+# ===========================================================================
+def parse_mesh_arrays(mesh, psk):
+
+    scene = bpy.context.scene
+    data = mesh.data
+    face_count = len(data.tessfaces)
+
+    print("{} faces".format(face_count))
+    print("Smooth groups active:", scene.udk_option_smoothing_groups)
+
+    co = numpy.empty(len(data.vertices) * 3, dtype=numpy.float32)
+    data.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3)
+
+    face_verts = numpy.empty(face_count * 4, dtype=numpy.int32)
+    data.tessfaces.foreach_get("vertices_raw", face_verts)
+    face_verts = face_verts.reshape(-1, 4)
+
+    # the 4th vertex index of a tessface is 0 only for triangles
+    quads = numpy.flatnonzero(face_verts[:, 3])
+    if len(quads):
+        raise Error("Non-triangular face (%i)" % len(data.tessfaces[int(quads[0])].vertices))
+    face_verts = face_verts[:, :3]
+
+    face_normals = numpy.empty(face_count * 3, dtype=numpy.float32)
+    data.tessfaces.foreach_get("normal", face_normals)
+    face_mats = numpy.empty(face_count, dtype=numpy.int32)
+    data.tessfaces.foreach_get("material_index", face_mats)
+    face_smooth = numpy.empty(face_count, dtype=numpy.int32)
+    data.tessfaces.foreach_get("use_smooth", face_smooth)
+
+    face_groups = numpy.zeros(face_count, dtype=numpy.uint32)
+    if scene.udk_option_smoothing_groups:
+        face_groups[:] = smooth_group_ids(data)
+
+    # discard lines, see is_1d_face
+    face_co = co[face_verts]
+    is_1d = ((face_co[:, 0] == face_co[:, 1]).all(axis=1) |
+             (face_co[:, 1] == face_co[:, 2]).all(axis=1) |
+             (face_co[:, 2] == face_co[:, 0]).all(axis=1))
+    faces = numpy.flatnonzero(~is_1d)
+    discarded_face_count = face_count - len(faces)
+
+    # dot the blender normal against the normal in blender order (see parse_mesh_objects)
+    face_co = face_co[faces].astype(numpy.float64)
+    tnorm = numpy.cross(face_co[:, 1] - face_co[:, 0], face_co[:, 2] - face_co[:, 1])
+    dot = (face_normals.reshape(-1, 3)[faces] * tnorm).sum(axis=1)
+
+    coplanar = numpy.flatnonzero(dot == 0)
+    if len(coplanar):
+        verts = [data.vertices[int(i)] for i in face_verts[faces[coplanar[0]]]]
+        for vert in verts:
+            vert.select = True
+        raise Error("Normal coplanar with face! points: %s, %s, %s" % tuple(str(vert.co) for vert in verts))
+
+    # get or create the current material of every face: only the faces with
+    # an index past the materials created so far add one
+    mats = face_mats[faces]
+    face = 0
+    while True:
+        missing = numpy.flatnonzero(mats[face:] >= len(psk.Materials.Data))
+        if not len(missing):
+            break
+        face += missing[0]
+        psk.GetMatByIndex(int(mats[face]))
+        face += 1
+
+    # transform positions for export, equal positions get one id
+    matrix = numpy.array(mesh.matrix_local, dtype=numpy.float64)
+    pos = numpy.dot(co, matrix[:3, :3].T) + matrix[:3, 3]
+    if scene.udk_option_scale < 0 or scene.udk_option_scale > 1:
+        pos *= scene.udk_option_scale
+    pos = pos.astype(numpy.float32) + numpy.float32(0.0)  # -0.0 == 0.0
+    vert_pos, pos_first = unique_rows(pos[:, 0], pos[:, 1], pos[:, 2])
+
+    # points: position and smoothing group of every face corner
+    corner_verts = face_verts[faces].ravel()
+    corner_pos = vert_pos[corner_verts]
+    corner_mats = numpy.repeat(mats, 3)
+    corner_groups = numpy.repeat(face_groups[faces], 3)
+    corner_points, point_first = unique_rows(corner_pos, corner_groups)
+
+    print("{} points".format(len(point_first)))
+
+    points = numpy.zeros(len(point_first), dtype=VPOINT_DTYPE)
+    points['Point'] = pos[corner_verts[point_first]]
+    psk.Points.AddArray(points)
+
+    if len(point_first) > 32767:
+        raise Error("Mesh vertex limit exceeded! {} > 32767".format(len(point_first)))
+
+    # wedges: point, UV and material of every face corner
+    if len(data.uv_textures) > 0:
+        uv = numpy.empty(face_count * 8, dtype=numpy.float32)
+        data.tessface_uv_textures.active.data.foreach_get("uv_raw", uv)
+        uv = uv.reshape(-1, 4, 2)[faces, :3].reshape(-1, 2).astype(numpy.float64)
+    else:
+        uv = numpy.zeros((len(corner_verts), 2))
+
+    # flip V coordinate, MAGIC-2
+    u = uv[:, 0]
+    v = 1.0 - uv[:, 1]
+    if scene.udk_option_clamp_uv:
+        u = u.clip(0.0, 1.0)
+        v = v.clip(0.0, 1.0)
+    corner_wedges, wedge_first = unique_rows(corner_points, u + 0.0, v + 0.0, corner_mats)
+
+    print("{} wedges".format(len(wedge_first)))
+
+    wedges = numpy.zeros(len(wedge_first), dtype=VVERTEX_DTYPE)
+    wedges['PointIndex'] = corner_points[wedge_first]
+    wedges['U'] = u[wedge_first]
+    wedges['V'] = v[wedge_first]
+    wedges['MatIndex'] = corner_mats[wedge_first]
+    psk.Wedges.AddArray(wedges)
+
+    # faces: if the dot product above > 0, order the vertices 2, 1, 0
+    tri_wedges = corner_wedges.reshape(-1, 3)
+    tri_wedges[dot > 0] = tri_wedges[dot > 0, ::-1]
+
+    tris = numpy.zeros(len(faces), dtype=VTRIANGLE_DTYPE)
+    tris['WedgeIndex'] = tri_wedges
+    tris['MatIndex'] = mats
+    if scene.udk_option_smoothing_groups:
+        tris['SmoothingGroups'] = face_groups[faces]
+    else:
+        tris['SmoothingGroups'] = face_smooth[faces] != 0
+    psk.Faces.AddArray(tris)
+
+    # alert the user to degenerate face issues
+    if discarded_face_count > 0:
+        print("WARNING: Mesh contained degenerate faces (non-planar)")
+        print("      Discarded {} faces".format(discarded_face_count))
+
+    # vertex groups: every point at the position of a vertex gets its weight,
+    # points are looked up by position in point_starts/point_order
+    point_pos = corner_pos[point_first]
+    point_order = numpy.argsort(point_pos, kind='mergesort')
+    point_starts = numpy.searchsorted(point_pos[point_order], numpy.arange(len(pos_first) + 1))
+
+    group_weights = {vertex_group.index: ([], []) for vertex_group in mesh.vertex_groups}
+    for vertex in data.vertices:
+        for vgroup in vertex.groups:
+            if vgroup.group in group_weights:
+                verts, weights = group_weights[vgroup.group]
+                verts.append(vertex.index)
+                weights.append(vgroup.weight)
+
+    for obj_vertex_group in mesh.vertex_groups:
+        verbose("obj_vertex_group.name={}".format(obj_vertex_group.name))
+
+        verts, weights = group_weights[obj_vertex_group.index]
+        verts_pos = vert_pos[numpy.array(verts, dtype=numpy.intp)]
+        counts = point_starts[verts_pos + 1] - point_starts[verts_pos]
+        if not counts.all():
+            print("Error link points! ({} vertices without points)".format(len(counts) - numpy.count_nonzero(counts)))
+
+        rows = numpy.repeat(numpy.arange(len(verts)), counts)
+        offsets = numpy.arange(len(rows)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+
+        vertex_list = numpy.zeros(len(rows), dtype=VERTEXGROUP_DTYPE)
+        vertex_list['PointIndex'] = point_order[point_starts[verts_pos[rows]] + offsets]
+        vertex_list['Weight'] = numpy.array(weights, dtype=numpy.float32)[rows]
+        psk.VertexGroups[obj_vertex_group.name] = vertex_list
 
 
 # ===========================================================================
@@ -1487,15 +1972,22 @@ def recurse_bone(bone, bones, psk, psa, parent_id, parent_matrix, indent=""):
         vertex_list = psk.VertexGroups[bone.name]
         # print("vertex list:", len(vertex_list), " of >" ,bone.name)
 
-        for vertex_data in vertex_list:
-            point_index = vertex_data[0]
-            vertex_weight = vertex_data[1]
-            influence = VRawBoneInfluence()
-            influence.Weight = vertex_weight
-            influence.BoneIndex = bone_id
-            influence.PointIndex = point_index
-            # print ("   AddInfluence to vertex {}, weight={},".format(point_index, vertex_weight))
-            psk.AddInfluence(influence)
+        if numpy is not None and isinstance(vertex_list, numpy.ndarray):
+            influences = numpy.zeros(len(vertex_list), dtype=VRAWBONEINFLUENCE_DTYPE)
+            influences['Weight'] = vertex_list['Weight']
+            influences['PointIndex'] = vertex_list['PointIndex']
+            influences['BoneIndex'] = bone_id
+            psk.Influences.AddArray(influences)
+        else:
+            for vertex_data in vertex_list:
+                point_index = vertex_data[0]
+                vertex_weight = vertex_data[1]
+                influence = VRawBoneInfluence()
+                influence.Weight = vertex_weight
+                influence.BoneIndex = bone_id
+                influence.PointIndex = point_index
+                # print ("   AddInfluence to vertex {}, weight={},".format(point_index, vertex_weight))
+                psk.AddInfluence(influence)
     else:
         status = "No vertex group"
         # FIXME overwriting previous status error?
@@ -1591,57 +2083,61 @@ def parse_animation(armature, udk_bones, actions_to_export, psa):
         # NOTE: posebone.bone references the obj/edit bone
         # REMOVED: unique_bone_indexes is redundant?
 
-        # frame loop...
-        for i in range(frame_count):
+        if numpy is not None:
+            psa.RawKeys.AddArray(sample_action_keys(context.scene, armature, ordered_bones, scene_range, anim_rate))
+            raw_frame_index += frame_count
+        else:
+            # frame loop...
+            for i in range(frame_count):
 
-            frame = scene_range[i]
+                frame = scene_range[i]
 
-            # verbose("FRAME {}".format(i), i) # test loop sampling
+                # verbose("FRAME {}".format(i), i) # test loop sampling
 
-            # advance to frame (automatically updates the pose)
-            context.scene.frame_set(frame)
+                # advance to frame (automatically updates the pose)
+                context.scene.frame_set(frame)
 
-            # compute the key for each bone
-            for bone_data in ordered_bones:
+                # compute the key for each bone
+                for bone_data in ordered_bones:
 
-                bone_index = bone_data[0]
-                pose_bone = bone_data[1]
-                pose_bone_matrix = mathutils.Matrix(pose_bone.matrix)
+                    bone_index = bone_data[0]
+                    pose_bone = bone_data[1]
+                    pose_bone_matrix = mathutils.Matrix(pose_bone.matrix)
 
-                if pose_bone.parent is not None:
-                    pose_bone_parent_matrix = mathutils.Matrix(pose_bone.parent.matrix)
-                    pose_bone_matrix = pose_bone_parent_matrix.inverted() * pose_bone_matrix
+                    if pose_bone.parent is not None:
+                        pose_bone_parent_matrix = mathutils.Matrix(pose_bone.parent.matrix)
+                        pose_bone_matrix = pose_bone_parent_matrix.inverted() * pose_bone_matrix
 
-                head = pose_bone_matrix.to_translation()
-                quat = pose_bone_matrix.to_quaternion().normalized()
+                    head = pose_bone_matrix.to_translation()
+                    quat = pose_bone_matrix.to_quaternion().normalized()
 
-                if pose_bone.parent is not None:
-                    quat = make_fquat(quat)
-                else:
-                    quat = make_fquat_default(quat)
+                    if pose_bone.parent is not None:
+                        quat = make_fquat(quat)
+                    else:
+                        quat = make_fquat_default(quat)
 
-                # scale animation position here?
-                if bpy.context.scene.udk_option_scale < 0 or bpy.context.scene.udk_option_scale > 1:
-                    head.x = head.x * bpy.context.scene.udk_option_scale
-                    head.y = head.y * bpy.context.scene.udk_option_scale
-                    head.z = head.z * bpy.context.scene.udk_option_scale
+                    # scale animation position here?
+                    if bpy.context.scene.udk_option_scale < 0 or bpy.context.scene.udk_option_scale > 1:
+                        head.x = head.x * bpy.context.scene.udk_option_scale
+                        head.y = head.y * bpy.context.scene.udk_option_scale
+                        head.z = head.z * bpy.context.scene.udk_option_scale
 
-                vkey = VQuatAnimKey()
-                vkey.Position.X = head.x
-                vkey.Position.Y = head.y
-                vkey.Position.Z = head.z
-                vkey.Orientation = quat
+                    vkey = VQuatAnimKey()
+                    vkey.Position.X = head.x
+                    vkey.Position.Y = head.y
+                    vkey.Position.Z = head.z
+                    vkey.Orientation = quat
 
-                # frame delta = 1.0 / fps
-                vkey.Time = 1.0 / anim_rate  # according to C++ header this is "disregarded"
+                    # frame delta = 1.0 / fps
+                    vkey.Time = 1.0 / anim_rate  # according to C++ header this is "disregarded"
 
-                psa.AddRawKey(vkey)
+                    psa.AddRawKey(vkey)
 
-            # END for bone_data in ordered_bones
+                # END for bone_data in ordered_bones
 
-            raw_frame_index += 1
+                raw_frame_index += 1
 
-        # END for i in range(frame_count)
+            # END for i in range(frame_count)
 
         # REMOVED len(unique_bone_indexes)
         anim.TotalBones = len(ordered_bones)
@@ -1659,6 +2155,49 @@ def parse_animation(armature, udk_bones, actions_to_export, psa):
     context.scene.frame_set(restoreFrame)
 
 
+# ===========================================================================
+# Columnar version of the frame loop in parse_animation: the matrices of all
+# pose bones are read with one foreach_get per frame, then the keys of the
+# whole action are computed at once
+# ===========================================================================
+def sample_action_keys(scene, armature, ordered_bones, scene_range, anim_rate):
+
+    pose_bones = armature.pose.bones
+    bones = [bone_data[1] for bone_data in ordered_bones]
+    bone_indices = [pose_bones.find(pose_bone.name) for pose_bone in bones]
+    has_parent = numpy.array([pose_bone.parent is not None for pose_bone in bones], dtype=bool)
+    parent_indices = [pose_bones.find(pose_bone.parent.name) for pose_bone in bones
+                      if pose_bone.parent is not None]
+
+    frame_count = len(scene_range)
+    matrices = numpy.empty((frame_count, len(pose_bones) * 16), dtype=numpy.float32)
+    for i, frame in enumerate(scene_range):
+        # advance to frame (automatically updates the pose)
+        scene.frame_set(frame)
+        pose_bones.foreach_get("matrix", matrices[i])
+
+    # matrices are stored column by column
+    matrices = matrices.reshape(frame_count, -1, 4, 4).transpose(0, 1, 3, 2).astype(numpy.float64)
+
+    local = matrices[:, bone_indices]
+    if len(parent_indices):
+        local[:, has_parent] = numpy.matmul(numpy.linalg.inv(matrices[:, parent_indices]), local[:, has_parent])
+
+    head = local[..., :3, 3]
+    if scene.udk_option_scale < 0 or scene.udk_option_scale > 1:
+        head = head * scene.udk_option_scale
+    quat = matrix_to_quaternion(local[..., :3, :3])
+
+    keys = numpy.zeros((frame_count, len(bones)), dtype=VQUATANIMKEY_DTYPE)
+    keys['Position'] = head
+    # flip handedness of child bones, see make_fquat and make_fquat_default
+    keys['Orientation'][..., :3] = quat[..., 1:] * numpy.where(has_parent, -1.0, 1.0)[:, None]
+    keys['Orientation'][..., 3] = quat[..., 0]
+    # frame delta = 1.0 / fps
+    keys['Time'] = 1.0 / anim_rate
+    return keys.ravel()
+
+
 # ===========================================================================
 # Collate actions to be exported
 # Modify this to filter for one, some or all actions. For now use all.
@@ -1906,7 +2445,7 @@ def export(filepath):
         print("Skeletal mesh data...")
         psk.PrintOut()
         file = open(psk_filename, "wb")
-        file.write(psk.dump())
+        psk.write(file)
         file.close()
         print("Exported: " + psk_filename)
         print()
@@ -1916,7 +2455,7 @@ def export(filepath):
         if not psa.IsEmpty():
             psa.PrintOut()
             file = open(psa_filename, "wb")
-            file.write(psa.dump())
+            psa.write(file)
             file.close()
             print("Exported: " + psa_filename)
         else:
@@ -18,12 +18,131 @@
 
 # <pep8 compliant>
 
+from itertools import chain
+
+try:
+    import numpy as np
+    NUMPY = True
+except ImportError:
+    NUMPY = False
+
 
 def line_merger(lines, precision=6):
+    if NUMPY:
+        return _array_line_merger(lines, precision)
     merger = _LineMerger(lines, precision)
     return merger.polylines
 
 
+def _array_line_merger(lines, precision):
+    """
+    Array based variant of _LineMerger, with the same result.
+    Endpoints are quantized to integer keys, grouped by sorting and the resulting segment graph is
+    stored as index arrays (CSR adjacency), so memory stays proportional to the number of LINE
+    entities instead of holding a tuple, a set entry and a list per point.
+    """
+    lines = list(lines)
+    if not lines:
+        return []
+    dim = max(max(len(line.start), len(line.end)) for line in lines)
+    n = len(lines)
+
+    def _coords(line):
+        for p in (line.start, line.end):
+            yield from p
+            for i in range(len(p), dim):
+                yield 0.0
+
+    coords = np.fromiter(chain.from_iterable(_coords(line) for line in lines),
+                         dtype=np.float64, count=2 * n * dim)
+    scale = 10.0 ** precision
+    keys = np.rint(coords.reshape(2 * n, dim) * scale).astype(np.int64)
+    del coords
+
+    # group equal endpoints: lexsort the keys and number the runs of identical rows,
+    # vertex ids follow the order of the points
+    order = np.lexsort(keys.T[::-1])
+    sorted_keys = keys[order]
+    first = np.ones(2 * n, dtype=bool)
+    first[1:] = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+    vertex_ids = np.empty(2 * n, dtype=np.int64)
+    vertex_ids[order] = np.cumsum(first) - 1
+    vertices = sorted_keys[first]
+    del keys, sorted_keys, order, first
+    nv = len(vertices)
+
+    # segments as ordered vertex id pairs, zero length segments and doubles removed,
+    # numbered in order of their first line like the segments of _LineMerger
+    start, end = vertex_ids[0::2], vertex_ids[1::2]
+    valid = start != end
+    lo = np.minimum(start, end)[valid]
+    hi = np.maximum(start, end)[valid]
+    segment_keys, first_line = np.unique(lo * nv + hi, return_index=True)
+    segment_keys = segment_keys[np.argsort(first_line)]
+    lo = segment_keys // nv
+    hi = segment_keys % nv
+    del vertex_ids, start, end, valid, segment_keys, first_line
+    m = len(lo)
+    if m == 0:
+        return []
+
+    # CSR adjacency: segments incident to vertex v are adjacency[offsets[v]:offsets[v + 1]],
+    # in segment order
+    ends = np.concatenate((lo, hi))
+    segments = np.tile(np.arange(m), 2)
+    adjacency = segments[np.lexsort((segments, ends))].tolist()
+    offsets = np.zeros(nv + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=nv), out=offsets[1:])
+    offsets = offsets.tolist()
+    del ends, segments
+    lo = lo.tolist()
+    hi = hi.tolist()
+
+    used = bytearray(m)
+    cursor = offsets[:-1]  # per vertex: first adjacency entry that may still be unused
+
+    def extend(point):
+        p = cursor[point]
+        stop = offsets[point + 1]
+        while p < stop and used[adjacency[p]]:
+            p += 1
+        cursor[point] = p
+        if p == stop:
+            return -1
+        s = adjacency[p]
+        used[s] = 1
+        return hi[s] if lo[s] == point else lo[s]
+
+    # same extension order as _LineMerger.merge_lines: start and end alternately
+    chains = []
+    for s in range(m):
+        if used[s]:
+            continue
+        used[s] = 1
+        head = [lo[s]]  # reversed start extension
+        tail = [hi[s]]
+        extend_start = extend_end = True
+        while extend_start or extend_end:
+            if extend_start:
+                point = extend(head[-1])
+                if point != -1:
+                    head.append(point)
+                else:
+                    extend_start = False
+            if extend_end:
+                point = extend(tail[-1])
+                if point != -1:
+                    tail.append(point)
+                else:
+                    extend_end = False
+        head.reverse()
+        head.extend(tail)
+        chains.append(head)
+
+    points = [tuple(round(c / scale, precision) for c in v) for v in vertices.tolist()]
+    return [[points[i] for i in c] for c in chains]
+
+
 def _round_point(point, precision):
     return tuple(round(c, precision) for c in point)
 
@@ -31,6 +150,7 @@ def _round_point(point, precision):
 class _LineMerger:
     def __init__(self, lines, precision):
         self.segments = set()  # single lines as tuples: ((sx, sy[, sz]), (ex, ey[, ez]))
+        self.segment_order = list()  # segments in order of their first line
         self.used_segments = set()
         self.points = dict()  # key: point -> value: list of segments with this point as start or end point
         self.precision = precision
@@ -53,6 +173,7 @@ class _LineMerger:
         if segment in self.segments:
             return  # this segment already exist
         self.segments.add(segment)
+        self.segment_order.append(segment)
         self.add_point(start, segment)
         self.add_point(end, segment)
 
@@ -90,8 +211,9 @@ class _LineMerger:
             return None
 
         polylines = []
-        while len(self.segments):
-            segment = self.segments.pop()  # take an arbitrary segment
+        for segment in self.segment_order:  # take the first unused segment
+            if segment in self.used_segments:
+                continue
             self.mark_as_used_segment(segment)
             polyline = list(segment)  # start a new polyline
             extend_start = True
@@ -111,3 +233,4 @@ class _LineMerger:
                         extend_end = False
             polylines.append(polyline)
         return polylines
+
@@ -64,11 +64,17 @@ bl_info= {
 import os
 import struct
 import chunk
+import mmap
 
 import bpy
 import mathutils
 from mathutils.geometry import tessellate_polygon
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class _obj_layer(object):
     __slots__ = (
@@ -147,6 +153,38 @@ class _obj_surf(object):
         self.smooth= False  # Surface Smoothing
 
 
+class _obj_pols(object):
+    """
+    The polygons of a layer read by read_lwo2_mapped, the point indexes of
+    all polygons are kept in one array. Indexing gives the point indexes of
+    a single polygon as a list, like the pols list of other layers.
+    """
+    __slots__ = (
+        "counts",
+        "starts",
+        "verts",
+        )
+
+    def __init__(self):
+        self.counts= numpy.zeros(0, dtype=numpy.int32)
+        self.starts= numpy.zeros(0, dtype=numpy.int32)
+        self.verts= numpy.zeros(0, dtype=numpy.int32)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, fi):
+        start= self.starts[fi]
+        return self.verts[start:start + self.counts[fi]].tolist()
+
+    def extend(self, counts, verts):
+        """Add the polygons of another POLS chunk."""
+        starts= numpy.cumsum(counts) - counts + len(self.verts)
+        self.counts= numpy.concatenate((self.counts, counts)).astype(numpy.int32)
+        self.starts= numpy.concatenate((self.starts, starts)).astype(numpy.int32)
+        self.verts= numpy.concatenate((self.verts, verts)).astype(numpy.int32)
+
+
 def load_lwo(filename,
              context,
              ADD_SUBD_MOD=True,
@@ -168,7 +206,13 @@ def load_lwo(filename,
     surfs= {}
     tags= []
     # Gather the object data using the version specific handler.
-    if chunk_name == b'LWO2':
+    if chunk_name == b'LWO2' and numpy is not None:
+        data= mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            read_lwo2_mapped(data, filename, layers, surfs, tags, LOAD_HIDDEN, SKEL_TO_ARM)
+        finally:
+            data.close()
+    elif chunk_name == b'LWO2':
         read_lwo2(file, filename, layers, surfs, tags, ADD_SUBD_MOD, LOAD_HIDDEN, SKEL_TO_ARM)
     elif chunk_name == b'LWOB' or chunk_name == b'LWLO':
         # LWOB and LWLO are the old format, LWLO is a layered object.
@@ -316,6 +360,112 @@ def read_lwob(file, filename, layers, surfs, tags, add_subd_mod):
             rootchunk.skip()
 
 
+def index_lwo2(data):
+    """
+    Index the chunks of a memory-mapped LWO2 file in one pass.
+
+    Returns the layer layout as a list of [layr, chunks] pairs, where layr is
+    the (offset, length) of a LAYR chunk (None for the chunks before the first
+    layer) and chunks are the (name, offset, length) of the chunks following it.
+    """
+    layout= [[None, []]]
+    offset= 12
+    data_len= len(data)
+
+    while offset + 8 <= data_len:
+        name, length= struct.unpack_from(">4sL", data, offset)
+        offset+= 8
+        length= min(length, data_len - offset)
+        if name == b'LAYR':
+            layout.append([(offset, length), []])
+        else:
+            layout[-1][1].append((name, offset, length))
+        # Chunks are padded to an even length.
+        offset+= length + (length & 1)
+
+    return layout
+
+
+def read_lwo2_mapped(data, filename, layers, surfs, tags, load_hidden, skel_to_arm):
+    """
+    Read version 2 file from a memory map, the same as read_lwo2 but the
+    points, polygons and vertex maps are decoded as numpy arrays.
+    """
+    last_pols_count= 0
+    just_read_bones= False
+    print("Importing LWO: " + filename + "\nLWO v2 Format")
+
+    for layr, layr_chunks in index_lwo2(data):
+        handle_layer= True
+        if layr is not None:
+            offset, length= layr
+            handle_layer= read_layr(data[offset:offset+length], layers, load_hidden)
+            if handle_layer:
+                layers[-1].pnts= numpy.zeros((0, 3), dtype=numpy.float32)
+                layers[-1].pols= _obj_pols()
+
+        for chunk_name, offset, length in layr_chunks:
+            end= offset + length
+
+            if chunk_name == b'TAGS':
+                read_tags(data[offset:end], tags)
+            elif chunk_name == b'SURF':
+                read_surf(data[offset:end], surfs)
+            elif not handle_layer:
+                continue
+            elif chunk_name == b'PNTS':
+                read_pnts_array(data, offset, end, layers)
+            elif chunk_name == b'VMAP':
+                vmap_type= data[offset:offset+4]
+                offset+= 4
+
+                if vmap_type == b'WGHT':
+                    read_weightmap_array(data, offset, end, layers)
+                elif vmap_type == b'MORF':
+                    read_morph_array(data, offset, end, layers, False)
+                elif vmap_type == b'SPOT':
+                    read_morph_array(data, offset, end, layers, True)
+                elif vmap_type == b'TXUV':
+                    read_uvmap_array(data, offset, end, layers)
+                elif vmap_type == b'RGB ' or vmap_type == b'RGBA':
+                    read_colmap_array(data, offset, end, layers)
+
+            elif chunk_name == b'VMAD':
+                vmad_type= data[offset:offset+4]
+                offset+= 4
+
+                if vmad_type == b'TXUV':
+                    read_uv_vmad_array(data, offset, end, layers, last_pols_count)
+                elif vmad_type == b'RGB ' or vmad_type == b'RGBA':
+                    read_color_vmad_array(data, offset, end, layers, last_pols_count)
+                elif vmad_type == b'WGHT':
+                    read_weight_vmad_array(data, offset, end, layers)
+
+            elif chunk_name == b'POLS':
+                face_type= data[offset:offset+4]
+                offset+= 4
+                just_read_bones= False
+                if face_type == b'FACE' or face_type == b'PTCH' or face_type == b'SUBD':
+                    last_pols_count= read_pols_array(data, offset, end, layers)
+                    if face_type != b'FACE':
+                        layers[-1].has_subds= True
+                elif face_type == b'BONE':
+                    read_bones(data[offset:end], layers)
+                    just_read_bones= True
+
+            elif chunk_name == b'PTAG':
+                tag_type= data[offset:offset+4]
+                offset+= 4
+                if tag_type == b'SURF' and not just_read_bones:
+                    # Ignore the surface data if we just read a bones chunk.
+                    read_surf_tags_array(data, offset, end, layers, last_pols_count)
+                elif skel_to_arm:
+                    if tag_type == b'BNUP':
+                        read_bone_tags(data[offset:end], layers, tags, 'BNUP')
+                    elif tag_type == b'BONE':
+                        read_bone_tags(data[offset:end], layers, tags, 'BONE')
+
+
 def read_lwostring(raw_name):
     """Parse a zero-padded string."""
 
@@ -874,6 +1024,274 @@ def read_surf_5(surf_bytes, object_surfs):
     object_surfs[surf.name]= surf
 
 
+# Array readers, used by read_lwo2_mapped.
+#
+# The chunk bodies are read as big-endian numpy views of the memory map.
+# VX indexes are 2 bytes, or 4 when the first byte is 0xFF, so records that
+# contain them have a variable size and the position of a record depends on
+# all the records before it. Instead of walking them one by one the possible
+# end of a record is computed for every 2 byte word of the chunk, the records
+# are then found by following these jumps from the start (see chain_positions).
+
+def chain_positions(jump):
+    """
+    Return the positions visited when following jump from position 0.
+
+    jump holds the next position for every position, always larger than the
+    position itself, positions past the end terminate the chain. The jumps are
+    doubled each round (pointer jumping), so the chain is found in log(n)
+    numpy operations.
+    """
+    jump_len= len(jump)
+    jump= numpy.minimum(numpy.append(jump, jump_len), jump_len)
+    visited= numpy.zeros(1, dtype=jump.dtype)
+
+    while True:
+        reached= numpy.union1d(visited, jump[visited])
+        if len(reached) == len(visited):
+            break
+        visited= reached
+        jump= jump[jump]
+
+    return visited[visited < jump_len]
+
+
+def read_words(data, offset, end):
+    """The chunk data from offset to end as big-endian 16bit words."""
+    return numpy.frombuffer(data, dtype='>u2', count=(end - offset) // 2, offset=offset).astype(numpy.int32)
+
+
+def read_vx_array(words, pos):
+    """Decode the VX indexes starting at the word positions pos."""
+    index= words[pos]
+    wide= (index >> 8) == 0xFF
+    if wide.any():
+        tail= words[numpy.minimum(pos[wide] + 1, len(words) - 1)]
+        index[wide]= ((index[wide] & 0xFF) << 16) | tail
+
+    return index
+
+
+def read_float_array(words, pos, count):
+    """Decode count big-endian floats starting at the word positions pos."""
+    pos= pos[:, None] + numpy.arange(0, count * 2, 2)
+    bits= (words[pos].astype(numpy.uint32) << 16) | words[pos + 1].astype(numpy.uint32)
+    return bits.view(numpy.float32)
+
+
+def read_vx_records(words, vx_fields, value_len):
+    """
+    Find the records of a stream of vx_fields VX indexes followed by
+    value_len words, returns the list of index arrays and the word
+    positions of the values.
+    """
+    words_len= len(words)
+    record_len= vx_fields + value_len
+    starts= numpy.arange(0, words_len - words_len % record_len, record_len)
+    narrow= words_len % record_len == 0
+    for field in range(vx_fields):
+        narrow= narrow and not ((words[starts + field] >> 8) == 0xFF).any()
+
+    field_pos= []
+    if narrow:
+        # The common case, no index uses the 4 byte form.
+        for field in range(vx_fields):
+            field_pos.append(starts + field)
+        value_pos= starts + vx_fields
+    else:
+        step= numpy.append(1 + ((words >> 8) == 0xFF), 1)
+        ends= numpy.arange(words_len + 1)
+        for field in range(vx_fields):
+            ends= numpy.minimum(ends + step[ends], words_len)
+        ends= ends[:-1] + value_len
+        starts= chain_positions(ends)
+        # Drop a truncated last record.
+        starts= starts[ends[starts] <= words_len]
+
+        pos= starts
+        for field in range(vx_fields):
+            field_pos.append(pos)
+            pos= pos + step[pos]
+        value_pos= pos
+
+    return [read_vx_array(words, pos) for pos in field_pos], value_pos
+
+
+def read_lwostring_array(data, offset, end):
+    """Same as read_lwostring for a string at offset of the memory map."""
+    i= data.find(b'\0', offset, end)
+    return read_lwostring(data[offset:i+1])
+
+
+def read_vmap_array(data, offset, end, vx_fields):
+    """
+    Read a VMAP (vx_fields=1) or VMAD (vx_fields=2) chunk following its
+    type, returns the map name, the index arrays and the values.
+    """
+    dim,= struct.unpack_from(">H", data, offset)
+    offset+= 2
+    name, name_len= read_lwostring_array(data, offset, end)
+    offset+= name_len
+    words= read_words(data, offset, end)
+    indices, value_pos= read_vx_records(words, vx_fields, dim * 2)
+    return name, indices, read_float_array(words, value_pos, dim)
+
+
+def last_unique(ids):
+    """Indexes of the last occurrence of every value of ids, later
+    values replace earlier ones like in the dictionaries of the maps."""
+    ids_rev= ids[::-1]
+    unique_ids, first= numpy.unique(ids_rev, return_index=True)
+    return len(ids) - 1 - first
+
+
+def add_map_array(maps, name, map_kind, entry):
+    """Add a PointMap or FaceMap entry to the uvmaps or colmaps of a layer,
+    later entries replace the values of earlier ones."""
+    if name in maps:
+        maps[name].setdefault(map_kind, []).append(entry)
+    else:
+        maps[name]= {map_kind: [entry]}
+
+
+def read_pnts_array(data, offset, end, object_layers):
+    """Read the layer's points."""
+    print("\tReading Layer ("+object_layers[-1].name+") Points")
+    pnts= numpy.frombuffer(data, dtype='>f4', count=(end - offset) // 12 * 3, offset=offset)
+    # Re-order the points so that the mesh has the right pitch,
+    # the pivot already has the correct order.
+    pnts= pnts.reshape(-1, 3)[:, (0, 2, 1)] - numpy.array(object_layers[-1].pivot, dtype=numpy.float32)
+    object_layers[-1].pnts= numpy.concatenate((object_layers[-1].pnts, pnts.astype(numpy.float32)))
+
+
+def read_pols_array(data, offset, end, object_layers):
+    """Read the layer's polygons, a count followed by VX point indexes."""
+    print("\tReading Layer ("+object_layers[-1].name+") Polygons")
+    words= read_words(data, offset, end)
+    words_len= len(words)
+    pos= numpy.arange(words_len)
+    # The upper 6 bits of the count are flags.
+    counts= words & 0x03FF
+    wide= (words >> 8) == 0xFF
+
+    # The end of a polygon starting at each word.
+    if wide.any():
+        step= numpy.minimum(numpy.append(pos + 1 + wide, words_len), words_len)
+        ends= numpy.minimum(pos + 1, words_len)
+        for bit in range(10):
+            sel= (counts & (1 << bit)) != 0
+            ends[sel]= step[ends[sel]]
+            step= step[step]
+    else:
+        ends= pos + 1 + counts
+
+    heads= chain_positions(ends)
+    # Drop a truncated last polygon.
+    heads= heads[ends[heads] <= words_len]
+    pols_end= ends[heads[-1]] if len(heads) else 0
+
+    is_vx= numpy.zeros(words_len, dtype=bool)
+    if wide.any():
+        jump= pos + 1 + wide
+        jump[heads]= heads + 1
+        is_vx[chain_positions(jump)]= True
+    else:
+        is_vx[:]= True
+    is_vx[heads]= False
+    is_vx[pols_end:]= False
+
+    object_layers[-1].pols.extend(counts[heads], read_vx_array(words, numpy.flatnonzero(is_vx)))
+    return len(heads)
+
+
+def read_weightmap_array(data, offset, end, object_layers):
+    """Read a weight map's values."""
+    name, (pnt_ids, ), values= read_vmap_array(data, offset, end, 1)
+    keep= last_unique(pnt_ids)
+    object_layers[-1].wmaps[name]= (pnt_ids[keep], values[keep, 0])
+
+
+def read_morph_array(data, offset, end, object_layers, is_abs):
+    """Read an endomorph's relative or absolute displacement values."""
+    name, (pnt_ids, ), pos= read_vmap_array(data, offset, end, 1)
+    keep= last_unique(pnt_ids)
+    pnt_ids, pos= pnt_ids[keep], pos[keep]
+    pnts= object_layers[-1].pnts
+    valid= pnt_ids < len(pnts)
+    pnt_ids, pos= pnt_ids[valid], pos[valid]
+
+    # Swap the Y and Z to match Blender's pitch.
+    co= pos[:, (0, 2, 1)]
+    if not is_abs:
+        co= co + pnts[pnt_ids]
+
+    object_layers[-1].morphs[name]= (pnt_ids, co)
+
+
+def read_colmap_array(data, offset, end, object_layers):
+    """Read the RGB or RGBA color map."""
+    name, (pnt_ids, ), colors= read_vmap_array(data, offset, end, 1)
+    if colors.shape[1] in {3, 4}:
+        add_map_array(object_layers[-1].colmaps, name, "PointMap", (pnt_ids, colors[:, :3]))
+
+
+def read_color_vmad_array(data, offset, end, object_layers, last_pols_count):
+    """Read the Discontinous (per-polygon) RGB values."""
+    name, (pnt_ids, pol_ids), colors= read_vmap_array(data, offset, end, 2)
+    # The PolyID in a VMAD can be relative, this offsets it.
+    pol_ids+= len(object_layers[-1].pols) - last_pols_count
+    if colors.shape[1] in {3, 4}:
+        add_map_array(object_layers[-1].colmaps, name, "FaceMap", (pnt_ids, pol_ids, colors[:, :3]))
+
+
+def read_uvmap_array(data, offset, end, object_layers):
+    """Read the simple UV coord values."""
+    name, (pnt_ids, ), uvs= read_vmap_array(data, offset, end, 1)
+    add_map_array(object_layers[-1].uvmaps, name, "PointMap", (pnt_ids, uvs[:, :2]))
+
+
+def read_uv_vmad_array(data, offset, end, object_layers, last_pols_count):
+    """Read the Discontinous (per-polygon) uv values."""
+    name, (pnt_ids, pol_ids), uvs= read_vmap_array(data, offset, end, 2)
+    pol_ids+= len(object_layers[-1].pols) - last_pols_count
+    add_map_array(object_layers[-1].uvmaps, name, "FaceMap", (pnt_ids, pol_ids, uvs[:, :2]))
+
+
+def read_weight_vmad_array(data, offset, end, object_layers):
+    """Read the VMAD Weight values."""
+    name, (pnt_ids, pol_ids), weights= read_vmap_array(data, offset, end, 2)
+    if name != "Edge Weight":
+        return  # We just want the Catmull-Clark edge weights
+
+    pols= object_layers[-1].pols
+    # The weight is given to the point preceding the edge, see read_weight_vmad.
+    for pnt_id, pol_id, weight in zip(pnt_ids.tolist(), pol_ids.tolist(), weights[:, 0].tolist()):
+        face_pnts= pols[pol_id]
+        try:
+            first_idx= face_pnts.index(pnt_id)
+        except:
+            continue
+
+        second_pnt= face_pnts[(first_idx + 1) % len(face_pnts)]
+        object_layers[-1].edge_weights["{0} {1}".format(second_pnt, pnt_id)]= weight
+
+
+def read_surf_tags_array(data, offset, end, object_layers, last_pols_count):
+    """Read the list of PolyIDs and tag indexes."""
+    print("\tReading Layer ("+object_layers[-1].name+") Surface Assignments")
+    words= read_words(data, offset, end)
+    # PolyID/Surface Index pairs.
+    (pids, ), sid_pos= read_vx_records(words, 1, 1)
+    pids+= len(object_layers[-1].pols) - last_pols_count
+    sids= words[sid_pos]
+
+    surf_tags= object_layers[-1].surf_tags
+    unique_sids, first= numpy.unique(sids, return_index=True)
+    for sid in sids[numpy.sort(first)].tolist():
+        if sid not in surf_tags:
+            surf_tags[sid]= []
+        surf_tags[sid].append(pids[sids == sid])
+
 def create_mappack(data, map_name, map_type):
     """Match the map data to faces."""
     pack= {}
@@ -979,6 +1397,311 @@ def build_armature(layer_data, bones):
         prev_bone= nb
 
 
+def apply_edge_weights(me, edge_weights):
+    """Set the crease of the edges found in the layer's edge weights."""
+    if len(edge_weights) > 0:
+        for edge in me.edges:
+            edge_sa= "{0} {1}".format(edge.vertices[0], edge.vertices[1])
+            edge_sb= "{0} {1}".format(edge.vertices[1], edge.vertices[0])
+            if edge_sa in edge_weights:
+                edge.crease= edge_weights[edge_sa]
+            elif edge_sb in edge_weights:
+                edge.crease= edge_weights[edge_sb]
+
+
+def build_mesh(me, ob, layer_data, object_surfs, object_tags):
+    """Fill the layer's mesh using tessfaces, the NGons are triangulated."""
+    me.vertices.add(len(layer_data.pnts))
+    me.tessfaces.add(len(layer_data.pols))
+    # for vi in range(len(layer_data.pnts)):
+    #     me.vertices[vi].co= layer_data.pnts[vi]
+
+    # faster, would be faster again to use an array
+    me.vertices.foreach_set("co", [axis for co in layer_data.pnts for axis in co])
+
+    ngons= {}   # To keep the FaceIdx consistent, handle NGons later.
+    edges= []   # Holds the FaceIdx of the 2-point polys.
+    for fi, fpol in enumerate(layer_data.pols):
+        fpol.reverse()   # Reversing gives correct normal directions
+        # PointID 0 in the last element causes Blender to think it's un-used.
+        if fpol[-1] == 0:
+            fpol.insert(0, fpol[-1])
+            del fpol[-1]
+
+        vlen= len(fpol)
+        if vlen == 3 or vlen == 4:
+            for i in range(vlen):
+                me.tessfaces[fi].vertices_raw[i]= fpol[i]
+        elif vlen == 2:
+            edges.append(fi)
+        elif vlen != 1:
+            ngons[fi]= fpol  # Deal with them later
+
+    # Create the Material Slots and assign the MatIndex to the correct faces.
+    mat_slot= 0
+    for surf_key in layer_data.surf_tags:
+        if object_tags[surf_key] in object_surfs:
+            me.materials.append(object_surfs[object_tags[surf_key]].bl_mat)
+
+            for fi in layer_data.surf_tags[surf_key]:
+                me.tessfaces[fi].material_index= mat_slot
+                me.tessfaces[fi].use_smooth= object_surfs[object_tags[surf_key]].smooth
+
+            mat_slot+=1
+
+    # Create the Vertex Groups (LW's Weight Maps).
+    if len(layer_data.wmaps) > 0:
+        print("Adding %d Vertex Groups" % len(layer_data.wmaps))
+        for wmap_key in layer_data.wmaps:
+            vgroup= ob.vertex_groups.new()
+            vgroup.name= wmap_key
+            wlist= layer_data.wmaps[wmap_key]
+            for pvp in wlist:
+                vgroup.add((pvp[0], ), pvp[1], 'REPLACE')
+
+    # Create the Shape Keys (LW's Endomorphs).
+    if len(layer_data.morphs) > 0:
+        print("Adding %d Shapes Keys" % len(layer_data.morphs))
+        ob.shape_key_add('Basis')   # Got to have a Base Shape.
+        for morph_key in layer_data.morphs:
+            skey= ob.shape_key_add(morph_key)
+            dlist= layer_data.morphs[morph_key]
+            for pdp in dlist:
+                me.shape_keys.key_blocks[skey.name].data[pdp[0]].co= [pdp[1], pdp[2], pdp[3]]
+
+    # Create the Vertex Color maps.
+    if len(layer_data.colmaps) > 0:
+        print("Adding %d Vertex Color Maps" % len(layer_data.colmaps))
+        for cmap_key in layer_data.colmaps:
+            map_pack= create_mappack(layer_data, cmap_key, "COLOR")
+            me.vertex_colors.new(cmap_key)
+            vcol= me.tessface_vertex_colors[-1]
+            if not vcol or not vcol.data:
+                break
+            for fi in map_pack:
+                if fi > len(vcol.data):
+                    continue
+                face= map_pack[fi]
+                colf= vcol.data[fi]
+
+                if len(face) > 2:
+                    colf.color1= face[0]
+                    colf.color2= face[1]
+                    colf.color3= face[2]
+                if len(face) == 4:
+                    colf.color4= face[3]
+
+    # Create the UV Maps.
+    if len(layer_data.uvmaps) > 0:
+        print("Adding %d UV Textures" % len(layer_data.uvmaps))
+        for uvmap_key in layer_data.uvmaps:
+            map_pack= create_mappack(layer_data, uvmap_key, "UV")
+            me.uv_textures.new(name=uvmap_key)
+            uvm= me.tessface_uv_textures[-1]
+            if not uvm or not uvm.data:
+                break
+            for fi in map_pack:
+                if fi > len(uvm.data):
+                    continue
+                face= map_pack[fi]
+                uvf= uvm.data[fi]
+
+                if len(face) > 2:
+                    uvf.uv1= face[0]
+                    uvf.uv2= face[1]
+                    uvf.uv3= face[2]
+                if len(face) == 4:
+                    uvf.uv4= face[3]
+
+    # Now add the NGons.
+    if len(ngons) > 0:
+        for ng_key in ngons:
+            face_offset= len(me.tessfaces)
+            ng= ngons[ng_key]
+            v_locs= []
+            for vi in range(len(ng)):
+                v_locs.append(mathutils.Vector(layer_data.pnts[ngons[ng_key][vi]]))
+            tris= tessellate_polygon([v_locs])
+            me.tessfaces.add(len(tris))
+            for tri in tris:
+                face= me.tessfaces[face_offset]
+                face.vertices_raw[0]= ng[tri[0]]
+                face.vertices_raw[1]= ng[tri[1]]
+                face.vertices_raw[2]= ng[tri[2]]
+                face.material_index= me.tessfaces[ng_key].material_index
+                face.use_smooth= me.tessfaces[ng_key].use_smooth
+                face_offset+= 1
+
+    # FaceIDs are no longer a concern, so now update the mesh.
+    has_edges= len(edges) > 0 or len(layer_data.edge_weights) > 0
+    me.update(calc_edges=has_edges)
+
+    # Add the edges.
+    edge_offset= len(me.edges)
+    me.edges.add(len(edges))
+    for edge_fi in edges:
+        me.edges[edge_offset].vertices[0]= layer_data.pols[edge_fi][0]
+        me.edges[edge_offset].vertices[1]= layer_data.pols[edge_fi][1]
+        edge_offset+= 1
+
+    # Apply the Edge Weighting.
+    apply_edge_weights(me, layer_data.edge_weights)
+
+
+def loop_map_array(maps, loop_pnts, loop_pols, pnts_count, default):
+    """
+    The per-loop values of a UV or color map read by the array readers,
+    like create_mappack: the PointMap values, replaced by the FaceMap values
+    of the polygon, default where the map has no value.
+    """
+    values= numpy.empty((len(loop_pnts), len(default)), dtype=numpy.float32)
+    values[:]= default
+
+    for pnt_ids, map_values in maps.get("PointMap", ()):
+        valid= pnt_ids < pnts_count
+        has_value= numpy.zeros(pnts_count, dtype=bool)
+        point_values= numpy.empty((pnts_count, len(default)), dtype=numpy.float32)
+        keep= last_unique(pnt_ids[valid])
+        has_value[pnt_ids[valid][keep]]= True
+        point_values[pnt_ids[valid][keep]]= map_values[valid][keep]
+        sel= has_value[loop_pnts]
+        values[sel]= point_values[loop_pnts[sel]]
+
+    if "FaceMap" in maps:
+        # Match the (polygon, point) pairs using a single sorted key.
+        loop_keys= loop_pols.astype(numpy.int64) * pnts_count + loop_pnts
+        for pnt_ids, pol_ids, map_values in maps["FaceMap"]:
+            keys= pol_ids.astype(numpy.int64) * pnts_count + pnt_ids
+            keep= last_unique(keys)
+            order= numpy.argsort(keys[keep])
+            keys= keys[keep][order]
+            map_values= map_values[keep][order]
+            if len(keys) == 0:
+                continue
+            found= numpy.minimum(numpy.searchsorted(keys, loop_keys), len(keys) - 1)
+            sel= keys[found] == loop_keys
+            values[sel]= map_values[found[sel]]
+
+    return values
+
+
+def build_mesh_arrays(me, ob, layer_data, object_surfs, object_tags):
+    """
+    Fill the layer's mesh from the arrays of read_lwo2_mapped using
+    polygons and foreach_set, the NGons are kept.
+    """
+    pnts= layer_data.pnts
+    pols= layer_data.pols
+    pnts_count= len(pnts)
+
+    me.vertices.add(pnts_count)
+    me.vertices.foreach_set("co", pnts.ravel())
+
+    # 1 and 2-point polys are not faces, the latter are added as edges.
+    face_pols= numpy.flatnonzero(pols.counts >= 3)
+    loop_total= pols.counts[face_pols]
+    loop_start= numpy.cumsum(loop_total) - loop_total
+    loops_count= int(loop_total.sum())
+
+    # Reversing gives correct normal directions.
+    loop_face= numpy.repeat(numpy.arange(len(face_pols)), loop_total)
+    loop_corner= numpy.arange(loops_count) - loop_start[loop_face]
+    loop_src= pols.starts[face_pols][loop_face] + loop_total[loop_face] - 1 - loop_corner
+    loop_pnts= pols.verts[loop_src]
+    loop_pols= face_pols[loop_face]
+
+    me.polygons.add(len(face_pols))
+    me.loops.add(loops_count)
+    me.polygons.foreach_set("loop_start", loop_start.astype(numpy.int32))
+    me.polygons.foreach_set("loop_total", loop_total.astype(numpy.int32))
+    me.loops.foreach_set("vertex_index", loop_pnts.astype(numpy.int32))
+
+    # Create the Material Slots and assign the MatIndex to the correct faces.
+    face_index= numpy.full(len(pols), -1, dtype=numpy.int32)
+    face_index[face_pols]= numpy.arange(len(face_pols))
+    material_index= numpy.zeros(len(face_pols), dtype=numpy.int32)
+    use_smooth= numpy.zeros(len(face_pols), dtype=bool)
+    mat_slot= 0
+    for surf_key in layer_data.surf_tags:
+        if object_tags[surf_key] in object_surfs:
+            surf_data= object_surfs[object_tags[surf_key]]
+            me.materials.append(surf_data.bl_mat)
+
+            pids= numpy.concatenate(layer_data.surf_tags[surf_key])
+            fi= face_index[pids[(pids >= 0) & (pids < len(pols))]]
+            fi= fi[fi != -1]
+            material_index[fi]= mat_slot
+            use_smooth[fi]= surf_data.smooth
+
+            mat_slot+=1
+
+    me.polygons.foreach_set("material_index", material_index)
+    me.polygons.foreach_set("use_smooth", use_smooth)
+
+    # Create the Vertex Groups (LW's Weight Maps).
+    if len(layer_data.wmaps) > 0:
+        print("Adding %d Vertex Groups" % len(layer_data.wmaps))
+        for wmap_key in layer_data.wmaps:
+            vgroup= ob.vertex_groups.new()
+            vgroup.name= wmap_key
+            pnt_ids, weights= layer_data.wmaps[wmap_key]
+            valid= pnt_ids < pnts_count
+            pnt_ids, weights= pnt_ids[valid], weights[valid]
+            # One call for all the points sharing a weight.
+            weight_values, weight_groups= numpy.unique(weights, return_inverse=True)
+            for wi, weight in enumerate(weight_values.tolist()):
+                vgroup.add(pnt_ids[weight_groups == wi].tolist(), weight, 'REPLACE')
+
+    # Create the Shape Keys (LW's Endomorphs).
+    if len(layer_data.morphs) > 0:
+        print("Adding %d Shapes Keys" % len(layer_data.morphs))
+        ob.shape_key_add('Basis')   # Got to have a Base Shape.
+        for morph_key in layer_data.morphs:
+            skey= ob.shape_key_add(morph_key)
+            pnt_ids, co= layer_data.morphs[morph_key]
+            morph_pnts= pnts.copy()
+            morph_pnts[pnt_ids]= co
+            skey.data.foreach_set("co", morph_pnts.ravel())
+
+    # Create the Vertex Color maps.
+    if len(layer_data.colmaps) > 0:
+        print("Adding %d Vertex Color Maps" % len(layer_data.colmaps))
+        for cmap_key in layer_data.colmaps:
+            vcol= me.vertex_colors.new(cmap_key)
+            if not vcol:
+                break
+            colors= loop_map_array(layer_data.colmaps[cmap_key], loop_pnts, loop_pols,
+                                   pnts_count, (1.0, 1.0, 1.0))
+            vcol.data.foreach_set("color", colors.ravel())
+
+    # Create the UV Maps.
+    if len(layer_data.uvmaps) > 0:
+        print("Adding %d UV Textures" % len(layer_data.uvmaps))
+        for uvmap_key in layer_data.uvmaps:
+            uvtex= me.uv_textures.new(name=uvmap_key)
+            if not uvtex:
+                break
+            uvs= loop_map_array(layer_data.uvmaps[uvmap_key], loop_pnts, loop_pols,
+                                pnts_count, (-0.1, -0.1))
+            me.uv_layers[uvtex.name].data.foreach_set("uv", uvs.ravel())
+
+    me.update(calc_edges=True)
+
+    # Add the edges.
+    edge_pols= numpy.flatnonzero(pols.counts == 2)
+    if len(edge_pols) > 0:
+        edge_offset= len(me.edges)
+        edge_verts= numpy.zeros((edge_offset + len(edge_pols)) * 2, dtype=numpy.int32)
+        me.edges.foreach_get("vertices", edge_verts[:edge_offset * 2])
+        edge_start= pols.starts[edge_pols]
+        edge_verts[edge_offset * 2:]= pols.verts[numpy.stack((edge_start, edge_start + 1), axis=1)].ravel()
+        me.edges.add(len(edge_pols))
+        me.edges.foreach_set("vertices", edge_verts)
+
+    # Apply the Edge Weighting.
+    apply_edge_weights(me, layer_data.edge_weights)
+
+
 def build_objects(object_layers, object_surfs, object_tags, object_name, add_subd_mod, skel_to_arm, use_existing_materials):
     """Using the gathered data, create the objects."""
     ob_dict= {}  # Used for the parenting setup.
@@ -1020,32 +1743,6 @@ def build_objects(object_layers, object_surfs, object_tags, object_name, add_sub
 
     for layer_data in object_layers:
         me= bpy.data.meshes.new(layer_data.name)
-        me.vertices.add(len(layer_data.pnts))
-        me.tessfaces.add(len(layer_data.pols))
-        # for vi in range(len(layer_data.pnts)):
-        #     me.vertices[vi].co= layer_data.pnts[vi]
-
-        # faster, would be faster again to use an array
-        me.vertices.foreach_set("co", [axis for co in layer_data.pnts for axis in co])
-
-        ngons= {}   # To keep the FaceIdx consistent, handle NGons later.
-        edges= []   # Holds the FaceIdx of the 2-point polys.
-        for fi, fpol in enumerate(layer_data.pols):
-            fpol.reverse()   # Reversing gives correct normal directions
-            # PointID 0 in the last element causes Blender to think it's un-used.
-            if fpol[-1] == 0:
-                fpol.insert(0, fpol[-1])
-                del fpol[-1]
-
-            vlen= len(fpol)
-            if vlen == 3 or vlen == 4:
-                for i in range(vlen):
-                    me.tessfaces[fi].vertices_raw[i]= fpol[i]
-            elif vlen == 2:
-                edges.append(fi)
-            elif vlen != 1:
-                ngons[fi]= fpol  # Deal with them later
-
         ob= bpy.data.objects.new(layer_data.name, me)
         bpy.context.scene.objects.link(ob)
         ob_dict[layer_data.index]= [ob, layer_data.parent_index]
@@ -1053,122 +1750,10 @@ def build_objects(object_layers, object_surfs, object_tags, object_name, add_sub
         # Move the object so the pivot is in the right place.
         ob.location= layer_data.pivot
 
-        # Create the Material Slots and assign the MatIndex to the correct faces.
-        mat_slot= 0
-        for surf_key in layer_data.surf_tags:
-            if object_tags[surf_key] in object_surfs:
-                me.materials.append(object_surfs[object_tags[surf_key]].bl_mat)
-
-                for fi in layer_data.surf_tags[surf_key]:
-                    me.tessfaces[fi].material_index= mat_slot
-                    me.tessfaces[fi].use_smooth= object_surfs[object_tags[surf_key]].smooth
-
-                mat_slot+=1
-
-        # Create the Vertex Groups (LW's Weight Maps).
-        if len(layer_data.wmaps) > 0:
-            print("Adding %d Vertex Groups" % len(layer_data.wmaps))
-            for wmap_key in layer_data.wmaps:
-                vgroup= ob.vertex_groups.new()
-                vgroup.name= wmap_key
-                wlist= layer_data.wmaps[wmap_key]
-                for pvp in wlist:
-                    vgroup.add((pvp[0], ), pvp[1], 'REPLACE')
-
-        # Create the Shape Keys (LW's Endomorphs).
-        if len(layer_data.morphs) > 0:
-            print("Adding %d Shapes Keys" % len(layer_data.morphs))
-            ob.shape_key_add('Basis')   # Got to have a Base Shape.
-            for morph_key in layer_data.morphs:
-                skey= ob.shape_key_add(morph_key)
-                dlist= layer_data.morphs[morph_key]
-                for pdp in dlist:
-                    me.shape_keys.key_blocks[skey.name].data[pdp[0]].co= [pdp[1], pdp[2], pdp[3]]
-
-        # Create the Vertex Color maps.
-        if len(layer_data.colmaps) > 0:
-            print("Adding %d Vertex Color Maps" % len(layer_data.colmaps))
-            for cmap_key in layer_data.colmaps:
-                map_pack= create_mappack(layer_data, cmap_key, "COLOR")
-                me.vertex_colors.new(cmap_key)
-                vcol= me.tessface_vertex_colors[-1]
-                if not vcol or not vcol.data:
-                    break
-                for fi in map_pack:
-                    if fi > len(vcol.data):
-                        continue
-                    face= map_pack[fi]
-                    colf= vcol.data[fi]
-
-                    if len(face) > 2:
-                        colf.color1= face[0]
-                        colf.color2= face[1]
-                        colf.color3= face[2]
-                    if len(face) == 4:
-                        colf.color4= face[3]
-
-        # Create the UV Maps.
-        if len(layer_data.uvmaps) > 0:
-            print("Adding %d UV Textures" % len(layer_data.uvmaps))
-            for uvmap_key in layer_data.uvmaps:
-                map_pack= create_mappack(layer_data, uvmap_key, "UV")
-                me.uv_textures.new(name=uvmap_key)
-                uvm= me.tessface_uv_textures[-1]
-                if not uvm or not uvm.data:
-                    break
-                for fi in map_pack:
-                    if fi > len(uvm.data):
-                        continue
-                    face= map_pack[fi]
-                    uvf= uvm.data[fi]
-
-                    if len(face) > 2:
-                        uvf.uv1= face[0]
-                        uvf.uv2= face[1]
-                        uvf.uv3= face[2]
-                    if len(face) == 4:
-                        uvf.uv4= face[3]
-
-        # Now add the NGons.
-        if len(ngons) > 0:
-            for ng_key in ngons:
-                face_offset= len(me.tessfaces)
-                ng= ngons[ng_key]
-                v_locs= []
-                for vi in range(len(ng)):
-                    v_locs.append(mathutils.Vector(layer_data.pnts[ngons[ng_key][vi]]))
-                tris= tessellate_polygon([v_locs])
-                me.tessfaces.add(len(tris))
-                for tri in tris:
-                    face= me.tessfaces[face_offset]
-                    face.vertices_raw[0]= ng[tri[0]]
-                    face.vertices_raw[1]= ng[tri[1]]
-                    face.vertices_raw[2]= ng[tri[2]]
-                    face.material_index= me.tessfaces[ng_key].material_index
-                    face.use_smooth= me.tessfaces[ng_key].use_smooth
-                    face_offset+= 1
-
-        # FaceIDs are no longer a concern, so now update the mesh.
-        has_edges= len(edges) > 0 or len(layer_data.edge_weights) > 0
-        me.update(calc_edges=has_edges)
-
-        # Add the edges.
-        edge_offset= len(me.edges)
-        me.edges.add(len(edges))
-        for edge_fi in edges:
-            me.edges[edge_offset].vertices[0]= layer_data.pols[edge_fi][0]
-            me.edges[edge_offset].vertices[1]= layer_data.pols[edge_fi][1]
-            edge_offset+= 1
-
-        # Apply the Edge Weighting.
-        if len(layer_data.edge_weights) > 0:
-            for edge in me.edges:
-                edge_sa= "{0} {1}".format(edge.vertices[0], edge.vertices[1])
-                edge_sb= "{0} {1}".format(edge.vertices[1], edge.vertices[0])
-                if edge_sa in layer_data.edge_weights:
-                    edge.crease= layer_data.edge_weights[edge_sa]
-                elif edge_sb in layer_data.edge_weights:
-                    edge.crease= layer_data.edge_weights[edge_sb]
+        if isinstance(layer_data.pols, _obj_pols):
+            build_mesh_arrays(me, ob, layer_data, object_surfs, object_tags)
+        else:
+            build_mesh(me, ob, layer_data, object_surfs, object_tags)
 
         # Unfortunately we can't exlude certain faces from the subdivision.
         if layer_data.has_subds and add_subd_mod:
@@ -86,6 +86,12 @@ class Import3DS(bpy.types.Operator, ImportHelper, IO3DSOrientationHelper):
                         "importing incorrectly",
             default=True,
             )
+    use_mmap = BoolProperty(
+            name="Memory-mapped",
+            description="Map the whole file into memory and decode geometry "
+                        "in bulk (faster for scenes with many meshes)",
+            default=False,
+            )
 
     def execute(self, context):
         from . import import_3ds
@@ -25,10 +25,16 @@
 import os
 import time
 import struct
+import mmap
 
 import bpy
 import mathutils
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 BOUNDS_3DS = []
 
 
@@ -189,11 +195,54 @@ def read_chunk(file, chunk):
     #chunk.dump()
 
 
+class MappedFile(mmap.mmap):
+    """
+    Read-only memory map of a 3DS file, used in place of the file object.
+
+    Chunk headers and strings are read straight from the mapping,
+    geometry is decoded with numpy (see ``read_array``).
+    """
+
+    def __new__(cls, filepath):
+        with open(filepath, 'rb') as file:
+            self = super().__new__(cls, file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.name = filepath
+        return self
+
+
+def read_array(file, dtype, count):
+    """
+    Return the next ``count`` items of ``dtype`` from a ``MappedFile``
+    as a numpy array and move past them.
+
+    The array is copied out of the mapping, a view still alive
+    when the file is closed would make ``close()`` raise ``BufferError``.
+    """
+    offset = file.tell()
+    data = numpy.frombuffer(file, dtype=dtype, count=count, offset=offset).copy()
+    file.seek(offset + data.nbytes)
+    return data
+
+
 def read_string(file):
+    if isinstance(file, MappedFile):
+        start = file.tell()
+        end = file.find(b'\x00', start)
+        if end == -1:
+            # no null character, the string runs to the end of the file
+            end = len(file)
+            file.seek(end)
+            return str(file[start:end], "utf-8", "replace"), end - start
+        file.seek(end + 1)
+        return str(file[start:end], "utf-8", "replace"), end - start + 1
+
     #read in the characters till we get a null character
     s = []
     while True:
         c = file.read(1)
+        if not c:
+            # end of file without a null character
+            return str(b''.join(s), "utf-8", "replace"), len(s)
         if c == b'\x00':
             break
         s.append(c)
@@ -218,8 +267,7 @@ def process_next_object_chunk(file, previous_chunk):
 
 def skip_to_end(file, skip_chunk):
     buffer_size = skip_chunk.length - skip_chunk.bytes_read
-    binary_format = "%ic" % buffer_size
-    file.read(struct.calcsize(binary_format))
+    file.seek(buffer_size, os.SEEK_CUR)
     skip_chunk.bytes_read += buffer_size
 
 
@@ -279,6 +327,9 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
 
     TEXTURE_DICT = {}
     MATDICT = {}
+
+    # Geometry of memory-mapped files is decoded as numpy views.
+    use_arrays = isinstance(file, MappedFile)
 # 	TEXMODE = Mesh.FaceModes['TEX']
 
     # Localspace variable names, faster.
@@ -302,7 +353,11 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
         if myContextMesh_facels is None:
             myContextMesh_facels = []
 
-        if myContextMesh_vertls:
+        if myContextMesh_vertls is not None and len(myContextMesh_vertls):
+
+            if use_arrays:
+                putContextMeshArrays(bmesh, myContextMesh_vertls, myContextMesh_facels, myContextMeshMaterials)
+                return
 
             bmesh.vertices.add(len(myContextMesh_vertls) // 3)
             bmesh.vertices.foreach_set("co", myContextMesh_vertls)
@@ -324,18 +379,7 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
                 uv_faces = None
 
             for mat_idx, (matName, faces) in enumerate(myContextMeshMaterials):
-                if matName is None:
-                    bmat = None
-                else:
-                    bmat = MATDICT.get(matName)
-                    # in rare cases no materials defined.
-                    if bmat:
-                        img = TEXTURE_DICT.get(bmat.name)
-                    else:
-                        print("    warning: material %r not defined!" % matName)
-                        bmat = MATDICT[matName] = bpy.data.materials.new(matName)
-                        img = None
-
+                bmat, img = getContextMaterial(matName)
                 bmesh.materials.append(bmat)  # can be None
 
                 if uv_faces  and img:
@@ -361,6 +405,61 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
                     uvl[pl.loop_start + 2].uv = contextMeshUV[v3 * 2: (v3 * 2) + 2]
                     # always a tri
 
+        putContextObject(bmesh)
+
+    def getContextMaterial(matName):
+        """Return the (material, image) used for a material name of a mesh."""
+        if matName is None:
+            return None, None
+        bmat = MATDICT.get(matName)
+        # in rare cases no materials defined.
+        if bmat:
+            return bmat, TEXTURE_DICT.get(bmat.name)
+        print("    warning: material %r not defined!" % matName)
+        bmat = MATDICT[matName] = bpy.data.materials.new(matName)
+        return bmat, None
+
+    def putContextMeshArrays(bmesh, vertls, facels, materials):
+        """Same as putContextMesh for geometry decoded as numpy arrays."""
+        bmesh.vertices.add(len(vertls) // 3)
+        bmesh.vertices.foreach_set("co", vertls)
+
+        nbr_faces = len(facels)
+        faces = numpy.array(facels, dtype=numpy.int32).reshape(nbr_faces, 3)
+        # eekadoodle
+        eek = faces[:, 2] == 0
+        faces[eek] = faces[eek][:, (2, 0, 1)]
+        loop_verts = faces.ravel()
+
+        bmesh.polygons.add(nbr_faces)
+        bmesh.loops.add(nbr_faces * 3)
+        bmesh.polygons.foreach_set("loop_start", numpy.arange(0, nbr_faces * 3, 3, dtype=numpy.int32))
+        bmesh.polygons.foreach_set("loop_total", numpy.full(nbr_faces, 3, dtype=numpy.int32))
+        bmesh.loops.foreach_set("vertex_index", loop_verts)
+
+        use_uv = nbr_faces and contextMeshUV is not None and len(contextMeshUV)
+        if use_uv:
+            bmesh.uv_textures.new()
+            uv_faces = bmesh.uv_textures.active.data[:]
+
+        material_indices = numpy.zeros(nbr_faces, dtype=numpy.int32)
+        for mat_idx, (matName, faces) in enumerate(materials):
+            bmat, img = getContextMaterial(matName)
+            bmesh.materials.append(bmat)  # can be None
+
+            material_indices[numpy.asarray(faces, dtype=numpy.intp)] = mat_idx
+            if use_uv and img:
+                for fidx in faces:
+                    uv_faces[fidx].image = img
+        bmesh.polygons.foreach_set("material_index", material_indices)
+
+        if use_uv:
+            uv = numpy.asarray(contextMeshUV, dtype=numpy.float32).reshape(-1, 2)
+            bmesh.uv_layers.active.data.foreach_set("uv", uv[loop_verts].ravel())
+
+        putContextObject(bmesh)
+
+    def putContextObject(bmesh):
         bmesh.validate()
         bmesh.update()
 
@@ -632,7 +731,10 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
             new_chunk.bytes_read += 2
 
             # print 'number of verts: ', num_verts
-            contextMesh_vertls = struct.unpack('<%df' % (num_verts * 3), file.read(STRUCT_SIZE_3FLOAT * num_verts))
+            if use_arrays:
+                contextMesh_vertls = read_array(file, '<f4', num_verts * 3)
+            else:
+                contextMesh_vertls = struct.unpack('<%df' % (num_verts * 3), file.read(STRUCT_SIZE_3FLOAT * num_verts))
             new_chunk.bytes_read += STRUCT_SIZE_3FLOAT * num_verts
             # dummyvert is not used atm!
 
@@ -646,10 +748,14 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
             #print 'number of faces: ', num_faces
 
             # print '\ngetting a face'
-            temp_data = file.read(STRUCT_SIZE_4UNSIGNED_SHORT * num_faces)
             new_chunk.bytes_read += STRUCT_SIZE_4UNSIGNED_SHORT * num_faces  # 4 short ints x 2 bytes each
-            contextMesh_facels = struct.unpack('<%dH' % (num_faces * 4), temp_data)
-            contextMesh_facels = [contextMesh_facels[i - 3:i] for i in range(3, (num_faces * 4) + 3, 4)]
+            if use_arrays:
+                # v1, v2, v3, flags
+                contextMesh_facels = read_array(file, '<u2', num_faces * 4).reshape(num_faces, 4)[:, :3]
+            else:
+                temp_data = file.read(STRUCT_SIZE_4UNSIGNED_SHORT * num_faces)
+                contextMesh_facels = struct.unpack('<%dH' % (num_faces * 4), temp_data)
+                contextMesh_facels = [contextMesh_facels[i - 3:i] for i in range(3, (num_faces * 4) + 3, 4)]
 
         elif new_chunk.ID == OBJECT_MATERIAL:
             # print 'elif new_chunk.ID == OBJECT_MATERIAL:'
@@ -660,10 +766,12 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
             num_faces_using_mat = struct.unpack('<H', temp_data)[0]
             new_chunk.bytes_read += STRUCT_SIZE_UNSIGNED_SHORT
 
-            temp_data = file.read(STRUCT_SIZE_UNSIGNED_SHORT * num_faces_using_mat)
             new_chunk.bytes_read += STRUCT_SIZE_UNSIGNED_SHORT * num_faces_using_mat
-
-            temp_data = struct.unpack("<%dH" % (num_faces_using_mat), temp_data)
+            if use_arrays:
+                temp_data = read_array(file, '<u2', num_faces_using_mat)
+            else:
+                temp_data = file.read(STRUCT_SIZE_UNSIGNED_SHORT * num_faces_using_mat)
+                temp_data = struct.unpack("<%dH" % (num_faces_using_mat), temp_data)
 
             contextMeshMaterials.append((material_name, temp_data))
 
@@ -674,9 +782,12 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
             num_uv = struct.unpack('<H', temp_data)[0]
             new_chunk.bytes_read += 2
 
-            temp_data = file.read(STRUCT_SIZE_2FLOAT * num_uv)
             new_chunk.bytes_read += STRUCT_SIZE_2FLOAT * num_uv
-            contextMeshUV = struct.unpack('<%df' % (num_uv * 2), temp_data)
+            if use_arrays:
+                contextMeshUV = read_array(file, '<f4', num_uv * 2)
+            else:
+                temp_data = file.read(STRUCT_SIZE_2FLOAT * num_uv)
+                contextMeshUV = struct.unpack('<%df' % (num_uv * 2), temp_data)
 
         elif new_chunk.ID == OBJECT_TRANS_MATRIX:
             # How do we know the matrix size? 54 == 4x4 48 == 4x3
@@ -804,8 +915,7 @@ def process_next_chunk(file, previous_chunk, importedObjects, IMAGE_SEARCH):
             # print 'skipping to end of this chunk'
             #print("unknown chunk: "+hex(new_chunk.ID))
             buffer_size = new_chunk.length - new_chunk.bytes_read
-            binary_format = "%ic" % buffer_size
-            temp_data = file.read(struct.calcsize(binary_format))
+            file.seek(buffer_size, os.SEEK_CUR)
             new_chunk.bytes_read += buffer_size
 
         #update the previous chunk bytes read
@@ -845,7 +955,8 @@ def load_3ds(filepath,
              IMPORT_CONSTRAIN_BOUNDS=10.0,
              IMAGE_SEARCH=True,
              APPLY_MATRIX=True,
-             global_matrix=None):
+             global_matrix=None,
+             USE_MMAP=False):
     global SCN
 
     # XXX
@@ -862,7 +973,10 @@ def load_3ds(filepath,
 
     current_chunk = Chunk()
 
-    file = open(filepath, 'rb')
+    if USE_MMAP and numpy is not None:
+        file = MappedFile(filepath)
+    else:
+        file = open(filepath, 'rb')
 
     #here we go!
     # print 'reading the first chunk'
@@ -984,6 +1098,7 @@ def load(operator,
          use_image_search=True,
          use_apply_transform=True,
          global_matrix=None,
+         use_mmap=False,
          ):
 
     load_3ds(filepath,
@@ -992,6 +1107,7 @@ def load(operator,
              IMAGE_SEARCH=use_image_search,
              APPLY_MATRIX=use_apply_transform,
              global_matrix=global_matrix,
+             USE_MMAP=use_mmap,
              )
 
     return {'FINISHED'}
@@ -22,12 +22,19 @@ DEBUG = False
 
 # This should work without a blender at all
 import os
-import shlex
+import re
 import math
+from array import array
 from math import sin, cos, pi
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 texture_cache = {}
 material_cache = {}
+geometry_cache = {}
 
 EPSILON = 0.0000001  # Very crude.
 
@@ -101,266 +108,129 @@ def vrml_split_fields(value):
     return field_list
 
 
-def vrmlFormat(data):
-    """
-    Keep this as a valid vrml file, but format in a way we can predict.
-    """
-    # Strip all commends - # not in strings - warning multiline strings are ignored.
-    def strip_comment(l):
-        #l = ' '.join(l.split())
-        l = l.strip()
-
-        if l.startswith('#'):
-            return ''
-
-        i = l.find('#')
-
-        if i == -1:
-            return l
-
-        # Most cases accounted for! if we have a comment at the end of the line do this...
-        #j = l.find('url "')
-        j = l.find('"')
-
-        if j == -1:  # simple no strings
-            return l[:i].strip()
-
-        q = False
-        for i, c in enumerate(l):
-            if c == '"':
-                q = not q  # invert
-
-            elif c == '#':
-                if q is False:
-                    return l[:i - 1]
-
-        return l
-
-    data = '\n'.join([strip_comment(l) for l in data.split('\n')])  # remove all whitespace
-
-    EXTRACT_STRINGS = True  # only needed when strings or filesnames containe ,[]{} chars :/
-
-    if EXTRACT_STRINGS:
-
-        # We need this so we can detect URL's
-        data = '\n'.join([' '.join(l.split()) for l in data.split('\n')])  # remove all whitespace
-
-        string_ls = []
-
-        #search = 'url "'
-        search = '"'
-
-        ok = True
-        last_i = 0
-        while ok:
-            ok = False
-            i = data.find(search, last_i)
-            if i != -1:
-
-                start = i + len(search)  # first char after end of search
-                end = data.find('"', start)
-                if end != -1:
-                    item = data[start:end]
-                    string_ls.append(item)
-                    data = data[:start] + data[end:]
-                    ok = True  # keep looking
-
-                    last_i = (end - len(item)) + 1
-                    # print(last_i, item, '|' + data[last_i] + '|')
-
-    # done with messy extracting strings part
-
-    # Bad, dont take strings into account
-    '''
-    data = data.replace('#', '\n#')
-    data = '\n'.join([ll for l in data.split('\n') for ll in (l.strip(),) if not ll.startswith('#')]) # remove all whitespace
-    '''
-    data = data.replace('{', '\n{\n')
-    data = data.replace('}', '\n}\n')
-    data = data.replace('[', '\n[\n')
-    data = data.replace(']', '\n]\n')
-    data = data.replace(',', ' , ')  # make sure comma's separate
-
-    # We need to write one property (field) per line only, otherwise we fail later to detect correctly new nodes.
-    # See T45195 for details.
-    data = '\n'.join([' '.join(value) for l in data.split('\n') for value in vrml_split_fields(l.split())])
-
-    if EXTRACT_STRINGS:
-        # add strings back in
-
-        search = '"'  # fill in these empty strings
-
-        ok = True
-        last_i = 0
-        while ok:
-            ok = False
-            i = data.find(search + '"', last_i)
-            # print(i)
-            if i != -1:
-                start = i + len(search)  # first char after end of search
-                item = string_ls.pop(0)
-                # print(item)
-                data = data[:start] + item + data[start:]
-
-                last_i = start + len(item) + 1
-
-                ok = True
-
-    # More annoying obscure cases where USE or DEF are placed on a newline
-    # data = data.replace('\nDEF ', ' DEF ')
-    # data = data.replace('\nUSE ', ' USE ')
-
-    data = '\n'.join([' '.join(l.split()) for l in data.split('\n')])  # remove all whitespace
-
-    # Better to parse the file accounting for multiline arrays
-    '''
-    data = data.replace(',\n', ' , ') # remove line endings with commas
-    data = data.replace(']', '\n]\n') # very very annoying - but some comma's are at the end of the list, must run this again.
-    '''
-
-    return [l for l in data.split('\n') if l]
-
 NODE_NORMAL = 1  # {}
 NODE_ARRAY = 2  # []
 NODE_REFERENCE = 3  # USE foobar
 # NODE_PROTO = 4 #
 
-lines = []
-
-
-def getNodePreText(i, words):
-    # print(lines[i])
-    use_node = False
-    while len(words) < 5:
-
-        if i >= len(lines):
-            break
-            '''
-        elif lines[i].startswith('PROTO'):
-            return NODE_PROTO, i+1
-            '''
-        elif lines[i] == '{':
-            # words.append(lines[i]) # no need
-            # print("OK")
-            return NODE_NORMAL, i + 1
-        elif lines[i].count('"') % 2 != 0:  # odd number of quotes? - part of a string.
-            # print('ISSTRING')
-            break
-        else:
-            new_words = lines[i].split()
-            if 'USE' in new_words:
-                use_node = True
-
-            words.extend(new_words)
-            i += 1
-
-        # Check for USE node - no {
-        # USE #id - should always be on the same line.
-        if use_node:
-            # print('LINE', i, words[:words.index('USE')+2])
-            words[:] = words[:words.index('USE') + 2]
-            if lines[i] == '{' and lines[i + 1] == '}':
-                # USE sometimes has {} after it anyway
-                i += 2
-            return NODE_REFERENCE, i
+# Whitespace (comma's are whitespace in vrml) and comments, followed by a token:
+# a "string", a bracket or any other word (number, keyword, identifier).
+vrml_token_re = re.compile(r'(?:[\s,]|#[^\n]*(?![^\n]))*("(?:[^"\\]|\\.)*"?|[\[\]{}]|[^\s,\[\]{}"#]+)')
+# The contents of an array of plain numbers, up to its closing bracket.
+vrml_number_array_re = re.compile(r'(?:[\s,0-9eE.+\-]+|#[^\n]*)*')
+vrml_comment_re = re.compile(r'#[^\n]*')
 
-    # print("error value!!!", words)
-    return 0, -1
 
+def vrmlIsKey(token):
+    """
+    Field names, node types and other identifiers, as opposed to values.
+    """
+    return token[0].isalpha() and token.upper() not in {'TRUE', 'FALSE'}
 
-def is_nodeline(i, words):
-
-    if not lines[i][0].isalpha():
-        return 0, 0
-
-    #if lines[i].startswith('field'):
-    #   return 0, 0
-
-    # Is this a prototype??
-    if lines[i].startswith('PROTO'):
-        words[:] = lines[i].split()
-        return NODE_NORMAL, i + 1  # TODO - assumes the next line is a '[\n', skip that
-    if lines[i].startswith('EXTERNPROTO'):
-        words[:] = lines[i].split()
-        return NODE_ARRAY, i + 1  # TODO - assumes the next line is a '[\n', skip that
-
-    '''
-    proto_type, new_i = is_protoline(i, words, proto_field_defs)
-    if new_i != -1:
-        return proto_type, new_i
-    '''
-
-    # Simple "var [" type
-    if lines[i + 1] == '[':
-        if lines[i].count('"') % 2 == 0:
-            words[:] = lines[i].split()
-            return NODE_ARRAY, i + 2
-
-    node_type, new_i = getNodePreText(i, words)
-
-    if not node_type:
-        if DEBUG:
-            print("not node_type", lines[i])
-        return 0, 0
 
-    # Ok, we have a { after some values
-    # Check the values are not fields
-    for i, val in enumerate(words):
-        if i != 0 and words[i - 1] in {'DEF', 'USE'}:
-            # ignore anything after DEF, it is a ID and can contain any chars.
-            pass
-        elif val[0].isalpha() and val not in {'TRUE', 'FALSE'}:
+def vrmlNumber(token):
+    for num_type in (int, float):
+        try:
+            return num_type(token)
+        except ValueError:
             pass
-        else:
-            # There is a number in one of the values, therefor we are not a node.
-            return 0, 0
+    return token
 
-    #if node_type==NODE_REFERENCE:
-    #   print(words, "REF_!!!!!!!")
-    return node_type, new_i
 
-
-def is_numline(i):
+class vrmlTokenizer(object):
     """
-    Does this line start with a number?
+    Single pass tokenizer over the text of a vrml file.
+
+    Arrays that only contain numbers (point, coordIndex, texCoordIndex...)
+    are not split into tokens, they are converted straight into typed arrays.
     """
+    __slots__ = ('data',
+                 'pos',
+                 'start',
+                 'newline',
+                 'token',
+                 '_lineno',
+                 '_lineno_pos')
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0  # end of the peeked token
+        self.start = 0  # start of the peeked token
+        self.newline = False  # there is a line break before the peeked token
+        self.token = None  # peeked token, None when not peeked yet
+        self._lineno = 1
+        self._lineno_pos = 0
+
+    def peek(self):
+        """
+        Return the next token without consuming it, None at the end of the data.
+        """
+        if self.token is None:
+            match = vrml_token_re.match(self.data, self.pos)
+            if match is None:
+                self.start = self.pos = len(self.data)
+                self.newline = True
+                return None
+            self.start = match.start(1)
+            self.newline = self.data.find('\n', self.pos, self.start) != -1
+            self.pos = match.end()
+            self.token = match.group(1)
+        return self.token
+
+    def next(self):
+        token = self.peek()
+        self.token = None
+        return token
+
+    def mark(self):
+        return self.pos, self.start, self.newline, self.token
+
+    def reset(self, mark):
+        self.pos, self.start, self.newline, self.token = mark
+
+    def getLineno(self):
+        """
+        Line number of the peeked token.
+        """
+        self.peek()
+        self._lineno += self.data.count('\n', self._lineno_pos, self.start)
+        self._lineno_pos = self.start
+        return self._lineno
 
-    # Works but too slow.
-    '''
-    l = lines[i]
-    for w in l.split():
-        if w==',':
-            pass
+    def readNumberArray(self):
+        """
+        Read the contents of an array up to and including its closing ']',
+        when it only holds numbers. Returns a typed array
+        (or an empty list for empty arrays) or None when it holds anything else.
+        """
+        if self.token is not None:
+            return None
+        data = self.data
+        start = self.pos
+        end = vrml_number_array_re.match(data, start).end()
+        if end >= len(data) or data[end] != ']':
+            return None
+
+        text = data[start:end]
+        if '#' in text:
+            text = vrml_comment_re.sub('', text)
+        values = text.replace(',', ' ').split()
+        if not values:
+            array_data = []
         else:
             try:
-                float(w)
-                return True
-
-            except:
-                return False
-
-    return False
-    '''
-
-    l = lines[i]
-
-    line_start = 0
-
-    if l.startswith(', '):
-        line_start += 2
-
-    line_end = len(l) - 1
-    line_end_new = l.find(' ', line_start)  # comma's always have a space before them
-
-    if line_end_new != -1:
-        line_end = line_end_new
-
-    try:
-        float(l[line_start:line_end])  # works for a float or int
-        return True
-    except:
-        return False
+                if '.' in text or 'e' in text or 'E' in text:
+                    array_data = array('d', map(float, values))
+                else:
+                    try:
+                        array_data = array('i', map(int, values))
+                    except OverflowError:
+                        array_data = array('d', map(float, values))
+            except ValueError:
+                return None  # not numbers after all, eg: a lone '-'
 
+        self.pos = end + 1
+        return array_data
 
 class vrmlNode(object):
     __slots__ = ('id',
@@ -834,10 +704,11 @@ class vrmlNode(object):
 
         # We want a flat list
         flat = True
-        for item in array_data:
-            if type(item) == list:
-                flat = False
-                break
+        if type(array_data) != array:  # typed arrays are always flat
+            for item in array_data:
+                if type(item) == list:
+                    flat = False
+                    break
 
         # make a flat array
         if flat:
@@ -957,8 +828,13 @@ class vrmlNode(object):
 
         return text
 
-    def parse(self, i, IS_PROTO_DATA=False):
-        new_i = self.__parse(i, IS_PROTO_DATA)
+    def parse(self, tokens, words=None, IS_PROTO_DATA=False):
+        """
+        Parse this node from the tokens following its header ``words``
+        (the header is None for anonymous lists), for normal nodes and
+        arrays the opening bracket has already been read.
+        """
+        self.__parse(tokens, words, IS_PROTO_DATA)
 
         # print(self.id, self.getFilename())
 
@@ -1033,22 +909,9 @@ class vrmlNode(object):
                             # Tricky - inline another VRML
                             print('\tLoading Inline:"%s"...' % url)
 
-                            # Watch it! - backup lines
-                            lines_old = lines[:]
-
-                            lines[:] = vrmlFormat(data)
-
-                            lines.insert(0, '{')
-                            lines.insert(0, 'root_node____')
-                            lines.append('}')
-                            '''
-                            ff = open('/tmp/test.txt', 'w')
-                            ff.writelines([l+'\n' for l in lines])
-                            '''
-
                             child = vrmlNode(self, NODE_NORMAL, -1)
                             child.setRoot(url)  # initialized dicts
-                            child.parse(0)
+                            child.parse(vrmlTokenizer(data), ['root_node____'])
 
                             # if self.getExternprotoName():
                             if self.getExternprotoName():
@@ -1071,37 +934,18 @@ class vrmlNode(object):
                                     else:
                                         print("\tEXTERNPROTO ID not found!:", extern_key)
 
-                            # Watch it! - restore lines
-                            lines[:] = lines_old
-
-        return new_i
-
-    def __parse(self, i, IS_PROTO_DATA=False):
-        '''
-        print('parsing at', i, end="")
-        print(i, self.id, self.lineno)
-        '''
-        l = lines[i]
-
-        if l == '[':
+    def __parse(self, tokens, words, IS_PROTO_DATA=False):
+        if words is None:
             # An anonymous list
             self.id = None
-            i += 1
         else:
-            words = []
-
-            node_type, new_i = is_nodeline(i, words)
-            if not node_type:  # fail for parsing new node.
-                print("Failed to parse new node")
-                raise ValueError
-
             if self.node_type == NODE_REFERENCE:
                 # Only assign the reference and quit
                 key = words[words.index('USE') + 1]
                 self.id = (words[0],)
 
                 self.reference = self.getDefDict()[key]
-                return new_i
+                return
 
             self.id = tuple(words)
 
@@ -1119,14 +963,30 @@ class vrmlNode(object):
                 proto_dict[key] = self
 
                 # Parse the proto nodes fields
-                self.proto_node = vrmlNode(self, NODE_ARRAY, new_i)
-                new_i = self.proto_node.parse(new_i)
+                self.proto_node = vrmlNode(self, NODE_ARRAY, tokens.getLineno())
+                if tokens.peek() == '[':
+                    tokens.next()
+                    self.proto_node.parse(tokens)
 
                 self.children.remove(self.proto_node)
 
                 # print(self.proto_node)
 
-                new_i += 1  # skip past the {
+                if self.getExternprotoName():
+                    # EXTERNPROTO Name [ field defs ] "url" or [ "url" "url" ]
+                    if tokens.peek() == '[':
+                        tokens.next()
+                        url_ls = []
+                        while tokens.peek() not in {']', None}:
+                            url_ls.append(tokens.next())
+                        tokens.next()
+                    else:
+                        url_ls = [tokens.next()]
+                    self.fields.append(url_ls)
+                    return
+
+                if tokens.peek() == '{':
+                    tokens.next()
 
             else:  # If we're a proto instance, add the proto node as our child.
                 spec = self.getSpec()
@@ -1140,111 +1000,125 @@ class vrmlNode(object):
 
             del proto_dict, key
 
-            i = new_i
+        if self.node_type == NODE_ARRAY:
+            # Most of the data in a file, convert it in one go.
+            array_data = tokens.readNumberArray()
+            if array_data is not None:
+                self.array_data = array_data
+                return
 
-        # print(self.id)
-        ok = True
-        while ok:
-            if i >= len(lines):
-                return len(lines) - 1
+        if self.node_type == NODE_NORMAL:
+            node_end = '}'
+        else:
+            node_end = ']'
 
-            l = lines[i]
-            # print('\tDEBUG:', i, self.node_type, l)
-            if l == '':
-                i += 1
-                continue
+        while True:
+            lineno = tokens.getLineno()
+            token = tokens.next()
+            # print('\tDEBUG:', lineno, self.node_type, token)
 
-            if l == '}':
-                if self.node_type != NODE_NORMAL:  # also ends proto nodes, we may want a type for these too.
-                    print('wrong node ending, expected an } ' + str(i) + ' ' + str(self.node_type))
-                    if DEBUG:
-                        raise ValueError
-                ### print("returning", i)
-                return i + 1
-            if l == ']':
-                if self.node_type != NODE_ARRAY:
-                    print('wrong node ending, expected a ] ' + str(i) + ' ' + str(self.node_type))
+            if token is None:
+                return
+
+            if token in {'}', ']'}:
+                if token != node_end:
+                    print('wrong node ending, expected a ' + node_end + ' ' + str(lineno) + ' ' + str(self.node_type))
                     if DEBUG:
                         raise ValueError
-                ### print("returning", i)
-                return i + 1
+                return
 
-            node_type, new_i = is_nodeline(i, [])
-            if node_type:  # check text\n{
-                child = vrmlNode(self, node_type, i)
-                i = child.parse(i)
+            if token == '[':  # some files have these anonymous lists
+                child = vrmlNode(self, NODE_ARRAY, lineno)
+                child.parse(tokens)
 
-            elif l == '[':  # some files have these anonymous lists
-                child = vrmlNode(self, NODE_ARRAY, i)
-                i = child.parse(i)
+            elif token == '{':  # a node without a name, keep the brackets balanced
+                child = vrmlNode(self, NODE_NORMAL, lineno)
+                child.parse(tokens)
 
-            elif is_numline(i):
-                l_split = l.split(',')
+            elif token in {'PROTO', 'EXTERNPROTO'}:
+                words = [token, tokens.next()]
+                child = vrmlNode(self, NODE_NORMAL if token == 'PROTO' else NODE_ARRAY, lineno)
+                child.parse(tokens, words)
 
-                values = None
-                # See if each item is a float?
+            elif not vrmlIsKey(token):
+                # Values without a field name, only expected in lists: MFString, numbers mixed with other values.
+                if token[0] == '"':
+                    self.fields.append([token])
+                else:
+                    self.array_data.append(vrmlNumber(token))
 
-                for num_type in (int, float):
-                    try:
-                        values = [num_type(v) for v in l_split]
-                        break
-                    except:
-                        pass
+            else:
+                self.parseStatement(tokens, [token], lineno)
 
-                    try:
-                        values = [[num_type(v) for v in segment.split()] for segment in l_split]
-                        break
-                    except:
-                        pass
+    def parseStatement(self, tokens, words, lineno):
+        """
+        Parse what follows the key (field name, node type...) in ``words``,
+        either a field with its values, a USE reference or a child node/array.
+        """
+        join_lines = False
 
-                if values is None:  # dont parse
-                    values = l_split
+        while True:
+            token = tokens.peek()
+            if token is None or token in {'}', ']'}:
+                break
 
-                # This should not extend over multiple lines however it is possible
-                # print(self.array_data)
-                if values:
-                    self.array_data.extend(values)
-                i += 1
-            else:
-                words = l.split()
-                if len(words) > 2 and words[1] == 'USE':
-                    vrmlNode(self, NODE_REFERENCE, i)
-                else:
+            if token in {'{', '['}:
+                tokens.next()
+                child = vrmlNode(self, NODE_NORMAL if token == '{' else NODE_ARRAY, lineno)
+                child.parse(tokens, words)
+                return
 
-                    # print("FIELD", i, l)
-                    #
-                    #words = l.split()
-                    ### print('\t\ttag', i)
-                    # this is a tag/
-                    # print(words, i, l)
-                    value = l
-                    # print(i)
-                    # javastrips can exist as values.
-                    quote_count = l.count('"')
-                    if quote_count % 2:  # odd number?
-                        # print('MULTILINE')
-                        while 1:
-                            i += 1
-                            l = lines[i]
-                            quote_count = l.count('"')
-                            if quote_count % 2:  # odd number?
-                                value += '\n' + l[:l.rfind('"')]
-                                break  # assume
-                            else:
-                                value += '\n' + l
+            if words[-1] in {'DEF', 'USE'}:
+                # ignore anything after DEF, it is a ID and can contain any chars.
+                words.append(tokens.next())
+
+                if words[-2] == 'USE':
+                    child = vrmlNode(self, NODE_REFERENCE, lineno)
+                    child.parse(tokens, words)
+                    if tokens.peek() == '{':
+                        # USE sometimes has {} after it anyway
+                        mark = tokens.mark()
+                        tokens.next()
+                        if tokens.next() != '}':
+                            tokens.reset(mark)
+                    return
+                continue
 
-                    # use shlex so we get '"a b" "b v"' --> '"a b"', '"b v"'
-                    value_all = shlex.split(value, posix=False)
+            if not vrmlIsKey(token):
+                # A field, its values continue up to the next key.
+                while token is not None and not vrmlIsKey(token) and token not in {'{', '}', '[', ']'}:
+                    words.append(tokens.next())
+                    token = tokens.peek()
+                break
 
-                    for value in vrml_split_fields(value_all):
-                        # Split
+            # Only keys, eg: 'diffuseColor IS legColor' or 'ROUTE a.b TO c.d'
+            if len(words) == 3 and words[1] == 'IS':
+                break
+            if len(words) == 4 and words[0] == 'ROUTE':
+                break
 
-                        if value[0] == 'field':
-                            # field SFFloat creaseAngle 4
-                            self.proto_field_defs.append(value)
-                        else:
-                            self.fields.append(value)
-                i += 1
+            if tokens.newline and not join_lines:
+                # Node headers may be split over lines ('DEF Foo Transform\n{'),
+                # look ahead for a bracket following a few more keys.
+                mark = tokens.mark()
+                count = len(words)
+                while token is not None and count < 5 and vrmlIsKey(token):
+                    tokens.next()
+                    token = tokens.peek()
+                    count += 1
+                tokens.reset(mark)
+                if token not in {'{', '['}:
+                    break
+                join_lines = True
+
+            words.append(tokens.next())
+
+        for value in vrml_split_fields(words):
+            if value[0] == 'field':
+                # field SFFloat creaseAngle 4
+                self.proto_field_defs.append(value)
+            else:
+                self.fields.append(value)
 
     # This is a prerequisite for DEF/USE-based material caching
     def canHaveReferences(self):
@@ -1288,35 +1162,18 @@ def vrml_parse(path):
     if data is None:
         return None, 'Failed to open file: ' + path
 
-    # Stripped above
-    lines[:] = vrmlFormat(data)
-
-    lines.insert(0, '{')
-    lines.insert(0, 'dymmy_node')
-    lines.append('}')
-    # Use for testing our parsed output, so we can check on line numbers.
-
-    '''
-    ff = open('/tmp/test.txt', 'w')
-    ff.writelines([l+'\n' for l in lines])
-    ff.close()
-    '''
+    tokens = vrmlTokenizer(data)
 
     # Now evaluate it
-    node_type, new_i = is_nodeline(0, [])
-    if not node_type:
+    token = tokens.peek()
+    if token is None or not vrmlIsKey(token):
         return None, 'Error: VRML file has no starting Node'
 
-    # Trick to make sure we get all root nodes.
-    lines.insert(0, '{')
-    lines.insert(0, 'root_node____')  # important the name starts with an ascii char
-    lines.append('}')
-
     root = vrmlNode(None, NODE_NORMAL, -1)
     root.setRoot(path)  # we need to set the root so we have a namespace and know the path in case of inlineing
 
-    # Parse recursively
-    root.parse(0)
+    # Parse recursively, all nodes of the file are children of the root.
+    root.parse(tokens, ['root_node____'])  # important the name starts with an ascii char
 
     # This prints a load of text
     if DEBUG:
@@ -1618,6 +1475,13 @@ def importMesh_ApplyColors(bpymesh, geom, ancestry):
         else:
             rgb = colors.getFieldAsArray('color', 3, ancestry)
         tc = bpymesh.tessface_vertex_colors.new()
+        if numpy is not None:
+            rgb = numpy.asarray(rgb, dtype=numpy.float32).reshape(-1, 3)
+            fv = importMesh_TessfaceVertices(bpymesh)
+            tc.data.foreach_set("color1", rgb[fv[:, 0]].ravel())
+            tc.data.foreach_set("color2", rgb[fv[:, 1]].ravel())
+            tc.data.foreach_set("color3", rgb[fv[:, 2]].ravel())
+            return
         tc.data.foreach_set("color1", [i for face
                                        in bpymesh.tessfaces
                                        for i in rgb[face.vertices[0]]])
@@ -1686,11 +1550,22 @@ def importMesh_ApplyTextureToTessfaces(bpymesh, geom, ancestry, bpyima):
     d = bpymesh.tessface_uv_textures.new().data
     for face in d:  # No foreach_set for nonscalars
         face.image = bpyima
+    if numpy is not None:
+        coord_points = numpy.asarray(coord_points, dtype=numpy.float32)
+        d.foreach_set('uv', coord_points[importMesh_TessfaceVertices(bpymesh)].ravel())
+        return
     uv = [i for face in bpymesh.tessfaces
           for vno in range(3) for i in coord_points[face.vertices[vno]]]
     d.foreach_set('uv', uv)
 
 
+# Vertex indices of the (triangular) tessfaces as a (faces, 3) array.
+def importMesh_TessfaceVertices(bpymesh):
+    fv = numpy.empty(len(bpymesh.tessfaces) * 4, dtype=numpy.int32)
+    bpymesh.tessfaces.foreach_get("vertices_raw", fv)
+    return fv.reshape(-1, 4)[:, :3]
+
+
 # Common steps for all triangle meshes once the geometry has been set:
 # normals, vertex colors, and texture.
 def importMesh_FinalizeTriangleMesh(bpymesh, geom, ancestry, bpyima):
@@ -2034,6 +1909,235 @@ def importMesh_IndexedFaceSet(geom, ancestry, bpyima):
     return bpymesh
 
 
+# -----------------------------------------------------------------------------------
+# Array based variants of the geometry importers above, used when numpy
+# is available. They build the same meshes, but compute faces, loops and
+# per-loop data in bulk and fill the mesh through foreach_set.
+
+
+# Splits a coordIndex-like array on its -1 sentinels, skipping empty faces.
+# Returns the position in index of every loop (reversed within the faces
+# when not ccw), the face of every loop, and loop_start/loop_total per face.
+def importMesh_FaceLoops(index, ccw):
+    is_loop = index != -1
+    loop_pos = numpy.flatnonzero(is_loop)
+    if not len(loop_pos):
+        empty = numpy.zeros(0, dtype=numpy.int32)
+        return empty, empty, empty, empty
+
+    # Faces are numbered by the sentinels in front of them
+    face_raw = numpy.cumsum(~is_loop)[loop_pos]
+    face_first = numpy.empty(len(loop_pos), dtype=bool)
+    face_first[0] = True
+    face_first[1:] = face_raw[1:] != face_raw[:-1]
+
+    loop_face = numpy.cumsum(face_first) - 1
+    loop_start = numpy.flatnonzero(face_first)
+    loop_total = numpy.diff(numpy.append(loop_start, len(loop_pos)))
+
+    if not ccw:
+        first = loop_start[loop_face]
+        last = first + loop_total[loop_face] - 1
+        loop_pos = loop_pos[first + last - numpy.arange(len(loop_pos))]
+
+    return loop_pos, loop_face, loop_start, loop_total
+
+
+def importMesh_IndexedFaceSetArrays(geom, ancestry, bpyima):
+    # See importMesh_IndexedFaceSet for the culling logic.
+    ccw = geom.getFieldAsBool('ccw', True, ancestry)
+    coord = geom.getChildBySpec('Coordinate')
+    if coord.reference:
+        points = coord.getRealNode().parsed
+    else:
+        points = numpy.asarray(coord.getFieldAsArray('point', 0, ancestry), dtype=numpy.float32)
+        points = points[:len(points) - len(points) % 3].reshape(-1, 3)
+        if coord.canHaveReferences():
+            coord.parsed = points
+    index = numpy.asarray(geom.getFieldAsArray('coordIndex', 0, ancestry), dtype=numpy.int32)
+
+    loop_pos, loop_face, loop_start, loop_total = importMesh_FaceLoops(index, ccw)
+    # Indices in the file's vertex set, also used for per-vertex data without an index.
+    loop_vert = index[loop_pos]
+
+    index_len = loop_pos.max() + 1 if len(loop_pos) else 0  # Without trailing -1's
+    if len(points) >= 2 * index_len and len(loop_pos):  # Need to cull
+        # New indices in order of first use
+        used, first_use = numpy.unique(index[:index_len][index[:index_len] != -1], return_index=True)
+        uncull = used[numpy.argsort(first_use)]
+        cull = numpy.zeros(len(points), dtype=numpy.int32)
+        cull[uncull] = numpy.arange(len(uncull), dtype=numpy.int32)
+        verts = points[uncull]
+        mesh_loop_vert = cull[loop_vert]
+    else:
+        verts = points
+        mesh_loop_vert = loop_vert
+
+    bpymesh = bpy.data.meshes.new(name="IndexedFaceSet")
+    bpymesh.vertices.add(len(verts))
+    bpymesh.vertices.foreach_set("co", verts.ravel())
+    bpymesh.loops.add(len(mesh_loop_vert))
+    bpymesh.loops.foreach_set("vertex_index", mesh_loop_vert)
+    bpymesh.polygons.add(len(loop_start))
+    bpymesh.polygons.foreach_set("loop_start", loop_start.astype(numpy.int32))
+    bpymesh.polygons.foreach_set("loop_total", loop_total.astype(numpy.int32))
+    bpymesh.update(calc_edges=True)
+    # No validation here. It throws off the per-face stuff.
+
+    # Similar treatment for normal and color indices, they follow the layout of coordIndex
+    def processPerVertexIndex(ind):
+        if len(ind):
+            return numpy.asarray(ind, dtype=numpy.int32)[loop_pos]
+        else:
+            return loop_vert  # Reuse coordIndex, as per the spec
+
+    def processPerFaceIndex(ind):
+        if len(ind):
+            return numpy.asarray(ind, dtype=numpy.int32)[loop_face]
+        else:
+            return loop_face
+
+    # Normals
+    normals = geom.getChildBySpec('Normal')
+    if normals:
+        per_vertex = geom.getFieldAsBool('normalPerVertex', True, ancestry)
+        vectors = numpy.asarray(normals.getFieldAsArray('vector', 0, ancestry), dtype=numpy.float32).reshape(-1, 3)
+        normal_index = geom.getFieldAsArray('normalIndex', 0, ancestry)
+        if per_vertex:
+            bpymesh.vertices.foreach_set("normal", vectors[processPerVertexIndex(normal_index)].ravel())
+        else:
+            bpymesh.polygons.foreach_set("normal", vectors[processPerFaceIndex(normal_index)].ravel())
+
+    # Apply vertex/face colors
+    colors = geom.getChildBySpec(['ColorRGBA', 'Color'])
+    if colors:
+        if colors.getSpec() == 'ColorRGBA':
+            rgb = numpy.asarray(colors.getFieldAsArray('color', 0, ancestry), dtype=numpy.float32).reshape(-1, 4)[:, :3]
+        else:
+            rgb = numpy.asarray(colors.getFieldAsArray('color', 0, ancestry), dtype=numpy.float32).reshape(-1, 3)
+
+        color_per_vertex = geom.getFieldAsBool('colorPerVertex',
+                                               True, ancestry)
+        color_index = geom.getFieldAsArray('colorIndex', 0, ancestry)
+
+        d = bpymesh.vertex_colors.new().data
+        if color_per_vertex:
+            cco = rgb[processPerVertexIndex(color_index)]
+        else:  # Color per face, with or without index
+            cco = rgb[processPerFaceIndex(color_index)]
+        d.foreach_set('color', cco.ravel())
+
+    # Texture
+    if bpyima:
+        tex_coord = geom.getChildBySpec('TextureCoordinate')
+        if tex_coord:
+            tex_coord_points = numpy.asarray(tex_coord.getFieldAsArray('point', 0, ancestry), dtype=numpy.float32)
+            tex_coord_points = tex_coord_points[:len(tex_coord_points) - len(tex_coord_points) % 2].reshape(-1, 2)
+            tex_index = geom.getFieldAsArray('texCoordIndex', 0, ancestry)
+            loops = tex_coord_points[processPerVertexIndex(tex_index)]
+        else:
+            # Unused vertices don't participate in size; X3DOM does so
+            pts = points[loop_vert]
+            mins = pts.min(axis=0)
+            deltas = pts.max(axis=0) - mins
+            axes = [0, 1, 2]
+            axes.sort(key=lambda a: (-deltas[a], a))
+            # Tuple comparison breaks ties
+            (s_axis, t_axis) = axes[0:2]
+            loops = numpy.empty((len(pts), 2), dtype=numpy.float32)
+            loops[:, 0] = (pts[:, s_axis] - mins[s_axis]) / deltas[s_axis]
+            loops[:, 1] = (pts[:, t_axis] - mins[t_axis]) / deltas[t_axis]
+
+        importMesh_ApplyTextureToLoops(bpymesh, bpyima, loops.ravel())
+
+    bpymesh.validate()
+    bpymesh.update()
+    return bpymesh
+
+
+# First vertex position of every strip/fan of a -1 separated index,
+# for each given position.
+def importMesh_RunStart(is_vert, pos):
+    run_start = numpy.flatnonzero(is_vert & numpy.append(True, ~is_vert[:-1]))
+    return run_start[numpy.searchsorted(run_start, pos, side='right') - 1]
+
+
+# Flat triangle vertex indices of the -1 separated strips in index.
+def importMesh_StripTriangles(index, cw):
+    index = numpy.asarray(index, dtype=numpy.int32)
+    is_vert = index != -1
+    # A triangle starts at every vertex followed by two more of its strip
+    start = numpy.flatnonzero(is_vert[:-2] & is_vert[1:-1] & is_vert[2:])
+    odd = (start - importMesh_RunStart(is_vert, start) + cw) % 2
+    return numpy.column_stack((index[start + odd],
+                               index[start + 1 - odd],
+                               index[start + 2])).ravel()
+
+
+# Flat triangle vertex indices of the -1 separated fans in index.
+def importMesh_FanTriangles(index, cw):
+    index = numpy.asarray(index, dtype=numpy.int32)
+    is_vert = index != -1
+    # Every vertex but the first of a fan, followed by another one, adds a triangle
+    pos = numpy.flatnonzero(is_vert[:-1] & is_vert[1:])
+    first = importMesh_RunStart(is_vert, pos)
+    pos, first = pos[pos != first], first[pos != first]
+    return numpy.column_stack((index[first],
+                               index[pos + cw],
+                               index[pos + 1 - cw])).ravel()
+
+
+# -1 separated index of consecutive runs of vertices, counts[i] vertices long.
+def importMesh_CountsToIndex(counts):
+    counts = numpy.asarray(counts, dtype=numpy.int32)
+    return numpy.insert(numpy.arange(counts.sum(), dtype=numpy.int32), numpy.cumsum(counts)[:-1], -1)
+
+
+def importMesh_TrianglesFromArray(name, geom, ancestry, bpyima, tris):
+    bpymesh = bpy.data.meshes.new(name=name)
+    importMesh_ReadVertices(bpymesh, geom, ancestry)
+    bpymesh.tessfaces.add(len(tris) // 3)
+    bpymesh.tessfaces.foreach_set("vertices", tris)
+    return importMesh_FinalizeTriangleMesh(bpymesh, geom, ancestry, bpyima)
+
+
+def importMesh_IndexedTriangleSetArrays(geom, ancestry, bpyima):
+    # Ignoring solid
+    # colorPerVertex is always true
+    ccw = geom.getFieldAsBool('ccw', True, ancestry)
+    index = numpy.asarray(geom.getFieldAsArray('index', 0, ancestry), dtype=numpy.int32)
+    tris = index[:len(index) - len(index) % 3].reshape(-1, 3)
+    if not ccw:
+        tris = tris[:, (1, 0, 2)]
+    return importMesh_TrianglesFromArray("XXX", geom, ancestry, bpyima, tris.ravel())
+
+
+def importMesh_IndexedTriangleStripSetArrays(geom, ancestry, bpyima):
+    cw = 0 if geom.getFieldAsBool('ccw', True, ancestry) else 1
+    tris = importMesh_StripTriangles(geom.getFieldAsArray('index', 0, ancestry), cw)
+    return importMesh_TrianglesFromArray("IndexedTriangleStripSet", geom, ancestry, bpyima, tris)
+
+
+def importMesh_IndexedTriangleFanSetArrays(geom, ancestry, bpyima):
+    cw = 0 if geom.getFieldAsBool('ccw', True, ancestry) else 1
+    tris = importMesh_FanTriangles(geom.getFieldAsArray('index', 0, ancestry), cw)
+    return importMesh_TrianglesFromArray("IndexedTriangleFanSet", geom, ancestry, bpyima, tris)
+
+
+def importMesh_TriangleStripSetArrays(geom, ancestry, bpyima):
+    cw = 0 if geom.getFieldAsBool('ccw', True, ancestry) else 1
+    index = importMesh_CountsToIndex(geom.getFieldAsArray('stripCount', 0, ancestry))
+    tris = importMesh_StripTriangles(index, cw)
+    return importMesh_TrianglesFromArray("TriangleStripSet", geom, ancestry, bpyima, tris)
+
+
+def importMesh_TriangleFanSetArrays(geom, ancestry, bpyima):
+    cw = 0 if geom.getFieldAsBool('ccw', True, ancestry) else 1
+    index = importMesh_CountsToIndex(geom.getFieldAsArray('fanCount', 0, ancestry))
+    tris = importMesh_FanTriangles(index, cw)
+    return importMesh_TrianglesFromArray("TriangleFanSet", geom, ancestry, bpyima, tris)
+
+
 def importMesh_ElevationGrid(geom, ancestry, bpyima):
     height = geom.getFieldAsArray('height', 0, ancestry)
     x_dim = geom.getFieldAsInt('xDimension', 0, ancestry)
@@ -3023,6 +3127,12 @@ def importShape_ProcessObject(
         if bpymat:
             bpydata.materials.append(bpymat)
 
+    importShape_LinkObject(bpyscene, vrmlname, bpydata, geom, node,
+                           ancestry, global_matrix)
+
+
+def importShape_LinkObject(bpyscene, vrmlname, bpydata, geom, node,
+                           ancestry, global_matrix):
     # Can transform data or object, better the object so we can instance
     # the data
     # bpymesh.transform(getFinalMatrix(node))
@@ -3034,6 +3144,30 @@ def importShape_ProcessObject(
         bpyob["source_line_no"] = geom.lineno
 
 
+def importShape_GeometryCacheKey(geom, ancestry, bpymat, bpyima,
+                                 tex_has_alpha, texmtx):
+    """
+    Geometry USEd by several shapes, or repeated through a PROTO, is
+    imported once and the resulting data shared between the objects.
+    In Blender the material and the texture setup are a part of the mesh,
+    so they're a part of the key along with the geometry node.
+
+    Geometry inside a PROTO body can take its fields from the instance
+    (IS), so there the ancestry nodes are added to the key: only USE of the
+    same PROTO instance shares the data.
+    """
+    ancestry_real = tuple(node.getRealNode() for node in ancestry)
+    if not any(node.proto_node for node in ancestry_real):
+        ancestry_real = None
+
+    return (geom.getRealNode(),
+            ancestry_real,
+            bpymat.name if bpymat else None,
+            bpyima.name if bpyima else None,
+            tex_has_alpha,
+            tuple(tuple(row) for row in texmtx) if texmtx else None)
+
+
 def importText(geom, ancestry, bpyima):
     fmt = geom.getChildBySpec('FontStyle')
     size = fmt.getFieldAsFloat("size", 1, ancestry) if fmt else 1.
@@ -3070,9 +3204,20 @@ geometry_importers = {
     'Text': importText,
     }
 
+if numpy is not None:
+    geometry_importers.update({
+        'IndexedFaceSet': importMesh_IndexedFaceSetArrays,
+        'IndexedTriangleSet': importMesh_IndexedTriangleSetArrays,
+        'IndexedTriangleStripSet': importMesh_IndexedTriangleStripSetArrays,
+        'IndexedTriangleFanSet': importMesh_IndexedTriangleFanSetArrays,
+        'TriangleStripSet': importMesh_TriangleStripSetArrays,
+        'TriangleFanSet': importMesh_TriangleFanSetArrays,
+        })
+
 
 def importShape(bpyscene, node, ancestry, global_matrix):
     # Under Shape, we can only have Appearance, MetadataXXX and a geometry node
+    # Returns True when the shape reuses the data of a previous one.
     def isGeometry(spec):
         return spec != "Appearance" and not spec.startswith("Metadata")
 
@@ -3083,7 +3228,7 @@ def importShape(bpyscene, node, ancestry, global_matrix):
         # Could transform data, but better the object so we can instance the data
         bpyob.matrix_world = getFinalMatrix(node, None, ancestry, global_matrix)
         bpyscene.objects.link(bpyob).select = True
-        return
+        return True
 
     vrmlname = node.getDefName()
     if not vrmlname:
@@ -3093,7 +3238,7 @@ def importShape(bpyscene, node, ancestry, global_matrix):
     geom = node.getChildBySpecCondition(isGeometry)
     if not geom:
         # Oh well, no geometry node in this shape
-        return
+        return False
 
     bpymat = None
     bpyima = None
@@ -3112,9 +3257,17 @@ def importShape(bpyscene, node, ancestry, global_matrix):
         if textx:
             texmtx = translateTexTransform(textx, ancestry)
 
-    bpydata = None
     geom_spec = geom.getSpec()
 
+    cache_key = importShape_GeometryCacheKey(geom, ancestry, bpymat, bpyima,
+                                             tex_has_alpha, texmtx)
+    bpydata = geometry_cache.get(cache_key)
+    if bpydata is not None:
+        # Linked duplicate of an already imported geometry
+        importShape_LinkObject(bpyscene, vrmlname + "_" + geom_spec, bpydata,
+                               geom, node, ancestry, global_matrix)
+        return True
+
     # ccw is handled by every geometry importer separately; some
     # geometries are easier to flip than others
     geom_fn = geometry_importers.get(geom_spec)
@@ -3127,9 +3280,12 @@ def importShape(bpyscene, node, ancestry, global_matrix):
                 bpyscene, vrmlname, bpydata, geom, geom_spec,
                 node, bpymat, tex_has_alpha, texmtx,
                 ancestry, global_matrix)
+        geometry_cache[cache_key] = bpydata
     else:
         print('\tImportX3D warning: unsupported type "%s"' % geom_spec)
 
+    return False
+
 
 # -----------------------------------------------------------------------------------
 # Lighting
@@ -3479,6 +3635,10 @@ def load_web3d(
     # fill with tuples - (node, [parents-parent, parent])
     all_nodes = root_node.getSerialized([], [])
 
+    # Shared data from a previous import may have been removed since
+    geometry_cache.clear()
+    shape_count = shape_reused = 0
+
     for node, ancestry in all_nodes:
         #if 'castle.wrl' not in node.getFilename():
         #   continue
@@ -3495,7 +3655,9 @@ def load_web3d(
             # by an external script. - gets first pick
             pass
         if spec == 'Shape':
-            importShape(bpyscene, node, ancestry, global_matrix)
+            shape_count += 1
+            if importShape(bpyscene, node, ancestry, global_matrix):
+                shape_reused += 1
         elif spec in {'PointLight', 'DirectionalLight', 'SpotLight'}:
             importLamp(bpyscene, node, spec, ancestry, global_matrix)
         elif spec == 'Viewpoint':
@@ -3511,6 +3673,10 @@ def load_web3d(
             translatePositionInterpolator(node, action)
             '''
 
+    if shape_reused:
+        print("ImportX3D: %d of %d shapes reuse the data of another shape" %
+              (shape_reused, shape_count))
+
     # After we import all nodes, route events - anim paths
     for node, ancestry in all_nodes:
         importRoute(node, ancestry)
@@ -72,6 +72,12 @@ class ImportMDD(bpy.types.Operator, ImportHelper):
             min=1, max=1000,
             default=1,
             )
+    use_mesh_cache = BoolProperty(
+            name="Mesh Cache Modifier",
+            description="Play the file back with a Mesh Cache modifier "
+                        "instead of creating a shape key per frame",
+            default=False,
+            )
 
     @classmethod
     def poll(cls, context):
@@ -131,6 +137,18 @@ class ExportMDD(bpy.types.Operator, ExportHelper):
             description="Write the rest state at the first frame",
             default=False,
             )
+    use_workers = BoolProperty(
+            name="Parallel Export",
+            description="Evaluate the frame range in background Blender processes "
+                        "(the blend-file is saved to a temporary copy for them)",
+            default=False,
+            )
+    workers = IntProperty(
+            name="Workers",
+            description="Number of worker processes evaluating frames (0 for one per CPU)",
+            min=0, max=256,
+            default=0,
+            )
 
     @classmethod
     def poll(cls, context):
@@ -31,7 +31,7 @@ Be sure not to use modifiers that change the number or order of verts in the mes
 
 import bpy
 import mathutils
-from struct import pack
+import point_cache
 
 
 def zero_file(filepath):
@@ -51,7 +51,8 @@ def check_vertcount(mesh, vertcount):
         raise Exception('Error, number of verts has changed during animation, cannot export')
 
 
-def save(context, filepath="", frame_start=1, frame_end=300, fps=25.0, use_rest_frame=False):
+def save(context, filepath="", frame_start=1, frame_end=300, fps=25.0, use_rest_frame=False,
+         use_workers=False, workers=0):
     """
     Blender.Window.WaitCursor(1)
 
@@ -87,31 +88,41 @@ def save(context, filepath="", frame_start=1, frame_end=300, fps=25.0, use_rest_
 
     f = open(filepath, 'wb')  # no Errors yet:Safe to create file
 
-    # Write the header
-    f.write(pack(">2i", numframes, numverts))
-
-    # Write the frame times (should we use the time IPO??)
-    f.write(pack(">%df" % (numframes), *[frame / fps for frame in range(numframes)]))  # seconds
+    # Write the header and the frame times (should we use the time IPO??)
+    point_cache.mdd_header_write(f, numframes, numverts,
+                                 [frame / fps for frame in range(numframes)])  # seconds
 
     if use_rest_frame:
         check_vertcount(me, numverts)
         me.transform(mat_flip * obj.matrix_world)
-        f.write(pack(">%df" % (numverts * 3), *[axis for v in me.vertices for axis in v.co]))
+        point_cache.write_floats(f, point_cache.frame_coords(me.vertices), point_cache.MDD)
 
     bpy.data.meshes.remove(me, do_unlink=True)
 
-    for frame in range(frame_start, frame_end + 1):  # in order to start at desired frame
-        scene.frame_set(frame)
-        me = obj.to_mesh(scene, True, 'PREVIEW')
-        check_vertcount(me, numverts)
-        me.transform(mat_flip * obj.matrix_world)
-
-        # Write the vertex data
-        f.write(pack(">%df" % (numverts * 3), *[axis for v in me.vertices for axis in v.co]))
-
-        bpy.data.meshes.remove(me, do_unlink=True)
-
-    f.close()
+    if use_workers:
+        # Background Blender processes evaluate the frames and write them in place.
+        f.close()
+        point_cache.export_frames_parallel(obj, filepath, point_cache.MDD,
+                                           point_cache.mdd_header_size(numframes),
+                                           int(use_rest_frame),
+                                           range(frame_start, frame_end + 1),
+                                           numverts,
+                                           workers=workers,
+                                           use_world_space=True,
+                                           matrix=mat_flip)
+    else:
+        for frame in range(frame_start, frame_end + 1):  # in order to start at desired frame
+            scene.frame_set(frame)
+            me = obj.to_mesh(scene, True, 'PREVIEW')
+            check_vertcount(me, numverts)
+            me.transform(mat_flip * obj.matrix_world)
+
+            # Write the vertex data
+            point_cache.write_floats(f, point_cache.frame_coords(me.vertices), point_cache.MDD)
+
+            bpy.data.meshes.remove(me, do_unlink=True)
+
+        f.close()
 
     print('MDD Exported: %r frames:%d\n' % (filepath, numframes - 1))
     scene.frame_set(orig_frame)
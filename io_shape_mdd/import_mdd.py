@@ -32,57 +32,53 @@
 # Bill Niewuendorp
 
 import bpy
-from struct import unpack
+import point_cache
 
-def set_linear_interpolation(obj, shapekey):
-    anim_data = obj.data.shape_keys.animation_data
-    data_path = "key_blocks[\"" + shapekey.name + "\"].value"
 
-    for fcu in anim_data.action.fcurves:
-        if fcu.data_path == data_path:
-            for keyframe in fcu.keyframe_points:
-                keyframe.interpolation = 'LINEAR'
+def shape_keys_action(obj):
+    shape_keys = obj.data.shape_keys
+    anim_data = shape_keys.animation_data or shape_keys.animation_data_create()
+    if anim_data.action is None:
+        anim_data.action = bpy.data.actions.new(shape_keys.name + "Action")
+    return anim_data.action
 
 
-def obj_update_frame(file, scene, obj, start, fr, step):
+def obj_update_frame(coords, action, obj, start, fr, step):
 
     # Insert new shape key
     new_shapekey = obj.shape_key_add()
     new_shapekey.name = ("frame_%.4d" % fr)
-    new_shapekey_index = len(obj.data.shape_keys.key_blocks) - 1
 
-    obj.active_shape_key_index = new_shapekey_index
-    obj.show_only_shape_key = True
+    point_cache.frame_coords_set(new_shapekey.data, coords)
 
-    verts = new_shapekey.data
-
-    for v in verts:  # 12 is the size of 3 floats
-        v.co[:] = unpack('>3f', file.read(12))
-
-    # me.update()
-    obj.show_only_shape_key = False
-
-    # insert keyframes
-    new_shapekey = obj.data.shape_keys.key_blocks[new_shapekey_index]
+    # insert keyframes: 0.0 on the neighbouring frames, 1.0 on this one
     frame = start + fr*step
+    data_path = new_shapekey.path_from_id("value")
 
-    new_shapekey.value = 0.0
-    new_shapekey.keyframe_insert("value", frame=frame - step)
+    fcu = action.fcurves.new(data_path, action_group=new_shapekey.name)
+    fcu.keyframe_points.add(3)
+    fcu.keyframe_points.foreach_set("co", (frame - step, 0.0,
+                                           frame, 1.0,
+                                           frame + step, 0.0))
+    for keyframe in fcu.keyframe_points:
+        keyframe.interpolation = 'LINEAR'
+    fcu.update()
 
-    new_shapekey.value = 1.0
-    new_shapekey.keyframe_insert("value", frame=frame)
 
-    new_shapekey.value = 0.0
-    new_shapekey.keyframe_insert("value", frame=frame + step)
-
-    set_linear_interpolation(obj, new_shapekey)
-
-    obj.data.update()
+def load_mesh_cache(obj, filepath, frame_start, frame_step):
+    """Play the file back through a Mesh Cache modifier instead of baking shape keys."""
+    mod = obj.modifiers.new(bpy.path.display_name_from_filepath(filepath), 'MESH_CACHE')
+    mod.cache_format = 'MDD'
+    mod.filepath = filepath
+    mod.time_mode = 'FRAME'
+    mod.frame_start = frame_start
+    mod.frame_scale = 1.0 / frame_step
+    mod.play_mode = 'SCENE'
+    return mod
 
 
-def load(context, filepath, frame_start=0, frame_step=1):
+def load(context, filepath, frame_start=0, frame_step=1, use_mesh_cache=False):
 
-    scene = context.scene
     obj = context.object
 
     print('\n\nimporting mdd %r' % filepath)
@@ -91,19 +87,32 @@ def load(context, filepath, frame_start=0, frame_step=1):
         bpy.ops.object.mode_set(mode='OBJECT')
 
     file = open(filepath, 'rb')
-    frames, points = unpack(">2i", file.read(8))
-    time = unpack((">%df" % frames), file.read(frames * 4))
+    frames, points, time = point_cache.mdd_header_read(file)
 
     print('\tpoints:%d frames:%d' % (points, frames))
     print('\tstart frame:%d step:%d' % (frame_start, frame_step))
 
-    # If target object doesn't have Basis shape key, create it.
-    if not obj.data.shape_keys:
-        basis = obj.shape_key_add()
-        basis.name = "Basis"
-        obj.data.update()
+    if use_mesh_cache:
+        file.close()
+        load_mesh_cache(obj, filepath, frame_start, frame_step)
+        return {'FINISHED'}
 
-    for i in range(frames):
-        obj_update_frame(file, scene, obj, frame_start, i, frame_step)
+    with file:
+        # Frames are read one at a time while the shape keys are added.
+        frame_coords = point_cache.read_frames(file, frames, points, point_cache.MDD)
+
+        # If target object doesn't have Basis shape key, create it.
+        if not obj.data.shape_keys:
+            basis = obj.shape_key_add()
+            basis.name = "Basis"
+            obj.data.update()
+
+        action = shape_keys_action(obj)
+
+        for i, coords in enumerate(frame_coords):
+            obj_update_frame(coords, action, obj, frame_start, i, frame_step)
+
+    obj.active_shape_key_index = len(obj.data.shape_keys.key_blocks) - 1
+    obj.data.update()
 
     return {'FINISHED'}
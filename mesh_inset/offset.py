@@ -30,6 +30,9 @@ from .triquad import Sub2, Add2, Angle, Ccw, Normalized2, Perp2, Length2, \
 from .geom import Points
 
 AREATOL = 1e-4
+GRIDMIN = 64      # number of spokes from which events are found with a grid
+GRIDCELLS = 4     # target number of advancing edges per _SpokeGrid cell
+GRIDMAXSPAN = 64  # boxes covering more _SpokeGrid cells than this aren't binned
 
 
 class Spoke(object):
@@ -294,6 +297,102 @@ class OffsetEvent(object):
                                       repr(self.spoke), repr(self.other))
 
 
+class _SpokeGrid(object):
+    """Uniform grid over the areas swept by the advancing edges of an Offset.
+
+    An advancing edge (represented by its first spoke, as in
+    Spoke.EdgeEvent) sweeps, up to time horizon, an area inside the
+    bounding box of the origins and horizon end points of its two spokes.
+    An edge event of a spoke before horizon lies both in that box and on
+    the spoke, so only edges whose boxes overlap the spoke's box need to
+    be checked.
+
+    Attributes:
+      horizon: float - time the swept boxes extend to
+      pos: list of tuple of float - coordinates of the offset's points
+      spokes: list of Spoke - all spokes of the Offset, in facespokes order
+      minx, miny: float - grid origin
+      cellsize: float - side of a grid cell
+      cells: dict of (int, int) to list of int - indices into spokes of
+          the edges whose box overlaps each cell
+      wide: list of int - edges with too big a box, always candidates
+    """
+
+    def __init__(self, offset, spokes, horizon):
+        self.horizon = horizon
+        self.pos = offset.polyarea.points.pos
+        self.spokes = spokes
+        xs = [self.pos[s.origin][0] for s in spokes]
+        ys = [self.pos[s.origin][1] for s in spokes]
+        self.minx = min(xs)
+        self.miny = min(ys)
+        w = max(xs) - self.minx
+        h = max(ys) - self.miny
+        n = len(spokes)
+        self.cellsize = max(math.sqrt(w * h * GRIDCELLS / n),
+                            max(w, h) * GRIDCELLS / n)
+        if self.cellsize <= 0.0:
+            self.cellsize = 1.0
+        self.cells = dict()
+        self.wide = []
+        for i, s in enumerate(spokes):
+            f = offset.facespokes[s.face]
+            box = self._Box((s, f[(s.index + 1) % len(f)]))
+            if box is None:
+                self.wide.append(i)
+                continue
+            (ix0, iy0, ix1, iy1) = box
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    cell = self.cells.get((ix, iy))
+                    if cell is None:
+                        self.cells[(ix, iy)] = [i]
+                    else:
+                        cell.append(i)
+
+    def _Box(self, spokes):
+        """Return the cell range (ix0, iy0, ix1, iy1) of the bounding box
+        of spokes from their origins to the horizon, or None if too big."""
+
+        xs = []
+        ys = []
+        for s in spokes:
+            p = self.pos[s.origin]
+            d = s.speed * self.horizon
+            xs.extend((p[0], p[0] + d * s.dir[0]))
+            ys.extend((p[1], p[1] + d * s.dir[1]))
+        pad = geom.DISTTOL
+        c = self.cellsize
+        ix0 = int(math.floor((min(xs) - pad - self.minx) / c))
+        iy0 = int(math.floor((min(ys) - pad - self.miny) / c))
+        ix1 = int(math.floor((max(xs) + pad - self.minx) / c))
+        iy1 = int(math.floor((max(ys) + pad - self.miny) / c))
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > GRIDMAXSPAN:
+            return None
+        return (ix0, iy0, ix1, iy1)
+
+    def Candidates(self, spoke):
+        """Return the spokes whose advancing edges may have an edge event
+        with spoke before the horizon, in facespokes order.
+
+        Returns:
+          None or list of Spoke - None if the spoke's box is too big
+              (caller should check all edges)
+        """
+
+        box = self._Box((spoke,))
+        if box is None:
+            return None
+        (ix0, iy0, ix1, iy1) = box
+        found = set(self.wide)
+        for ix in range(ix0, ix1 + 1):
+            for iy in range(iy0, iy1 + 1):
+                cell = self.cells.get((ix, iy))
+                if cell:
+                    found.update(cell)
+        return [self.spokes[i] for i in sorted(found)]
+
+
 class Offset(object):
     """Represents an offset polygonal area, and used to construct one.
 
@@ -391,60 +490,161 @@ class Offset(object):
               next Vertex event list and next Edge event list
         """
 
+        return self._SpokeEvents(spoke)[0:3]
+
+    def _SpokeEvents(self, spoke, others=None):
+        """Like NextSpokeEvents, optionally only checking some edges.
+
+        Args:
+          spoke: Spoke - a spoke in one of the faces of this object
+          others: None or list of Spoke - if given, only the advancing edges
+              of these spokes are checked for edge events (in this order)
+        Returns:
+          (float, list of OffsetEvent, list of OffsetEvent, list of float) -
+              as NextSpokeEvents, plus the times of all events found
+        """
+
         facespokes = self.facespokes[spoke.face]
         n = len(facespokes)
         bestt = 1e100
         bestv = []
         beste = []
+        times = []
         # First find vertex event (only the one with next spoke)
         next_spoke = facespokes[(spoke.index + 1) % n]
         ev = spoke.VertexEvent(next_spoke, self.polyarea.points)
         if ev:
             bestv = [ev]
             bestt = ev.time
+            times.append(ev.time)
         # Now find edge events, if this is a reflex vertex
         if spoke.is_reflex:
             prev_spoke = facespokes[(spoke.index - 1) % n]
-            for f in self.facespokes:
-                for other in f:
-                    if other == spoke or other == prev_spoke:
-                        continue
-                    ev = spoke.EdgeEvent(other, self)
-                    if ev:
-                        if ev.time < bestt - TOL:
-                            beste = []
-                            bestv = []
-                            bestt = ev.time
-                        if abs(ev.time - bestt) < TOL:
-                            beste.append(ev)
-        return (bestt, bestv, beste)
+            if others is None:
+                others = [other for f in self.facespokes for other in f]
+            for other in others:
+                if other == spoke or other == prev_spoke:
+                    continue
+                ev = spoke.EdgeEvent(other, self)
+                if ev:
+                    times.append(ev.time)
+                    if ev.time < bestt - TOL:
+                        beste = []
+                        bestv = []
+                        bestt = ev.time
+                    if abs(ev.time - bestt) < TOL:
+                        beste.append(ev)
+        return (bestt, bestv, beste, times)
+
+    def _NearSpokeEvents(self, spokes):
+        """Return NextSpokeEvents for the spokes with the earliest events.
+
+        Events are collected the way Build does: an event earlier by more
+        than TOL replaces the ones found so far, one within TOL is added.
+        So if no event at all happens in [cut - 2*TOL, cut) and some happens
+        before, the events at cut or later can't change the result and can
+        be left out, both per spoke and among spokes.
+        Edge events are only checked for advancing edges near the spoke,
+        found with a _SpokeGrid up to a horizon of about twice the earliest
+        vertex event time; all event times before that are then known and
+        cut is placed after the earliest run of events closer than 3*TOL.
+
+        Args:
+          spokes: list of Spoke - all spokes, in facespokes order
+        Returns:
+          None or list of (float, list of OffsetEvent, list of OffsetEvent) -
+              NextSpokeEvents results for the spokes with events before
+              cut, in order; None if no cut was found before the horizon
+              (then all spokes need the full NextSpokeEvents)
+        """
+
+        points = self.polyarea.points
+        vtimes = []
+        for s in spokes:
+            f = self.facespokes[s.face]
+            ev = s.VertexEvent(f[(s.index + 1) % len(f)], points)
+            if ev:
+                vtimes.append(ev.time)
+        if not vtimes:
+            return None
+        # skip the (near) zero times of coincident vertices
+        nonzero = [t for t in vtimes if t > 10.0 * TOL]
+        horizon = 2.0 * (min(nonzero) if nonzero else min(vtimes)) + 4.0 * TOL
+        grid = _SpokeGrid(self, spokes, horizon)
+        allspokes = None
+        results = []
+        times = []
+        for s in spokes:
+            others = None
+            if s.is_reflex:
+                others = grid.Candidates(s)
+                if others is None:
+                    if allspokes is None:
+                        allspokes = list(spokes)
+                    others = allspokes
+            res = self._SpokeEvents(s, others)
+            results.append(res)
+            times.extend(t for t in res[3] if t < horizon)
+        times.sort()
+        cut = None
+        for i, t in enumerate(times):
+            if i + 1 == len(times) or times[i + 1] >= t + 3.0 * TOL:
+                cut = t + 3.0 * TOL
+                break
+        if cut is None or cut > horizon:
+            return None
+        return [res[0:3] for res in results if res[0] < cut]
 
     def Build(self, target=2e100):
         """Build the complete Offset structure or up until target time.
 
         Find the next event(s), makes the appropriate inner Offsets
-        that are inside this one, and calls Build on those Offsets to continue
-        the process until only a single point is left or time reaches target.
+        that are inside this one, and continues the process with those
+        Offsets until only a single point is left or time reaches target.
+        The Offsets are processed depth first from an explicit stack
+        (in the same order as a recursive Build would), so the nesting
+        depth is not limited by the recursion limit.
         """
 
+        stack = [(self, target)]
+        while stack:
+            (off, target) = stack.pop()
+            nexttarget = off._BuildStep(target)
+            if nexttarget > TOL:
+                stack.extend((o, nexttarget) for o in reversed(off.inneroffsets))
+
+    def _BuildStep(self, target):
+        """Process the next event(s) of this Offset only.
+
+        Sets self.endtime and makes self.inneroffsets (not built yet).
+
+        Returns:
+          float - the target time for the inner offsets,
+              0.0 if there is nothing more to build
+        """
+
+        spokes = [s for f in self.facespokes for s in f]
+        spokeevents = None
+        if len(spokes) >= GRIDMIN:
+            spokeevents = self._NearSpokeEvents(spokes)
+        if spokeevents is None:
+            spokeevents = [self.NextSpokeEvents(s) for s in spokes]
         bestt = 1e100
         bestevs = [[], []]
-        for f in self.facespokes:
-            for s in f:
-                (t, ve, ee) = self.NextSpokeEvents(s)
-                if t < bestt - TOL:
-                    bestevs = [[], []]
-                    bestt = t
-                if abs(t - bestt) < TOL:
-                    bestevs[0].extend(ve)
-                    bestevs[1].extend(ee)
+        for (t, ve, ee) in spokeevents:
+            if t < bestt - TOL:
+                bestevs = [[], []]
+                bestt = t
+            if abs(t - bestt) < TOL:
+                bestevs[0].extend(ve)
+                bestevs[1].extend(ee)
         if bestt == 1e100:
             # could happen if polygon is oriented wrong
             # or in other special cases
-            return
+            return 0.0
         if abs(bestt) < TOL:
             # seems to be in a loop, so quit
-            return
+            return 0.0
         self.endtime = bestt
         (ve, ee) = bestevs
         newfaces = []
@@ -518,9 +718,8 @@ class Offset(object):
             self.inneroffsets = [Offset(pa, newt, self.vspeed)]
             if pa2:
                 self.inneroffsets.append(Offset(pa2, newt, self.vspeed))
-            if nexttarget > TOL:
-                for o in self.inneroffsets:
-                    o.Build(nexttarget)
+            return nexttarget
+        return 0.0
 
     def FaceAtSpokeEnds(self, f, t):
         """Return a new face that is at the spoke ends of face f at time t.
@@ -715,10 +914,15 @@ class Offset(object):
         return max_amount
 
     def _MaxTime(self):
-        if self.inneroffsets:
-            return max([o._MaxTime() for o in self.inneroffsets])
-        else:
-            return self.timesofar + self.endtime
+        ans = 0.0
+        stack = [self]
+        while stack:
+            o = stack.pop()
+            if o.inneroffsets:
+                stack.extend(o.inneroffsets)
+            else:
+                ans = max(ans, o.timesofar + o.endtime)
+        return ans
 
 
 def _AddInnerAreas(off, polyareas):
@@ -734,23 +938,33 @@ def _AddInnerAreas(off, polyareas):
       added to polyareas.
     """
 
-    if off.inneroffsets:
-        for o in off.inneroffsets:
-            _AddInnerAreas(o, polyareas)
-    else:
-        newpa = geom.PolyArea(polyareas.points)
-        for i, f in enumerate(off.facespokes):
-            newface = off.FaceAtSpokeEnds(f, off.endtime)
-            area = abs(geom.SignedArea(newface, polyareas.points))
-            if area < AREATOL:
-                if i == 0:
-                    break
-                else:
-                    continue
+    # depth first, in the same order as recursing into the inner offsets
+    stack = [off]
+    while stack:
+        off = stack.pop()
+        if off.inneroffsets:
+            stack.extend(reversed(off.inneroffsets))
+        else:
+            _AddLeafArea(off, polyareas)
+
+
+def _AddLeafArea(off, polyareas):
+    """Add the inside of offset off, which has no inner offsets,
+    to polyareas."""
+
+    newpa = geom.PolyArea(polyareas.points)
+    for i, f in enumerate(off.facespokes):
+        newface = off.FaceAtSpokeEnds(f, off.endtime)
+        area = abs(geom.SignedArea(newface, polyareas.points))
+        if area < AREATOL:
             if i == 0:
-                newpa.poly = newface
-                newpa.data = off.polyarea.data
+                break
             else:
-                newpa.holes.append(newface)
-        if newpa.poly:
-            polyareas.polyareas.append(newpa)
+                continue
+        if i == 0:
+            newpa.poly = newface
+            newpa.data = off.polyarea.data
+        else:
+            newpa.holes.append(newface)
+    if newpa.poly:
+        polyareas.polyareas.append(newpa)
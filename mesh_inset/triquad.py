@@ -21,7 +21,6 @@
 
 from . import geom
 import math
-import random
 from math import sqrt, hypot
 
 # Points are 3-tuples or 2-tuples of reals: (x,y,z) or (x,y)
@@ -31,7 +30,8 @@ from math import sqrt, hypot
 # Vmaps are lists taking vertex index -> Point
 
 TOL = 1e-7     # a tolerance for fuzzy equality
-GTHRESH = 75   # threshold above which use greedy to _Quandrangulate
+SWEEPMIN = 64  # faces with at least this many vertices use SweepTriFace
+CYCLEMAX = 4   # max cycles per component for which _MaxMatch is exact
 ANGFAC = 1.0   # weighting for angles in quad goodness measure
 DEGFAC = 10.0  # weighting for degree in quad goodness measure
 
@@ -59,7 +59,7 @@ def TriangulateFace(face, points):
 
     if len(face) <= 3:
         return [tuple(face)]
-    tris = EarChopTriFace(face, points)
+    tris = _TriFace(face, [], points)
     bord = _BorderEdges([face])
     triscdt = _CDT(tris, bord, points)
     return triscdt
@@ -70,7 +70,8 @@ def TriangulateFaceWithHoles(face, holes, points):
 
     Works by making one complex polygon that has segments to
     and from the holes ("islands"), and then using the same method
-    as TriangulateFace.
+    as TriangulateFace (large faces are swept with their holes
+    directly, see SweepTriFace).
 
     Args:
       face: list of int - indices in points, assumed CCW-oriented
@@ -85,9 +86,7 @@ def TriangulateFaceWithHoles(face, holes, points):
     if len(holes) == 0:
         return TriangulateFace(face, points)
     allfaces = [face] + holes
-    sholes = [_SortFace(h, points) for h in holes]
-    joinedface = _JoinIslands(face, sholes, points)
-    tris = EarChopTriFace(joinedface, points)
+    tris = _TriFace(face, holes, points)
     bord = _BorderEdges(allfaces)
     triscdt = _CDT(tris, bord, points)
     return triscdt
@@ -109,7 +108,7 @@ def QuadrangulateFace(face, points):
 
     if len(face) <= 3:
         return [tuple(face)]
-    tris = EarChopTriFace(face, points)
+    tris = _TriFace(face, [], points)
     bord = _BorderEdges([face])
     triscdt = _CDT(tris, bord, points)
     qs = _Quandrangulate(triscdt, bord, points)
@@ -132,15 +131,30 @@ def QuadrangulateFaceWithHoles(face, holes, points):
     if len(holes) == 0:
         return QuadrangulateFace(face, points)
     allfaces = [face] + holes
-    sholes = [_SortFace(h, points) for h in holes]
-    joinedface = _JoinIslands(face, sholes, points)
-    tris = EarChopTriFace(joinedface, points)
+    tris = _TriFace(face, holes, points)
     bord = _BorderEdges(allfaces)
     triscdt = _CDT(tris, bord, points)
     qs = _Quandrangulate(triscdt, bord, points)
     return qs
 
 
+def _TriFace(face, holes, points):
+    """Return the initial triangulation of face with holes, before _CDT.
+
+    Faces with at least SWEEPMIN vertices (holes included) use
+    SweepTriFace.  Smaller faces, and those SweepTriFace gives up on,
+    have their holes joined in and are ear-chopped."""
+
+    if len(face) + sum([len(h) for h in holes]) >= SWEEPMIN:
+        tris = SweepTriFace(face, holes, points)
+        if tris is not None:
+            return tris
+    if len(holes) > 0:
+        sholes = [_SortFace(h, points) for h in holes]
+        face = _JoinIslands(face, sholes, points)
+    return EarChopTriFace(face, points)
+
+
 def _SortFace(face, points):
     """Rotate face so leftmost vertex is first, where face is
     list of indices in points."""
@@ -315,6 +329,308 @@ def _InCone(vtest, a, b, c, bkind, points):
         return Ccw(a, b, vtest, points) and Ccw(b, c, vtest, points)
 
 
+def SweepTriFace(face, holes, points):
+    """Triangulate face with holes using a sweep line.
+
+    Sweeping from top to bottom, add diagonals at the split and merge
+    vertices to cut the face into y-monotone pieces, then triangulate
+    each piece with a stack in linear time.  This takes O(n log n)
+    comparisons, while EarChopTriFace (after _JoinIslands) is O(n^2)
+    or worse.  The sweep needs a proper face, so return None if a vertex
+    is repeated or the triangles don't exactly tile the face (touching
+    or crossing boundaries); the caller should then use EarChopTriFace.
+
+    Args:
+      face: list of int - indices in points, assumed CCW-oriented
+      holes: list of list of int - each sublist is like face
+          but CW-oriented and assumed to be inside face
+      points: geom.Points - holds coordinates for vertices
+    Returns:
+      list of (int, int, int) - 3-tuples are CCW-oriented vertices of
+          triangles making up the triangulation, or None
+    """
+
+    # The sweep works on nodes (positions in face and holes), linked so
+    # that going from a node to nxt[node] always has the inside on the left.
+    verts = []
+    nxt = []
+    prv = []
+    for ring in [face] + holes:
+        n = len(ring)
+        if n < 3:
+            return None
+        base = len(verts)
+        for i in range(0, n):
+            verts.append(ring[i])
+            nxt.append(base + (i + 1) % n)
+            prv.append(base + (i - 1) % n)
+    nn = len(verts)
+    if len(set(verts)) != nn:
+        return None
+    co = [(points.pos[v][0], points.pos[v][1]) for v in verts]
+    # node i is 'above' node j if rank[i] < rank[j]:
+    # higher y first, and lower x first for equal y
+    order = sorted(range(0, nn), key=lambda i: (-co[i][1], co[i][0]))
+    rank = [0] * nn
+    for r in range(0, nn):
+        rank[order[r]] = r
+    diags = _SweepDiags(order, rank, co, nxt, prv)
+    if diags is None:
+        return None
+    pieces = _SweepPieces(nxt, diags, co)
+    if pieces is None:
+        return None
+    tris = []
+    for piece in pieces:
+        ptris = _TriMonotone(piece, rank, co)
+        if ptris is None:
+            return None
+        tris.extend(ptris)
+    # check that the triangles tile the face
+    if len(tris) != nn - 2 + 2 * len(holes):
+        return None
+    area = 0.0
+    for ring in [face] + holes:
+        area += geom.SignedArea(ring, points)
+    if area <= 0.0:
+        return None
+    tol = TOL * area
+    tarea = 0.0
+    for (a, b, c) in tris:
+        ta = _Cross(co[a], co[b], co[c])
+        if ta < - tol:
+            return None
+        tarea += ta
+    if abs(0.5 * tarea - area) > tol:
+        return None
+    return [(verts[a], verts[b], verts[c]) for (a, b, c) in tris]
+
+
+def _Cross(a, b, c):
+    """Return twice the signed area of triangle with 2d coords a, b, c."""
+
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def _SweepDiags(order, rank, co, nxt, prv):
+    """Sweep helper for SweepTriFace.
+
+    Visit the nodes in order, keeping the edges that have the inside on
+    their right, sorted left to right, and for each of them the 'helper'
+    node that new diagonals can go to.  Return a list of diagonals (node
+    pairs) that split the face into y-monotone pieces, or None if
+    the input is degenerate."""
+
+    status = []
+    helper = dict()
+    merge = [False] * len(order)
+    diags = []
+    for v in order:
+        p = prv[v]
+        q = nxt[v]
+        turn = _Cross(co[p], co[v], co[q])
+        pbelow = rank[p] > rank[v]
+        qbelow = rank[q] > rank[v]
+        if pbelow and qbelow:
+            # start vertex, or split vertex if reflex
+            if turn == 0.0:
+                return None
+            if turn < 0.0:
+                e = _SweepLeft(status, co[v], co, nxt)
+                if e is None:
+                    return None
+                diags.append((v, helper[e]))
+                helper[e] = v
+            status.insert(_SweepFind(status, co[v], co, nxt), v)
+            helper[v] = v
+        elif not pbelow and not qbelow:
+            # end vertex, or merge vertex if reflex
+            if turn == 0.0:
+                return None
+            h = helper.pop(p, None)
+            if h is None:
+                return None
+            if merge[h]:
+                diags.append((v, h))
+            status.remove(p)
+            if turn < 0.0:
+                merge[v] = True
+                e = _SweepLeft(status, co[v], co, nxt)
+                if e is None:
+                    return None
+                if merge[helper[e]]:
+                    diags.append((v, helper[e]))
+                helper[e] = v
+        elif not pbelow:
+            # regular vertex with the inside on its right
+            h = helper.pop(p, None)
+            if h is None:
+                return None
+            if merge[h]:
+                diags.append((v, h))
+            status.remove(p)
+            status.insert(_SweepFind(status, co[v], co, nxt), v)
+            helper[v] = v
+        else:
+            # regular vertex with the inside on its left
+            e = _SweepLeft(status, co[v], co, nxt)
+            if e is None:
+                return None
+            if merge[helper[e]]:
+                diags.append((v, helper[e]))
+            helper[e] = v
+    return diags
+
+
+def _SweepX(e, y, co, nxt):
+    """Return x where edge (e, nxt[e]) crosses the sweep line at y."""
+
+    (ax, ay) = co[e]
+    (bx, by) = co[nxt[e]]
+    if ay == by:
+        return min(ax, bx)
+    return ax + (y - ay) * (bx - ax) / (by - ay)
+
+
+def _SweepFind(status, pos, co, nxt):
+    """Return the number of edges in status that are left of pos."""
+
+    (x, y) = pos
+    lo = 0
+    hi = len(status)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _SweepX(status[mid], y, co, nxt) < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _SweepLeft(status, pos, co, nxt):
+    """Return the edge in status directly left of pos, or None."""
+
+    i = _SweepFind(status, pos, co, nxt)
+    if i == 0:
+        return None
+    return status[i - 1]
+
+
+def _SweepPieces(nxt, diags, co):
+    """Return the faces that the diagonals cut the face into, each a
+    list of nodes with the inside on the left, or None if
+    the walk goes wrong (on degenerate input)."""
+
+    ends = dict()
+    for (a, b) in diags:
+        ends.setdefault(a, []).append(b)
+        ends.setdefault(b, []).append(a)
+    halfedges = [(i, nxt[i]) for i in range(0, len(nxt))]
+    for (a, b) in diags:
+        halfedges.append((a, b))
+        halfedges.append((b, a))
+    used = set()
+    pieces = []
+    twopi = 2.0 * math.pi
+    for he in halfedges:
+        if he in used:
+            continue
+        piece = []
+        (u, v) = he
+        while True:
+            used.add((u, v))
+            piece.append(u)
+            if v not in ends:
+                w = nxt[v]
+            else:
+                # next is the first edge out of v clockwise from v->u
+                (vx, vy) = co[v]
+                ref = math.atan2(co[u][1] - vy, co[u][0] - vx)
+                w = None
+                bestcw = 0.0
+                for c in [nxt[v]] + ends[v]:
+                    cw = (ref - math.atan2(co[c][1] - vy, co[c][0] - vx)) \
+                        % twopi
+                    if cw <= 0.0:
+                        cw = twopi
+                    if w is None or cw < bestcw:
+                        (w, bestcw) = (c, cw)
+            (u, v) = (v, w)
+            if (u, v) == he:
+                break
+            if (u, v) in used:
+                return None
+        if len(piece) < 3:
+            return None
+        pieces.append(piece)
+    return pieces
+
+
+def _TriMonotone(poly, rank, co):
+    """Triangulate y-monotone polygon poly (list of nodes, inside on the
+    left) using the stack method.  Return list of CCW node triples,
+    or None if poly isn't monotone."""
+
+    k = len(poly)
+    if k == 3:
+        return [tuple(poly)]
+    top = min(range(0, k), key=lambda i: rank[poly[i]])
+    bot = max(range(0, k), key=lambda i: rank[poly[i]])
+    # going CCW from top down to bottom is the left chain
+    left = set()
+    i = top
+    while i != bot:
+        j = (i + 1) % k
+        if rank[poly[j]] < rank[poly[i]]:
+            return None
+        left.add(poly[i])
+        i = j
+    while i != top:
+        j = (i + 1) % k
+        if rank[poly[j]] > rank[poly[i]]:
+            return None
+        i = j
+    nodes = sorted(poly, key=lambda v: rank[v])
+    ans = []
+    stack = [nodes[0], nodes[1]]
+    for j in range(2, k - 1):
+        u = nodes[j]
+        uleft = u in left
+        if uleft != (stack[-1] in left):
+            # u is on the other chain: it sees everything on the stack
+            while len(stack) > 1:
+                s = stack.pop()
+                ans.append(_CcwTri(u, s, stack[-1], co))
+            stack = [nodes[j - 1], u]
+        else:
+            last = stack.pop()
+            while len(stack) > 0:
+                s = stack[-1]
+                if uleft:
+                    ok = _Cross(co[s], co[last], co[u]) > 0.0
+                else:
+                    ok = _Cross(co[u], co[last], co[s]) > 0.0
+                if not ok:
+                    break
+                ans.append(_CcwTri(u, last, s, co))
+                last = stack.pop()
+            stack.append(last)
+            stack.append(u)
+    u = nodes[k - 1]
+    while len(stack) > 1:
+        s = stack.pop()
+        ans.append(_CcwTri(u, s, stack[-1], co))
+    return ans
+
+
+def _CcwTri(a, b, c, co):
+    """Return triangle of nodes a, b, c as a CCW-oriented triple."""
+
+    if _Cross(co[a], co[b], co[c]) < 0.0:
+        return (a, c, b)
+    return (a, b, c)
+
+
 def _JoinIslands(face, holes, points):
     """face is a CCW face containing the CW faces in the holes list,
     where each hole is sorted so the leftmost-lowest vertex is first.
@@ -582,16 +898,13 @@ def _Quandrangulate(tris, bord, points):
     (er, td) = _ERGraph(tris, bord, points)
     if len(er) == 0:
         return tris
-    if len(er) > GTHRESH:
-        match = _GreedyMatch(er)
-    else:
-        match = _MaxMatch(er)
+    match = _MaxMatch(er)
     return _RemoveEdges(tris, match)
 
 
 def _RemoveEdges(tris, match):
     """tris is list of triangles.
-    er is as returned from _MaxMatch or _GreedyMatch.
+    match is as returned from _MaxMatch.
 
     Return list of (A,D,B,C) resulting from deleting edge (A,B) causing a merge
     of two triangles; append to that list the remaining unmatched triangles."""
@@ -684,27 +997,18 @@ def _ERGraph(tris, bord, points):
     return (ans, td)
 
 
-def _GreedyMatch(er):
-    """er is list of (weight,e,tl,tr).
-
-    Find maximal set so that each triangle appears in at most
-    one member of set"""
-
-    # sort in order of decreasing weight
-    er.sort(key=lambda v: v[0], reverse=True)
-    match = set()
-    ans = []
-    while len(er) > 0:
-        (_, _, tl, tr) = q = er.pop()
-        if tl not in match and tr not in match:
-            match.add(tl)
-            match.add(tr)
-            ans.append(q)
-    return ans
-
-
 def _MaxMatch(er):
-    """Like _GreedyMatch, but use divide and conquer to find best possible set.
+    """Find a maximum weight matching in the edge removal graph er,
+    that is, a subset in which each triangle appears at most once.
+
+    The edge removal graph is a forest when the region has no holes,
+    and then the best match of each tree can be found by dynamic
+    programming, visiting children before their parents (_TreeMatch).
+    Each hole can add one cycle, i.e., one edge beyond a spanning tree
+    of its component.  If a component has at most CYCLEMAX such extra
+    edges, try every subset of them in the match (there are few holes,
+    usually); otherwise match the spanning tree and then add the extra
+    edges greedily.
 
     Args:
       er: list of (weight,e,tl,tr)  - see _ERGraph
@@ -712,222 +1016,120 @@ def _MaxMatch(er):
       list that is a subset of er giving a maximum weight match
     """
 
-    (ans, _) = _DCMatch(er)
+    adj = dict()
+    for i in range(0, len(er)):
+        (_, _, tl, tr) = er[i]
+        adj.setdefault(tl, []).append(i)
+        adj.setdefault(tr, []).append(i)
+    pedge = dict()
+    done = set()
+    ans = []
+    for (_, _, root, _) in er:
+        if root in pedge:
+            continue
+        # breadth first spanning tree of the component of root
+        pedge[root] = -1
+        order = [root]
+        extra = []
+        k = 0
+        while k < len(order):
+            t = order[k]
+            k += 1
+            for i in adj[t]:
+                if i in done:
+                    continue
+                done.add(i)
+                (_, _, tl, tr) = er[i]
+                s = tr if tl == t else tl
+                if s in pedge:
+                    extra.append(i)
+                else:
+                    pedge[s] = i
+                    order.append(s)
+        if len(extra) <= CYCLEMAX:
+            best = None
+            bestw = 0.0
+            for mask in range(0, 1 << len(extra)):
+                forced = [er[extra[j]] for j in range(0, len(extra))
+                          if mask & (1 << j)]
+                blocked = set()
+                w = 0.0
+                for (wi, _, tl, tr) in forced:
+                    blocked.add(tl)
+                    blocked.add(tr)
+                    w += wi
+                if len(blocked) != 2 * len(forced):
+                    continue  # forced edges share a triangle
+                (m, wm) = _TreeMatch(er, order, pedge, blocked)
+                if best is None or w + wm > bestw:
+                    best = forced + m
+                    bestw = w + wm
+            ans.extend(best)
+        else:
+            (m, _) = _TreeMatch(er, order, pedge, set())
+            matched = set()
+            for (_, _, tl, tr) in m:
+                matched.add(tl)
+                matched.add(tr)
+            extra.sort(key=lambda i: er[i][0], reverse=True)
+            for i in extra:
+                (_, _, tl, tr) = er[i]
+                if tl not in matched and tr not in matched:
+                    matched.add(tl)
+                    matched.add(tr)
+                    m.append(er[i])
+            ans.extend(m)
     return ans
 
 
-def _DCMatch(er):
-    """Recursive helper for _MaxMatch.
-
-    Divide and Conquer approach to finding max weight matching.
-    If we're lucky, there's an edge in er that separates the edge removal
-    graph into (at least) two separate components.  Then the max weight
-    is either one that includes that edge or excludes it - and we can
-    use a recursive call to _DCMatch to handle each component separately
-    on what remains of the graph after including/excluding the separating edge.
-    If we're not lucky, we fall back on _EMatch (see below).
+def _TreeMatch(er, order, pedge, blocked):
+    """Maximum weight match of a tree in the edge removal graph.
 
     Args:
       er: list of (weight, e, tl, tr) (see _ERGraph)
+      order: list of triangles in the tree, parents before children
+      pedge: dict - mapping triangle -> index in er of the edge to
+          its parent, or -1 for the root
+      blocked: set of triangles that can't be matched
     Returns:
       (list of (weight, e, tl, tr), float) - the subset forming a maximum
           matching, and the total weight of the match.
     """
 
-    if not er:
-        return ([], 0.0)
-    if len(er) == 1:
-        return (er, er[0][0])
-    match = []
-    matchw = 0.0
-    for i in range(0, len(er)):
-        (nc, comp) = _FindComponents(er, i)
-        if nc == 1:
-            # er[i] doesn't separate er
-            continue
-        (wi, _, tl, tr) = er[i]
-        if comp[tl] != comp[tr]:
-            # case 1: er separates graph
-            # compare the matches that include er[i] versus
-            # those that exclude it
-            (a, b) = _PartitionComps(er, comp, i, comp[tl], comp[tr])
-            ax = _CopyExcluding(a, tl, tr)
-            bx = _CopyExcluding(b, tl, tr)
-            (axmatch, wax) = _DCMatch(ax)
-            (bxmatch, wbx) = _DCMatch(bx)
-            if len(ax) == len(a):
-                wa = wax
-                amatch = axmatch
-            else:
-                (amatch, wa) = _DCMatch(a)
-            if len(bx) == len(b):
-                wb = wbx
-                bmatch = bxmatch
-            else:
-                (bmatch, wb) = _DCMatch(b)
-            w = wa + wb
-            wx = wax + wbx + wi
-            if w > wx:
-                match = amatch + bmatch
-                matchw = w
-            else:
-                match = [er[i]] + axmatch + bxmatch
-                matchw = wx
-        else:
-            # case 2: er not needed to separate graph
-            (a, b) = _PartitionComps(er, comp, -1, 0, 0)
-            (amatch, wa) = _DCMatch(a)
-            (bmatch, wb) = _DCMatch(b)
-            match = amatch + bmatch
-            matchw = wa + wb
-        if match:
-            break
-    if not match:
-        return _EMatch(er)
-    return (match, matchw)
-
-
-def _EMatch(er):
-    """Exhaustive match helper for _MaxMatch.
-
-    This is the case when we were unable to find a single edge
-    separating the edge removal graph into two components.
-    So pick a single edge and try _DCMatch on the two cases of
-    including or excluding that edge.  We may be lucky in these
-    subcases (say, if the graph is currently a simple cycle, so
-    only needs one more edge after the one we pick here to separate
-    it into components).  Otherwise, we'll end up back in _EMatch
-    again, and the worse case will be exponential.
-
-    Pick a random edge rather than say, the first, to hopefully
-    avoid some pathological cases.
-
-    Args:
-      er: list of (weight, el, tl, tr) (see _ERGraph)
-    Returns:
-       (list of (weight, e, tl, tr), float) - the subset forming a maximum
-          matching, and the total weight of the match.
-    """
-
-    if not er:
-        return ([], 0.0)
-    if len(er) == 1:
-        return (er, er[1][1])
-    i = random.randint(0, len(er) - 1)
-    eri = (wi, _, tl, tr) = er[i]
-    # case a: include eri.  exlude other edges that touch tl or tr
-    a = _CopyExcluding(er, tl, tr)
-    a.append(eri)
-    (amatch, wa) = _DCMatch(a)
-    wa += wi
-    if len(a) == len(er) - 1:
-        # if a excludes only eri, then er didn't touch anything else
-        # in the graph, and the best match will always include er
-        # and we can skip the call for case b
-        wb = -1.0
-        bmatch = []
-    else:
-        b = er[:i] + er[i + 1:]
-        (bmatch, wb) = _DCMatch(b)
-    if wa > wb:
-        match = amatch
-        match.append(eri)
-        matchw = wa
-    else:
-        match = bmatch
-        matchw = wb
-    return (match, matchw)
-
-
-def _FindComponents(er, excepti):
-    """Find connected components induced by edges, excluding one edge.
-
-    Args:
-      er: list of (weight, el, tl, tr) (see _ERGraph)
-      excepti: index in er of edge to be excluded
-    Returns:
-      (int, dict): int is number of connected components found,
-          dict maps triangle triple ->
-              connected component index (starting at 1)
-     """
-
-    ncomps = 0
-    comp = dict()
-    for i in range(0, len(er)):
-        (_, _, tl, tr) = er[i]
-        for t in [tl, tr]:
-            if t not in comp:
-                ncomps += 1
-                _FCVisit(er, excepti, comp, t, ncomps)
-    return (ncomps, comp)
-
-
-def _FCVisit(er, excepti, comp, t, compnum):
-    """Helper for _FindComponents depth-first-search."""
-
-    comp[t] = compnum
-    for i in range(0, len(er)):
-        if i == excepti:
+    # free[t]: best weight of the subtree at t, t unmatched;
+    # gain[t], pick[t]: best extra weight from matching t to a child
+    # via edge pick[t]
+    free = dict()
+    gain = dict()
+    pick = dict()
+    for t in order:
+        free[t] = 0.0
+        gain[t] = 0.0
+        pick[t] = -1
+    for t in reversed(order):
+        best = free[t] + gain[t]
+        i = pedge[t]
+        if i < 0:
             continue
-        (_, _, tl, tr) = er[i]
-        if tl == t or tr == t:
-            s = tl
-            if s == t:
-                s = tr
-            if s not in comp:
-                _FCVisit(er, excepti, comp, s, compnum)
-
-
-def _PartitionComps(er, comp, excepti, compa, compb):
-    """Partition the edges of er by component number, into two lists.
-
-    Generally, put odd components into first list and even into second,
-    except that component compa goes in the first and compb goes in the second,
-    and we ignore edge er[excepti].
-
-    Args:
-      er: list of (weight, el, tl, tr) (see _ERGraph)
-      comp: dict - mapping triangle triple -> connected component index
-      excepti: int - index in er to ignore (unless excepti==-1)
-      compa: int - component to go in first list of answer (unless 0)
-      compb: int - component to go in second list of answer (unless 0)
-    Returns:
-      (list, list) - a partition of er according to above rules
-    """
-
-    parta = []
-    partb = []
-    for i in range(0, len(er)):
-
-        if i == excepti:
+        (w, _, tl, tr) = er[i]
+        p = tr if tl == t else tl
+        free[p] += best
+        if t in blocked or p in blocked:
             continue
-        tl = er[i][2]
-        c = comp[tl]
-        if c == compa or (c != compb and (c & 1) == 1):
-            parta.append(er[i])
-        else:
-            partb.append(er[i])
-    return (parta, partb)
-
-
-def _CopyExcluding(er, s, t):
-    """Return a copy of er, excluding all those involving triangles s and t.
-
-    Args:
-      er: list of (weight, e, tl, tr) - see _ERGraph
-      s: 3-tuple of int - a triangle
-      t: 3-tuple of int - a triangle
-    Returns:
-      Copy of er excluding those with tl or tr == s or t
-    """
-
+        g = free[t] + w - best
+        if g > gain[p]:
+            gain[p] = g
+            pick[p] = i
+    matched = set()
     ans = []
-    for e in er:
-        (_, _, tl, tr) = e
-        if tl == s or tr == s or tl == t or tr == t:
+    for t in order:
+        if t in matched or pick[t] < 0:
             continue
-        ans.append(e)
-    return ans
+        i = pick[t]
+        (_, _, tl, tr) = er[i]
+        matched.add(tr if tl == t else tl)
+        ans.append(er[i])
+    return (ans, free[order[0]] + gain[order[0]])
 
 
 def _DegreeDict(tris):
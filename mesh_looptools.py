@@ -35,6 +35,7 @@ import bpy
 import collections
 import mathutils
 import math
+from array import array
 from bpy_extras import view3d_utils
 from bpy.types import (
         Operator,
@@ -52,6 +53,12 @@ from bpy.props import (
         StringProperty,
         )
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 # ########################################
 # ##### General functions ################
 # ########################################
@@ -119,9 +126,174 @@ loops, derived, mapping):
         "derived": derived, "mapping": mapping, "modifiers": modifiers}
 
 
-# calculates natural cubic splines through all given knots
-def calculate_cubic_splines(bm_mod, tknots, knots):
-    # hack for circular loops
+# ########################################
+# ##### Topology cache ###################
+# ########################################
+
+# adjacency data shared by all tools, rebuilt only if the topology changed
+topology_cache = {}
+# loops sorted from a list of edge-keys, shared by all tools
+selection_cache = {}
+# topology signatures of the meshes used by the current operator call, by
+# bmesh id (with the bmesh, so the id isn't reused). Cleared by initialise()
+signature_cache = {}
+# number of meshes (or edge-key lists) to keep before the caches are flushed
+TOPOLOGY_CACHE_SIZE = 4
+
+
+# compressed sparse rows: offsets[i]:offsets[i + 1] are the columns of row i,
+# columns keep the order in which they were given
+def csr_from_pairs(size, rows, columns):
+    offsets = array('i', bytes(4 * (size + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+    indices = array('i', bytes(4 * len(rows)))
+    fill = offsets[:-1]
+    for row, column in zip(rows, columns):
+        indices[fill[row]] = column
+        fill[row] += 1
+
+    return(offsets, indices)
+
+
+# fingerprint of the mesh topology, coordinates are ignored so moving
+# vertices (every redo) keeps the cached adjacency valid. The vertices of
+# every face are part of it, the edges alone don't define the faces.
+# Bmesh has no foreach_get, the indices are gathered once into flat int
+# arrays and their buffers are hashed
+def topology_signature(bm):
+    edges = array('i', [i for edge in bm.edges for i in
+        (edge.verts[0].index, edge.verts[1].index, edge.hide)])
+    faces = array('i', [i for face in bm.faces for i in
+        (len(face.verts), face.hide)])
+    loops = array('i', [v.index for face in bm.faces for v in face.verts])
+    hidden_verts = array('i', [v.index for v in bm.verts if v.hide])
+
+    return((len(bm.verts), len(bm.edges), len(bm.faces), len(loops),
+        hash(edges.tobytes()), hash(faces.tobytes()), hash(loops.tobytes()),
+        hash(hidden_verts.tobytes())))
+
+
+# adjacency of the non-hidden part of a mesh, stored as CSR arrays
+class Topology():
+    def __init__(self, bm, signature):
+        self.signature = signature
+        self.verts = [v.index for v in bm.verts if not v.hide]
+        self.faces = [face.index for face in bm.faces if not face.hide]
+        self.edge_keys = [edgekey(edge) for edge in bm.edges if not edge.hide]
+        edge_index = dict([[ek, i] for i, ek in enumerate(self.edge_keys)])
+
+        # vertex -> edges
+        rows = [vert for ek in self.edge_keys for vert in ek]
+        columns = [i for i in range(len(self.edge_keys)) for vert in (0, 1)]
+        self.vert_edge_offsets, self.vert_edge_indices = csr_from_pairs(
+            len(bm.verts), rows, columns)
+
+        # edge -> faces, face -> edges and vertex -> faces
+        face_rows = []
+        face_columns = []
+        vert_rows = []
+        vert_columns = []
+        for face in bm.faces:
+            if face.hide:
+                continue
+            for key in face_edgekeys(face):
+                face_rows.append(face.index)
+                face_columns.append(edge_index[key])
+            for vert in face.verts:
+                vert_rows.append(vert.index)
+                vert_columns.append(face.index)
+        self.edge_face_offsets, self.edge_face_indices = csr_from_pairs(
+            len(self.edge_keys), face_columns, face_rows)
+        self.face_edge_offsets, self.face_edge_indices = csr_from_pairs(
+            len(bm.faces), face_rows, face_columns)
+        self.vert_face_offsets, self.vert_face_indices = csr_from_pairs(
+            len(bm.verts), vert_rows, vert_columns)
+
+        # dictionary views, created when first requested
+        self.views = {}
+
+    # dict with the edge-key as key and a tuple of face indices as value
+    def edge_faces(self):
+        if "edge_faces" not in self.views:
+            offsets = self.edge_face_offsets
+            indices = self.edge_face_indices
+            self.views["edge_faces"] = dict([[ek,
+                tuple(indices[offsets[i]:offsets[i + 1]])] for i, ek in
+                enumerate(self.edge_keys)])
+        return(self.views["edge_faces"])
+
+    # dict with the face index as key and a list of connected faces as value
+    def face_faces(self):
+        if "face_faces" not in self.views:
+            edge_offsets = self.face_edge_offsets
+            edges = self.face_edge_indices
+            face_offsets = self.edge_face_offsets
+            faces = self.edge_face_indices
+            connected_faces = {}
+            for face in self.faces:
+                connected = []
+                for edge in edges[edge_offsets[face]:edge_offsets[face + 1]]:
+                    for connected_face in \
+                    faces[face_offsets[edge]:face_offsets[edge + 1]]:
+                        if connected_face != face:
+                            connected.append(connected_face)
+                connected_faces[face] = tuple(connected)
+            self.views["face_faces"] = connected_faces
+        return(self.views["face_faces"])
+
+    # dict with the vert index as key and a tuple of edge-keys as value
+    def vert_edges(self):
+        if "vert_edges" not in self.views:
+            offsets = self.vert_edge_offsets
+            indices = self.vert_edge_indices
+            edge_keys = self.edge_keys
+            self.views["vert_edges"] = dict([[v, tuple([edge_keys[i] for i in
+                indices[offsets[v]:offsets[v + 1]]])] for v in self.verts])
+        return(self.views["vert_edges"])
+
+    # dict with the vert index as key and a tuple of face indices as value
+    def vert_faces(self):
+        if "vert_faces" not in self.views:
+            offsets = self.vert_face_offsets
+            indices = self.vert_face_indices
+            self.views["vert_faces"] = dict([[v,
+                tuple(indices[offsets[v]:offsets[v + 1]])] for v in
+                self.verts])
+        return(self.views["vert_faces"])
+
+
+# return the adjacency of the mesh, only recalculated if the topology changed
+def get_topology(bm):
+    # the signature is computed once per operator call
+    cached = signature_cache.get(id(bm))
+    if cached is not None and cached[0] is bm:
+        signature = cached[1]
+    else:
+        signature = topology_signature(bm)
+        signature_cache[id(bm)] = (bm, signature)
+    topology = topology_cache.get(signature)
+    if topology is None:
+        if len(topology_cache) >= TOPOLOGY_CACHE_SIZE:
+            topology_cache.clear()
+        topology = Topology(bm, signature)
+        topology_cache[signature] = topology
+
+    return(topology)
+
+
+# flush the shared caches (adjacency and sorted selections)
+def topology_cache_delete():
+    topology_cache.clear()
+    selection_cache.clear()
+    signature_cache.clear()
+
+
+# hack for circular loops: extend both ends with four knots of the other end,
+# both lists are changed in place. Returns True for circular loops
+def cubic_splines_extend(tknots, knots):
     if knots[0] == knots[-1] and len(knots) > 1:
         circular = True
         k_new1 = []
@@ -158,7 +330,13 @@ def calculate_cubic_splines(bm_mod, tknots, knots):
             tknots.append(t)
     else:
         circular = False
-    # end of hack
+
+    return(circular)
+
+
+# calculates natural cubic splines through all given knots
+def calculate_cubic_splines(bm_mod, tknots, knots):
+    circular = cubic_splines_extend(tknots, knots)
 
     n = len(knots)
     if n < 2:
@@ -316,6 +494,108 @@ def calculate_splines(interpolation, bm_mod, tknots, knots):
     return(splines)
 
 
+# calculate splines for several loops at once, cubic splines of all loops are
+# solved in a single batched call if numpy is available
+def calculate_splines_batch(interpolation, bm_mod, all_tknots, all_knots):
+    if interpolation != 'cubic' or numpy is None:
+        return([calculate_splines(interpolation, bm_mod, tknots, knots) for
+            tknots, knots in zip(all_tknots, all_knots)])
+
+    all_knots = [knots[:] for knots in all_knots]
+    for tknots, knots in zip(all_tknots, all_knots):
+        cubic_splines_extend(tknots, knots)
+    solve = [i for i, knots in enumerate(all_knots) if len(knots) > 1]
+    all_splines = [False for knots in all_knots]
+    if solve:
+        coefficients = cubic_splines_solve(
+            [all_tknots[i] for i in solve],
+            [[bm_mod.verts[k].co[:] for k in all_knots[i]] for i in solve])
+        for i, splines in zip(solve, coefficients):
+            all_splines[i] = splines.tolist()
+
+    return(all_splines)
+
+
+# natural cubic splines through a batch of knot sequences, the tridiagonal
+# systems of all sequences and axes are solved together (Thomas algorithm).
+# input: list of knot parameters, list of knot locations (per sequence)
+# output: list of (knots - 1, 3, 5) arrays, [a, b, c, d, t] per segment and axis
+def cubic_splines_solve(all_x, all_locs):
+    sizes = numpy.array([len(x) for x in all_x])
+    count = len(sizes)
+    size = sizes.max()
+    x = numpy.zeros((count, size))
+    a = numpy.zeros((count, size, 3))
+    for i, (xs, locs) in enumerate(zip(all_x, all_locs)):
+        x[i, :sizes[i]] = xs
+        a[i, :sizes[i]] = locs
+    # rows 1 to n - 2 of a sequence of n knots are solved, others are padding
+    last = sizes - 1
+
+    dx = x[:, 1:] - x[:, :-1]
+    h = numpy.where(dx == 0, 1e-8, dx)
+    h[numpy.arange(size - 1) >= last[:, None]] = 1.0
+    da = a[:, 1:] - a[:, :-1]
+    q = numpy.zeros((count, size, 3))
+    q[:, 1:-1] = 3 / h[:, 1:, None] * da[:, 1:] - \
+        3 / h[:, :-1, None] * da[:, :-1]
+
+    # forward sweep
+    u = numpy.zeros((count, size))
+    z = numpy.zeros((count, size, 3))
+    for i in range(1, size - 1):
+        active = i < last
+        l = 2 * (x[:, i + 1] - x[:, i - 1]) - h[:, i - 1] * u[:, i - 1]
+        l[(l == 0) | ~active] = 1e-8
+        u[:, i] = numpy.where(active, h[:, i] / l, 0.0)
+        z[:, i] = numpy.where(active[:, None],
+            (q[:, i] - h[:, i - 1, None] * z[:, i - 1]) / l[:, None], 0.0)
+
+    # back substitution
+    b = numpy.zeros((count, size - 1, 3))
+    c = numpy.zeros((count, size, 3))
+    d = numpy.zeros((count, size - 1, 3))
+    for i in range(size - 2, -1, -1):
+        active = (i < last)[:, None]
+        c[:, i] = numpy.where(active, z[:, i] - u[:, i, None] * c[:, i + 1],
+            0.0)
+        b[:, i] = da[:, i] / h[:, i, None] - h[:, i, None] * \
+            (c[:, i + 1] + 2 * c[:, i]) / 3
+        d[:, i] = (c[:, i + 1] - c[:, i]) / (3 * h[:, i, None])
+
+    t = numpy.broadcast_to(x[:, :-1, None], (count, size - 1, 3))
+    splines = numpy.stack((a[:, :-1], b, c[:, :-1], d, t), axis=-1)
+
+    return([splines[i, :last[i]] for i in range(count)])
+
+
+# evaluate splines at the parameters tpoints, returns a list of locations
+# (vectorized version of the loop in relax_calculate_verts)
+def splines_evaluate(interpolation, tknots, tpoints, splines):
+    tknots = numpy.array(tknots, dtype=float)
+    m = numpy.array(tpoints, dtype=float)
+    # index of the spline segment each parameter lies on
+    n = numpy.searchsorted(tknots, m)
+    exact = n < len(tknots)
+    exact[exact] = tknots[n[exact]] == m[exact]
+    n = numpy.clip(numpy.where(exact, n, n - 1), 0, len(splines) - 1)
+
+    if interpolation == 'cubic':
+        coefficients = numpy.array(splines, dtype=float)[n]
+        a, b, c, d, t = numpy.moveaxis(coefficients, -1, 0)
+        dt = m[:, None] - t
+        locs = a + b * dt + c * dt ** 2 + d * dt ** 3
+    else:  # interpolation == 'linear'
+        a = numpy.array([spline[0][:] for spline in splines])[n]
+        d = numpy.array([spline[1][:] for spline in splines])[n]
+        t = numpy.array([spline[2] for spline in splines])[n]
+        u = numpy.array([spline[3] for spline in splines])[n]
+        u[u == 0] = 1e-8
+        locs = ((m - t) / u)[:, None] * d + a
+
+    return([mathutils.Vector(loc) for loc in locs.tolist()])
+
+
 # check loops and only return valid ones
 def check_loops(loops, mapping, bm_mod):
     valid_loops = []
@@ -348,20 +628,13 @@ def check_loops(loops, mapping, bm_mod):
 
 # input: bmesh, output: dict with the edge-key as key and face-index as value
 def dict_edge_faces(bm):
-    edge_faces = dict([[edgekey(edge), []] for edge in bm.edges if not edge.hide])
-    for face in bm.faces:
-        if face.hide:
-            continue
-        for key in face_edgekeys(face):
-            edge_faces[key].append(face.index)
-
-    return(edge_faces)
+    return(get_topology(bm).edge_faces())
 
 
 # input: bmesh (edge-faces optional), output: dict with face-face connections
 def dict_face_faces(bm, edge_faces=False):
     if not edge_faces:
-        edge_faces = dict_edge_faces(bm)
+        return(get_topology(bm).face_faces())
 
     connected_faces = dict([[face.index, []] for face in bm.faces if not face.hide])
     for face in bm.faces:
@@ -378,26 +651,12 @@ def dict_face_faces(bm, edge_faces=False):
 
 # input: bmesh, output: dict with the vert index as key and edge-keys as value
 def dict_vert_edges(bm):
-    vert_edges = dict([[v.index, []] for v in bm.verts if not v.hide])
-    for edge in bm.edges:
-        if edge.hide:
-            continue
-        ek = edgekey(edge)
-        for vert in ek:
-            vert_edges[vert].append(ek)
-
-    return(vert_edges)
+    return(get_topology(bm).vert_edges())
 
 
 # input: bmesh, output: dict with the vert index as key and face index as value
 def dict_vert_faces(bm):
-    vert_faces = dict([[v.index, []] for v in bm.verts if not v.hide])
-    for face in bm.faces:
-        if not face.hide:
-            for vert in face.verts:
-                vert_faces[vert.index].append(face.index)
-
-    return(vert_faces)
+    return(get_topology(bm).vert_faces())
 
 
 # input: list of edge-keys, output: dictionary with vertex-vertex connections
@@ -442,8 +701,22 @@ def get_connected_input(object, bm, scene, input):
     return(derived, bm_mod, loops)
 
 
-# sorts all edge-keys into a list of loops
+# sorts all edge-keys into a list of loops, reusing earlier results
 def get_connected_selections(edge_keys):
+    key = tuple(edge_keys)
+    loops = selection_cache.get(key)
+    if loops is None:
+        if len(selection_cache) >= TOPOLOGY_CACHE_SIZE:
+            selection_cache.clear()
+        loops = sort_connected_selections(edge_keys)
+        selection_cache[key] = loops
+
+    # callers are free to modify the loops they get
+    return([[loop[:], circular] for loop, circular in loops])
+
+
+# sorts all edge-keys into a list of loops
+def sort_connected_selections(edge_keys):
     # create connection data
     vert_verts = dict_vert_verts(edge_keys)
 
@@ -615,8 +888,9 @@ def matrix_invert(m):
 # returns a list of all loops parallel to the input, input included
 def get_parallel_loops(bm_mod, loops):
     # get required dictionaries
-    edge_faces = dict_edge_faces(bm_mod)
-    connected_faces = dict_face_faces(bm_mod, edge_faces)
+    topology = get_topology(bm_mod)
+    edge_faces = topology.edge_faces()
+    connected_faces = topology.face_faces()
     # turn vertex loops into edge loops
     edgeloops = []
     for loop in loops:
@@ -752,6 +1026,8 @@ def initialise():
         bpy.ops.object.mode_set(mode='OBJECT')
         bpy.ops.object.mode_set(mode='EDIT')
     bm = bmesh.from_edit_mesh(object.data)
+    # the topology may have changed since the previous operator call
+    signature_cache.clear()
 
     bm.verts.ensure_lookup_table()
     bm.edges.ensure_lookup_table()
@@ -1496,18 +1772,13 @@ def bridge_get_input(bm):
 def bridge_initialise(bm, interpolation):
     if interpolation == 'cubic':
         # dict with edge-key as key and list of connected valid faces as value
-        face_blacklist = [
+        face_blacklist = set([
             face.index for face in bm.faces if face.select or
             face.hide
-            ]
-        edge_faces = dict(
-            [[edgekey(edge), []] for edge in bm.edges if not edge.hide]
-            )
-        for face in bm.faces:
-            if face.index in face_blacklist:
-                continue
-            for key in face_edgekeys(face):
-                edge_faces[key].append(face)
+            ])
+        edge_faces = dict([[key, [bm.faces[face] for face in faces if face
+            not in face_blacklist]] for key, faces in
+            get_topology(bm).edge_faces().items()])
         # dictionary with the edge-key as key and edge as value
         edgekey_to_edge = dict(
             [[edgekey(edge), edge] for edge in bm.edges if edge.select and not edge.hide]
@@ -1814,6 +2085,57 @@ def circle_calculate_best_fit(locs_2d):
     return(x0, y0, r)
 
 
+# best-fit circles for several loops, the non-linear least squares problems of
+# all loops are iterated together if numpy is available
+def circle_calculate_best_fits(all_locs_2d):
+    if numpy is None:
+        return([circle_calculate_best_fit(locs_2d) for locs_2d in
+            all_locs_2d])
+    if not all_locs_2d:
+        return([])
+
+    sizes = numpy.array([len(locs_2d) for locs_2d in all_locs_2d])
+    count = len(sizes)
+    # padded locations, mask tells which ones are real
+    locs = numpy.zeros((count, sizes.max(), 2))
+    for i, locs_2d in enumerate(all_locs_2d):
+        locs[i, :sizes[i]] = [loc[:2] for loc in locs_2d]
+    mask = numpy.arange(sizes.max()) < sizes[:, None]
+
+    # initial guess
+    center = numpy.zeros((count, 2))
+    r = numpy.ones(count)
+    active = numpy.ones(count, dtype=bool)
+
+    # calculate center and radius (non-linear least squares solution)
+    for iter in range(500):
+        offset = center[active, None] - locs[active]
+        d = numpy.sqrt((offset ** 2).sum(axis=2))
+        d[d == 0] = 1e-8
+        jmat = numpy.empty(offset.shape[:2] + (3,))
+        jmat[..., :2] = offset / d[..., None]
+        jmat[..., 2] = -1.0
+        jmat[~mask[active]] = 0.0
+        k = r[active, None] - d
+        jmat2 = numpy.einsum('lpi,lpj->lij', jmat, jmat)
+        k2 = numpy.einsum('lpi,lp->li', jmat, k)
+        # singular systems keep the matrix as it is, like Matrix.invert()
+        singular = numpy.linalg.det(jmat2) == 0
+        jmat2[~singular] = numpy.linalg.inv(jmat2[~singular])
+        delta = numpy.einsum('lij,lj->li', jmat2, k2)
+        center[active] += delta[:, :2]
+        r[active] += delta[:, 2]
+        # stop iterating if we're close enough to optimal solution
+        converged = (numpy.abs(delta) < 1e-6).all(axis=1)
+        active[numpy.flatnonzero(active)[converged]] = False
+        if not active.any():
+            break
+
+    # return center of circle and radius
+    return([tuple(fit) for fit in
+        numpy.column_stack((center, r)).tolist()])
+
+
 # calculate circle so no vertices have to be moved away from the center
 def circle_calculate_min_fit(locs_2d):
     # center of circle
@@ -1838,8 +2160,9 @@ def circle_calculate_verts(flatten, bm_mod, locs_2d, com, p, q, normal):
         return(locs_3d)
 
     else:  # project the locations on the existing mesh
-        vert_edges = dict_vert_edges(bm_mod)
-        vert_faces = dict_vert_faces(bm_mod)
+        topology = get_topology(bm_mod)
+        vert_edges = topology.vert_edges()
+        vert_faces = topology.vert_faces()
         faces = [f for f in bm_mod.faces if not f.hide]
         rays = [normal, -normal]
         new_locs = []
@@ -2326,8 +2649,9 @@ def curve_get_input(object, bm, boundaries, scene):
         v.index for v in bm_mod.verts if v.select and not v.hide
         ]
     # necessary dictionaries
-    vert_edges = dict_vert_edges(bm_mod)
-    edge_faces = dict_edge_faces(bm_mod)
+    topology = get_topology(bm_mod)
+    vert_edges = topology.vert_edges()
+    edge_faces = topology.edge_faces()
     correct_loops = []
     # find loops through each selected vertex
     while len(verts_unsorted) > 0:
@@ -3086,6 +3410,21 @@ def relax_calculate_t(bm_mod, knots, points, regular):
 # change the location of the points to their place on the spline
 def relax_calculate_verts(bm_mod, interpolation, tknots, knots, tpoints,
 points, splines):
+    if numpy is not None:
+        move = []
+        for i in range(len(knots)):
+            if not points[i]:
+                continue
+            # parameter of the first occurrence of each point
+            first = {}
+            for j, p in enumerate(points[i]):
+                first.setdefault(p, j)
+            locs = splines_evaluate(interpolation, tknots[i],
+                [tpoints[i][first[p]] for p in points[i]], splines[i])
+            for p, loc in zip(points[i], locs):
+                move.append([p, (bm_mod.verts[p].co + loc) / 2])
+        return(move)
+
     change = []
     move = []
     for i in range(len(knots)):
@@ -3148,6 +3487,17 @@ def space_calculate_t(bm_mod, knots):
 # change the location of the points to their place on the spline
 def space_calculate_verts(bm_mod, interpolation, tknots, tpoints, points,
 splines):
+    if numpy is not None:
+        if not points:
+            return([])
+        # parameter of the first occurrence of each point
+        first = {}
+        for j, p in enumerate(points):
+            first.setdefault(p, j)
+        locs = splines_evaluate(interpolation, tknots,
+            [tpoints[first[p]] for p in points], splines)
+        return([[p, loc] for p, loc in zip(points, locs)])
+
     move = []
     for p in points:
         m = tpoints[points.index(p)]
@@ -3502,8 +3852,8 @@ class Circle(Operator):
             cache_write("Circle", object, bm, False, False, single_loops,
                 loops, derived, mapping)
 
-        move = []
-        for i, loop in enumerate(loops):
+        planes = []
+        for loop in loops:
             # best fitting flat plane
             com, normal = calculate_plane(bm_mod, loop)
             # if circular, shift loop so we get a good starting vertex
@@ -3511,11 +3861,18 @@ class Circle(Operator):
                 loop = circle_shift_loop(bm_mod, loop, com)
             # flatten vertices on plane
             locs_2d, p, q = circle_3d_to_2d(bm_mod, loop, com, normal)
-            # calculate circle
-            if self.fit == 'best':
-                x0, y0, r = circle_calculate_best_fit(locs_2d)
-            else:  # self.fit == 'inside'
-                x0, y0, r = circle_calculate_min_fit(locs_2d)
+            planes.append([com, normal, locs_2d, p, q])
+        # calculate circles
+        if self.fit == 'best':
+            circles = circle_calculate_best_fits(
+                [plane[2] for plane in planes])
+        else:  # self.fit == 'inside'
+            circles = [circle_calculate_min_fit(plane[2]) for plane in
+                planes]
+
+        move = []
+        for i, [com, normal, locs_2d, p, q] in enumerate(planes):
+            x0, y0, r = circles[i]
             # radius override
             if self.custom_radius:
                 r = self.radius / p.length
@@ -3667,15 +4024,20 @@ class Curve(Operator):
             cache_write("Curve", object, bm, False, self.boundaries, False,
                 loops, derived, mapping)
 
-        move = []
+        curves = []
         for loop in loops:
             knots, points = curve_calculate_knots(loop, verts_selected)
             pknots = curve_project_knots(bm_mod, verts_selected, knots,
                 points, loop[1])
             tknots, tpoints = curve_calculate_t(bm_mod, knots, points,
                 pknots, self.regular, loop[1])
-            splines = calculate_splines(self.interpolation, bm_mod,
-                tknots, knots)
+            curves.append([knots, points, tknots, tpoints])
+        # calculate splines of all loops and new positions
+        all_splines = calculate_splines_batch(self.interpolation, bm_mod,
+            [curve[2] for curve in curves], [curve[0] for curve in curves])
+        move = []
+        for [knots, points, tknots, tpoints], splines in zip(curves,
+        all_splines):
             move.append(curve_calculate_vertices(bm_mod, knots, tknots,
                 points, tpoints, splines, self.interpolation,
                 self.restriction))
@@ -4180,10 +4542,8 @@ class Relax(Operator):
             # calculate splines and new positions
             tknots, tpoints = relax_calculate_t(bm_mod, knots, points,
                 self.regular)
-            splines = []
-            for i in range(len(knots)):
-                splines.append(calculate_splines(self.interpolation, bm_mod,
-                    tknots[i], knots[i]))
+            splines = calculate_splines_batch(self.interpolation, bm_mod,
+                tknots, knots)
             move = [relax_calculate_verts(bm_mod, self.interpolation,
                 tknots, knots, tpoints, points, splines)]
             move_verts(object, bm, mapping, move, False, -1)
@@ -4298,14 +4658,21 @@ class Space(Operator):
             cache_write("Space", object, bm, self.input, False, False, loops,
                 derived, mapping)
 
-        move = []
+        all_tknots = []
+        all_tpoints = []
         for loop in loops:
-            # calculate splines and new positions
+            # calculate relative positions
             if loop[1]:  # circular
                 loop[0].append(loop[0][0])
             tknots, tpoints = space_calculate_t(bm_mod, loop[0][:])
-            splines = calculate_splines(self.interpolation, bm_mod,
-                tknots, loop[0][:])
+            all_tknots.append(tknots)
+            all_tpoints.append(tpoints)
+        # calculate splines of all loops and new positions
+        all_splines = calculate_splines_batch(self.interpolation, bm_mod,
+            all_tknots, [loop[0] for loop in loops])
+        move = []
+        for loop, tknots, tpoints, splines in zip(loops, all_tknots,
+        all_tpoints, all_splines):
             move.append(space_calculate_verts(bm_mod, self.interpolation,
                 tknots, tpoints, loop[0][:-1], splines))
         # move vertices to new locations
@@ -5130,6 +5497,7 @@ def unregister():
     for c in classes:
         bpy.utils.unregister_class(c)
     bpy.types.VIEW3D_MT_edit_mesh_specials.remove(menu_func)
+    topology_cache_delete()
     try:
         del bpy.types.WindowManager.looptools
     except:
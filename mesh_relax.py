@@ -49,6 +49,101 @@ Additional links:
 import bpy
 from bpy.props import IntProperty
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# same as the default factor of bpy.ops.mesh.vertices_smooth
+SMOOTH_FACTOR = 0.5
+
+# (mesh name, vertex coordinates, loops) and the BVHTree of the last
+# relaxed shape, so redoing the operator doesn't rebuild it
+_target_cache = {}
+
+
+def relax_target(me, co, loop_start, loop_total, loop_vertex):
+    """BVHTree of the mesh surface before relaxing."""
+    from mathutils.bvhtree import BVHTree
+
+    cache = _target_cache.get(me.name)
+    if cache is not None:
+        cache_co, cache_loops, tree = cache
+        if (numpy.array_equal(cache_co, co) and
+                all(numpy.array_equal(a, b) for a, b in
+                    zip(cache_loops, (loop_start, loop_total, loop_vertex)))):
+            return tree
+
+    polygons = [loop_vertex[start:start + total].tolist()
+                for start, total in zip(loop_start.tolist(), loop_total.tolist())]
+    tree = BVHTree.FromPolygons(co.tolist(), polygons)
+
+    _target_cache.clear()
+    _target_cache[me.name] = co.copy(), (loop_start, loop_total, loop_vertex), tree
+    return tree
+
+
+def relax_mesh_direct(context, iterations):
+    """
+    Relax the selected vertices of the active object without operators:
+    each iteration smooths them towards the average of their neighbors
+    (a vertex adjacency Laplacian) and projects them back onto the surface
+    the mesh had before relaxing.
+    """
+    obj = context.active_object
+    bpy.ops.object.mode_set(mode='OBJECT')
+    me = obj.data
+
+    vert_count = len(me.vertices)
+    co = numpy.empty(vert_count * 3, dtype=numpy.float64)
+    me.vertices.foreach_get("co", co)
+    co = co.reshape(vert_count, 3)
+    select = numpy.empty(vert_count, dtype=numpy.int32)
+    me.vertices.foreach_get("select", select)
+    selected = numpy.flatnonzero(select)
+
+    edges = numpy.empty(len(me.edges) * 2, dtype=numpy.int32)
+    me.edges.foreach_get("vertices", edges)
+    edges = edges.reshape(-1, 2)
+    # only the edges of selected vertices move anything
+    edges = edges[(select[edges[:, 0]] | select[edges[:, 1]]) != 0]
+
+    if iterations > 0 and len(selected) and len(edges):
+        loop_start = numpy.empty(len(me.polygons), dtype=numpy.int32)
+        loop_total = numpy.empty(len(me.polygons), dtype=numpy.int32)
+        loop_vertex = numpy.empty(len(me.loops), dtype=numpy.int32)
+        me.polygons.foreach_get("loop_start", loop_start)
+        me.polygons.foreach_get("loop_total", loop_total)
+        me.loops.foreach_get("vertex_index", loop_vertex)
+        tree = relax_target(me, co, loop_start, loop_total, loop_vertex)
+        find_nearest = tree.find_nearest
+
+        # both directions of every edge: vertex -> neighbor
+        vert = numpy.concatenate((edges[:, 0], edges[:, 1]))
+        neighbor = numpy.concatenate((edges[:, 1], edges[:, 0]))
+        degree = numpy.bincount(vert, minlength=vert_count)[selected]
+        smooth = selected[degree > 0]
+        degree = degree[degree > 0, None]
+
+        for i in range(iterations):
+            total = numpy.column_stack(
+                [numpy.bincount(vert, weights=co[neighbor, axis], minlength=vert_count)
+                 for axis in range(3)])
+            average = total[smooth] / degree
+            co[smooth] += (average - co[smooth]) * SMOOTH_FACTOR
+
+            # project back onto the original surface
+            for index in smooth.tolist():
+                location = find_nearest(co[index])[0]
+                if location is not None:
+                    co[index] = location
+
+        me.vertices.foreach_set("co", co.ravel())
+        me.update()
+
+    bpy.ops.object.mode_set(mode='EDIT')
+
+
 def relax_mesh(context):
 
     # deselect everything that's not related
@@ -106,6 +201,10 @@ class Relax(bpy.types.Operator):
         return (obj and obj.type == 'MESH')
 
     def execute(self, context):
+        if numpy is not None:
+            relax_mesh_direct(context, self.iterations)
+            return {'FINISHED'}
+
         for i in range(0,self.iterations):
             relax_mesh(context)
         return {'FINISHED'}
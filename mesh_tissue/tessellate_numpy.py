@@ -45,7 +45,6 @@ from bpy.props import (
         )
 from mathutils import Vector
 import numpy as np
-from math import sqrt
 import random
 
 
@@ -66,9 +65,119 @@ def lerp3(v1, v2, v3, v4, v):
     return loc + nor * v.z
 
 
-def tassellate(ob0, ob1, offset, zscale, gen_modifiers, com_modifiers, mode,
-               scale_mode, rotation_mode, rand_seed, fill_mode,
-               bool_vertex_group, bool_selection, bool_shapekeys):
+# Generator faces interpolated at once, limits the temporary arrays
+TESSELLATE_CHUNK_VERTS = 1 << 20
+# Output arrays larger than this (in bytes) are backed by a temporary file
+TESSELLATE_MEMORY_LIMIT = 1 << 30
+
+
+def lerp2_array(c, vx, vy):
+    # bilinear interpolation of the face corners c (faces, 4, n) at the
+    # component coordinates vx, vy (verts, 1), returns (faces, verts, n)
+    c = c[:, None]
+    v0 = c[:, :, 0] + (c[:, :, 1] - c[:, :, 0]) * vx
+    v1 = c[:, :, 3] + (c[:, :, 2] - c[:, :, 3]) * vx
+    return v0 + (v1 - v0) * vy
+
+
+def mesh_loop_arrays(me):
+    # loop_start, loop_total of the polygons and the vertex of each loop
+    loop_start = np.zeros(len(me.polygons), dtype=np.int32)
+    loop_total = np.zeros(len(me.polygons), dtype=np.int32)
+    loop_vertex = np.zeros(len(me.loops), dtype=np.int32)
+    me.polygons.foreach_get("loop_start", loop_start)
+    me.polygons.foreach_get("loop_total", loop_total)
+    me.loops.foreach_get("vertex_index", loop_vertex)
+    return loop_start, loop_total, loop_vertex
+
+
+def uv_rotation_shifts(me, loop_start, loop_total):
+    # first corner of each face, so that the component follows the UV
+    # direction of the face
+    uv = np.zeros(len(me.loops) * 2)
+    me.uv_layers.active.data.foreach_get("uv", uv)
+    uv = uv.reshape(-1, 2)
+    is_quad = (loop_total > 3)[:, None]
+    uv0 = uv[loop_start]
+    uv1 = uv[loop_start + 1]
+    uv2 = uv[loop_start + 2]
+    uv3 = uv[loop_start + np.minimum(3, loop_total - 1)]
+
+    def normalized(v):
+        length = np.sqrt((v * v).sum(axis=1))[:, None]
+        return np.where(length > 0, v / np.where(length > 0, length, 1), 0)
+
+    v01 = uv0 + uv1
+    v32 = np.where(is_quad, uv3 + uv2, uv0 + uv2)
+    dot0132 = normalized(v32 - v01)[:, 0]
+    v12 = uv1 + uv2
+    v03 = np.where(is_quad, uv0 + uv3, uv0 + uv0)
+    dot1203 = normalized(v03 - v12)[:, 0]
+
+    return np.where(np.abs(dot1203) < np.abs(dot0132),
+                    np.where(dot0132 > 0, 1, 3),
+                    np.where(dot1203 < 0, 0, 2)).astype(np.int32)
+
+
+def tessellate_array(shape, dtype):
+    # output array, mapped to a temporary file when it doesn't fit the
+    # memory limit
+    size = np.dtype(dtype).itemsize * int(np.prod(shape))
+    if size <= TESSELLATE_MEMORY_LIMIT:
+        return np.empty(shape, dtype=dtype)
+    import tempfile
+    return np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode='w+', shape=shape)
+
+
+class TessellateData:
+    # generator faces and component arrays of a tessellation, kept by
+    # update_tessellate to only recompute what changed on the next update
+    def __init__(self):
+        self.name = ""
+        self.n_verts = 0
+        self.component = None
+        self.component_key = None
+        self.loops = None
+        self.edges = None
+        # polygon material indices and slot materials of the component
+        self.materials = None
+        self.face_index = None
+        self.quads = None
+        self.vs0 = None
+        self.nvs0 = None
+        self.face_scale = None
+        self.ws0 = None
+        self.coords = None
+        self.weights = None
+        # mesh holding the coordinates, for updates in place
+        self.mesh_pointer = 0
+        # positions of the generator faces recomputed by tessellate_update
+        self.updated_faces = None
+
+
+# TessellateData of the updated tessellations, by object pointer
+tessellate_cache = {}
+
+
+def tessellate_cache_prune():
+    # forget the tessellations of removed objects
+    pointers = {ob.as_pointer() for ob in bpy.data.objects}
+    for key in [key for key in tessellate_cache if key not in pointers]:
+        del tessellate_cache[key]
+
+
+def same_arrays(a, b):
+    # compare tuples of arrays (or None)
+    if a is None or b is None:
+        return a is b
+    return len(a) == len(b) and all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def tessellate_prepare(ob0, ob1, offset, zscale, gen_modifiers, com_modifiers,
+                       mode, scale_mode, rotation_mode, rand_seed, fill_mode,
+                       bool_vertex_group, bool_selection, bool_shapekeys):
+    # generator faces and component arrays of a tessellation, 0 if no
+    # generator face is selected
     random.seed(rand_seed)
     old_me0 = ob0.data      # Store generator mesh
 
@@ -97,8 +206,6 @@ def tassellate(ob0, ob1, offset, zscale, gen_modifiers, com_modifiers, mode,
     else:
         me1 = ob1.data
 
-    verts0 = me0.vertices   # Collect generator vertices
-
     # Component statistics
     n_verts = len(me1.vertices)
     # n_edges = len(me1.edges)
@@ -109,12 +216,6 @@ def tassellate(ob0, ob1, offset, zscale, gen_modifiers, com_modifiers, mode,
     # dim = ob1.dimensions
     # scale = ob1.scale
 
-    # Create empty lists
-    new_verts = []
-    new_edges = []
-    new_faces = []
-    new_verts_np = np.array(())
-
     # Component bounding box
     min_c = Vector((0, 0, 0))
     max_c = Vector((0, 0, 0))
@@ -155,13 +256,8 @@ def tassellate(ob0, ob1, offset, zscale, gen_modifiers, com_modifiers, mode,
     vy = vs1[:, 1]
     vz = vs1[:, 2]
 
-    # Component polygons
-    fs1 = [[i for i in p.vertices] for p in me1.polygons]
-    new_faces = fs1[:]
-
     # Component edges
     es1 = [[i for i in e.vertices] for e in me1.edges if e.is_loose]
-    new_edges = es1[:]
 
     # SHAPE KEYS
     shapekeys = []
@@ -234,182 +330,252 @@ def tassellate(ob0, ob1, offset, zscale, gen_modifiers, com_modifiers, mode,
         fan_me = bpy.data.meshes.new('Fan.Mesh')
         fan_me.from_pydata(tuple(fan_verts), [], tuple(fan_polygons))
         me0 = fan_me
-        verts0 = me0.vertices
         base_polygons = me0.polygons
         """
         for i in range(len(selected_faces)):
             fan_me.polygons[i].select = selected_faces[i]
         """
-    count = 0   # necessary for UV calculation
-
-    # TESSELLATION
-    j = 0
-    for p in base_polygons:
-        # Random rotation
-        if rotation_mode == 'RANDOM':
-            shifted_vertices = []
-            n_poly_verts = len(p.vertices)
-            rand = random.randint(0, n_poly_verts)
-            for i in range(n_poly_verts):
-                shifted_vertices.append(p.vertices[(i + rand) % n_poly_verts])
-            vs0 = np.array([verts0[i].co for i in shifted_vertices])
-            nvs0 = np.array([verts0[i].normal for i in shifted_vertices])
-            # vertex weight
-            if bool_vertex_group:
-                ws0 = []
-                for i in shifted_vertices:
-                    try:
-                        ws0.append(weight[i])
-                    except:
-                        ws0.append(0)
-
-                ws0 = np.array(ws0)
-
-        # UV rotation
-        elif rotation_mode == 'UV' and len(ob0.data.uv_layers) > 0 and \
-                fill_mode != 'FAN':
-            i = p.index
-            v01 = (me0.uv_layers.active.data[count].uv +
-                   me0.uv_layers.active.data[count + 1].uv)
-            if len(p.vertices) > 3:
-                v32 = (me0.uv_layers.active.data[count + 3].uv +
-                       me0.uv_layers.active.data[count + 2].uv)
-            else:
-                v32 = (me0.uv_layers.active.data[count].uv +
-                       me0.uv_layers.active.data[count + 2].uv)
-            v0132 = v32 - v01
-            v0132.normalize()
-
-            v12 = (me0.uv_layers.active.data[count + 1].uv +
-                   me0.uv_layers.active.data[count + 2].uv)
-            if len(p.vertices) > 3:
-                v03 = (me0.uv_layers.active.data[count].uv +
-                       me0.uv_layers.active.data[count + 3].uv)
-            else:
-                v03 = (me0.uv_layers.active.data[count].uv +
-                       me0.uv_layers.active.data[count].uv)
-            v1203 = v03 - v12
-            v1203.normalize()
-
-            vertUV = []
-            dot1203 = v1203.x
-            dot0132 = v0132.x
-            if(abs(dot1203) < abs(dot0132)):
-                if (dot0132 > 0):
-                    vertUV = p.vertices[1:] + p.vertices[:1]
-                else:
-                    vertUV = p.vertices[3:] + p.vertices[:3]
-            else:
-                if(dot1203 < 0):
-                    vertUV = p.vertices[:]
-                else:
-                    vertUV = p.vertices[2:] + p.vertices[:2]
-            vs0 = np.array([verts0[i].co for i in vertUV])
-            nvs0 = np.array([verts0[i].normal for i in vertUV])
+    # Generator faces, in the (possibly FAN) generator mesh
+    n_base = len(me0.polygons)
+    if bool_selection and fill_mode != 'FAN':
+        select = np.zeros(n_base, dtype=np.int32)
+        me0.polygons.foreach_get("select", select)
+        face_index = np.flatnonzero(select)
+    else:
+        face_index = np.arange(n_base)
+    n_faces = len(face_index)
+
+    loop_start, loop_total, loop_vertex = mesh_loop_arrays(me0)
+    loop_start = loop_start[face_index]
+    loop_total = loop_total[face_index]
+
+    # Rotation of the face corners
+    if rotation_mode == 'RANDOM':
+        shifts = np.array([random.randint(0, n) for n in loop_total.tolist()],
+                          dtype=np.int32)
+    elif rotation_mode == 'UV' and len(ob0.data.uv_layers) > 0 and \
+            fill_mode != 'FAN':
+        shifts = uv_rotation_shifts(me0, loop_start, loop_total)
+    else:
+        shifts = np.zeros(n_faces, dtype=np.int32)
 
-            # Vertex weight
-            if bool_vertex_group:
-                ws0 = []
-                for i in vertUV:
-                    try:
-                        ws0.append(weight[i])
-                    except:
-                        ws0.append(0)
-                ws0 = np.array(ws0)
+    # considering only 4 vertices: the first three and the last one
+    corners = np.array((0, 1, 2, -1))
+    corner_loops = (shifts[:, None] + corners) % loop_total[:, None]
+    quads = loop_vertex[loop_start[:, None] + corner_loops]
 
-            count += len(p.vertices)
+    # TESSELLATION
+    co0 = np.zeros(len(me0.vertices) * 3)
+    me0.vertices.foreach_get("co", co0)
+    nor0 = np.zeros(len(me0.vertices) * 3)
+    me0.vertices.foreach_get("normal", nor0)
+    if scale_mode == "ADAPTIVE":
+        area0 = np.zeros(n_base)
+        me0.polygons.foreach_get("area", area0)
+        face_scale = np.sqrt(area0[face_index])
+    else:
+        face_scale = np.ones(n_faces)
+    if bool_vertex_group:
+        weight0 = np.array(weight)
+
+    # Component faces and loose edges, offset for every copy
+    c_loop_start, c_loop_total, c_loop_vertex = mesh_loop_arrays(me1)
+    es1 = np.array(es1, dtype=np.int32).reshape(-1, 2)
+    c_material_index = np.zeros(len(ob1.data.polygons), dtype=np.int32)
+    ob1.data.polygons.foreach_get("material_index", c_material_index)
+    c_materials = np.array([slot.material.as_pointer() if slot.material else 0
+                            for slot in ob1.material_slots], dtype=np.uint64)
+
+
+    data = TessellateData()
+    data.name = ob0.name + "_" + ob1.name
+    data.n_verts = n_verts
+    data.component = (vx, vy, vz)
+    data.component_key = (vx_key, vy_key, vz_key) if do_shapekeys else None
+    data.loops = (c_loop_start, c_loop_total, c_loop_vertex)
+    data.edges = es1
+    data.materials = (c_material_index, c_materials)
+    data.face_index = face_index
+    data.quads = quads
+    data.vs0 = co0.reshape(-1, 3)[quads]
+    data.nvs0 = nor0.reshape(-1, 3)[quads]
+    data.face_scale = face_scale
+    data.ws0 = weight0[quads] if bool_vertex_group else None
 
-        # Default rotation
-        else:
-            vs0 = np.array([verts0[i].co for i in p.vertices])
-            nvs0 = np.array([verts0[i].normal for i in p.vertices])
-            # Vertex weight
-            if bool_vertex_group:
-                ws0 = []
-                for i in p.vertices:
-                    try:
-                        ws0.append(weight[i])
-                    except:
-                        ws0.append(0)
-                ws0 = np.array(ws0)
-
-        # considering only 4 vertices
-        vs0 = np.array((vs0[0], vs0[1], vs0[2], vs0[-1]))
-        nvs0 = np.array((nvs0[0], nvs0[1], nvs0[2], nvs0[-1]))
-
-        # remapped vertex coordinates
-        v0 = vs0[0] + (vs0[1] - vs0[0]) * vx
-        v1 = vs0[3] + (vs0[2] - vs0[3]) * vx
-        v2 = v0 + (v1 - v0) * vy
-
-        # remapped vertex normal
-        nv0 = nvs0[0] + (nvs0[1] - nvs0[0]) * vx
-        nv1 = nvs0[3] + (nvs0[2] - nvs0[3]) * vx
-        nv2 = nv0 + (nv1 - nv0) * vy
-
-        # vertex z to normal
-        v3 = v2 + nv2 * vz * (sqrt(p.area) if scale_mode == "ADAPTIVE" else 1)
-
-        if bool_vertex_group:
-            ws0 = np.array((ws0[0], ws0[1], ws0[2], ws0[-1]))
+    ob0.data = old_me0
+    return data
+
+
+def tessellate_buffers(data):
+    # output arrays for the coordinates and vertex group weights
+    shape = (len(data.face_index), data.n_verts)
+    data.coords = tessellate_array(shape + (3, ), np.float32)
+    if data.ws0 is not None:
+        data.weights = tessellate_array(shape, np.float32)
+
+
+def tessellate_coords(data, faces=None):
+    # coordinates (and vertex group weights) of the component copies on the
+    # generator faces at the positions faces, all of them by default
+    n_verts = data.n_verts
+    vx, vy, vz = data.component
+    if data.coords is None:
+        tessellate_buffers(data)
+    if faces is None:
+        faces = np.arange(len(data.face_index))
+
+    chunk = max(1, TESSELLATE_CHUNK_VERTS // max(n_verts, 1))
+    for start in range(0, len(faces), chunk):
+        face = faces[start:start + chunk]
+        vs0 = data.vs0[face]
+        nvs0 = data.nvs0[face]
+        scale = data.face_scale[face, None, None]
+
+        # remapped vertex coordinates and normals, vertex z to normal
+        v3 = lerp2_array(vs0, vx, vy) + lerp2_array(nvs0, vx, vy) * vz * scale
+
+        if data.ws0 is not None:
             # Interpolate vertex weight
-            w0 = ws0[0] + (ws0[1] - ws0[0]) * vx
-            w1 = ws0[3] + (ws0[2] - ws0[3]) * vx
-            w2 = w0 + (w1 - w0) * vy
+            w2 = lerp2_array(data.ws0[face][:, :, None], vx, vy)
 
             # Shapekeys
-            if do_shapekeys:
-                # remapped vertex coordinates
-                v0 = vs0[0] + (vs0[1] - vs0[0]) * vx_key
-                v1 = vs0[3] + (vs0[2] - vs0[3]) * vx_key
-                v2 = v0 + (v1 - v0) * vy_key
-                # remapped vertex normal
-                nv0 = nvs0[0] + (nvs0[1] - nvs0[0]) * vx_key
-                nv1 = nvs0[3] + (nvs0[2] - nvs0[3]) * vx_key
-                nv2 = nv0 + (nv1 - nv0) * vy_key
-                # vertex z to normal
-                v3_key = v2 + nv2 * vz_key * (sqrt(p.area) if
-                                              scale_mode == "ADAPTIVE" else 1)
+            if data.component_key is not None:
+                vx_key, vy_key, vz_key = data.component_key
+                v3_key = lerp2_array(vs0, vx_key, vy_key) + \
+                         lerp2_array(nvs0, vx_key, vy_key) * vz_key * scale
                 v3 = v3 + (v3_key - v3) * w2
 
-        if j == 0:
-            new_verts_np = v3
-            if bool_vertex_group:
-                new_vertex_group_np = w2
-        else:
-            # Appending vertices
-            new_verts_np = np.concatenate((new_verts_np, v3), axis=0)
-            # Appending vertex group
-            if bool_vertex_group:
-                new_vertex_group_np = np.concatenate((new_vertex_group_np, w2),
-                                                     axis=0)
-            # Appending faces
-            for p in fs1:
-                new_faces.append([i + n_verts * j for i in p])
-            # Appending edges
-            for e in es1:
-                new_edges.append([i + n_verts * j for i in e])
-
-        j += 1
-
-    new_verts = new_verts_np.tolist()
-    new_name = ob0.name + "_" + ob1.name
-    new_me = bpy.data.meshes.new(new_name)
-    new_me.from_pydata(new_verts, new_edges, new_faces)
+            data.weights[face] = w2[:, :, 0]
+        data.coords[face] = v3
+
+
+def tessellate_weights(ob, data, faces=None):
+    # write the interpolated weights of data to the "generator_group" of ob,
+    # only for the copies on the generator faces at positions faces if given.
+    # The group is removed when data has no weights
+    vertex_group = ob.vertex_groups.get("generator_group")
+    if data.weights is None:
+        if vertex_group is not None:
+            ob.vertex_groups.remove(vertex_group)
+        return
+
+    if vertex_group is None:
+        vertex_group = ob.vertex_groups.new("generator_group")
+        faces = None
+    if faces is None:
+        faces = np.arange(len(data.face_index))
+    verts = (faces[:, None] * data.n_verts + np.arange(data.n_verts)).ravel()
+    # vertex group weights can't be set with foreach_set, add all the
+    # vertices sharing a weight in one call
+    weights, inverse = np.unique(data.weights[faces].ravel(), return_inverse=True)
+    order = np.argsort(inverse, kind='mergesort')
+    bounds = np.searchsorted(inverse[order], np.arange(len(weights) + 1)).tolist()
+    verts = verts[order].tolist()
+    for w, start, end in zip(weights.tolist(), bounds[:-1], bounds[1:]):
+        vertex_group.add(verts[start:end], w, "REPLACE")
+
+
+def tessellate_copies(values, step, n_faces):
+    # values of the component repeated for every generator face, offset by
+    # step for each copy. Built in chunks like the coordinates
+    values = values.ravel()
+    copies = tessellate_array((n_faces, len(values)), np.int32)
+    chunk = max(1, TESSELLATE_CHUNK_VERTS // max(len(values), 1))
+    for start in range(0, n_faces, chunk):
+        end = min(start + chunk, n_faces)
+        copies[start:end] = values[None, :] + \
+            np.arange(start, end, dtype=np.int32)[:, None] * step
+    return copies.ravel()
+
+
+def tessellate_object(data, use_weights=True):
+    # new object with the tessellated mesh of the computed coordinates
+    n_verts = data.n_verts
+    n_faces = len(data.face_index)
+    c_loop_start, c_loop_total, c_loop_vertex = data.loops
+    n_loops = len(c_loop_vertex)
+    es1 = data.edges
+
+    new_me = bpy.data.meshes.new(data.name)
+    new_me.vertices.add(n_faces * n_verts)
+    new_me.vertices.foreach_set("co", data.coords.ravel())
+
+    new_me.edges.add(len(es1) * n_faces)
+    new_me.edges.foreach_set("vertices", tessellate_copies(es1, n_verts, n_faces))
+
+    new_me.polygons.add(len(c_loop_start) * n_faces)
+    new_me.polygons.foreach_set(
+            "loop_start", tessellate_copies(c_loop_start, n_loops, n_faces))
+    new_me.polygons.foreach_set(
+            "loop_total", tessellate_copies(c_loop_total, 0, n_faces))
+
+    new_me.loops.add(n_faces * n_loops)
+    new_me.loops.foreach_set(
+            "vertex_index", tessellate_copies(c_loop_vertex, n_verts, n_faces))
+
     new_me.update(calc_edges=True)
     new_ob = bpy.data.objects.new("tessellate_temp", new_me)
 
     # vertex group
-    if bool_vertex_group:
-        new_ob.vertex_groups.new("generator_group")
-        for i in range(len(new_vertex_group_np)):
-            new_ob.vertex_groups["generator_group"].add([i],
-                                                        new_vertex_group_np[i],
-                                                        "ADD")
-    ob0.data = old_me0
+    if use_weights:
+        tessellate_weights(new_ob, data)
     return new_ob
 
 
+def tessellate_update(data, cached):
+    # compute the coordinates of data, copying those of the generator faces
+    # that didn't change since cached. Returns True when the generator faces
+    # are the same, so the old mesh can take the new coordinates in place
+    if cached.coords is None or data.n_verts != cached.n_verts or \
+            (data.ws0 is None) != (cached.ws0 is None) or \
+            not same_arrays(data.component, cached.component) or \
+            not same_arrays(data.component_key, cached.component_key) or \
+            not same_arrays(data.loops, cached.loops) or \
+            not same_arrays(data.materials, cached.materials) or \
+            not np.array_equal(data.edges, cached.edges):
+        tessellate_coords(data)
+        return False
+
+    # position of each generator face in the cached faces
+    pos = np.searchsorted(cached.face_index, data.face_index)
+    pos = np.minimum(pos, len(cached.face_index) - 1)
+    same = cached.face_index[pos] == data.face_index
+    same &= (cached.quads[pos] == data.quads).all(axis=1)
+    same &= (cached.vs0[pos] == data.vs0).all(axis=(1, 2))
+    same &= (cached.nvs0[pos] == data.nvs0).all(axis=(1, 2))
+    same &= cached.face_scale[pos] == data.face_scale
+    if data.ws0 is not None:
+        same &= (cached.ws0[pos] == data.ws0).all(axis=1)
+
+    same_faces = np.array_equal(data.face_index, cached.face_index)
+    if same_faces:
+        data.coords = cached.coords
+        data.weights = cached.weights
+    else:
+        tessellate_buffers(data)
+        data.coords[same] = cached.coords[pos[same]]
+        if data.weights is not None:
+            data.weights[same] = cached.weights[pos[same]]
+
+    data.updated_faces = np.flatnonzero(~same)
+    tessellate_coords(data, data.updated_faces)
+    return same_faces
+
+
+def tassellate(ob0, ob1, offset, zscale, gen_modifiers, com_modifiers, mode,
+               scale_mode, rotation_mode, rand_seed, fill_mode,
+               bool_vertex_group, bool_selection, bool_shapekeys):
+    data = tessellate_prepare(
+            ob0, ob1, offset, zscale, gen_modifiers, com_modifiers, mode,
+            scale_mode, rotation_mode, rand_seed, fill_mode,
+            bool_vertex_group, bool_selection, bool_shapekeys
+            )
+    if data == 0:
+        return 0
+    tessellate_coords(data)
+    return tessellate_object(data)
+
+
 def store_parameters(operator, ob):
     ob.tissue_tessellate.generator = operator.generator
     ob.tissue_tessellate.component = operator.component
@@ -940,6 +1106,13 @@ class update_tessellate(Operator):
                       "component changes")
     bl_options = {'REGISTER', 'UNDO'}
 
+    incremental = BoolProperty(
+            name="Incremental",
+            default=True,
+            description="Only recompute the copies on the generator faces "
+                        "that changed since the last Refresh"
+            )
+
     go = False
 
     @classmethod
@@ -991,19 +1164,42 @@ class update_tessellate(Operator):
         ob0 = bpy.data.objects[generator]
         ob1 = bpy.data.objects[component]
 
-        temp_ob = tassellate(
+        data = tessellate_prepare(
                 ob0, ob1, offset, zscale, gen_modifiers, com_modifiers,
                 mode, scale_mode, rotation_mode, random_seed, fill_mode,
                 bool_vertex_group, bool_selection, bool_shapekeys
                 )
 
-        if temp_ob == 0:
+        if data == 0:
             message = "Zero faces selected in the Base mesh!"
             self.report({'ERROR'}, message)
             return {'CANCELLED'}
 
+        tessellate_cache_prune()
+        cached = tessellate_cache.get(ob.as_pointer())
+        if self.incremental and cached is not None:
+            same_faces = tessellate_update(data, cached)
+        else:
+            tessellate_coords(data)
+            same_faces = False
+        tessellate_cache[ob.as_pointer()] = data
+
+        # Only the coordinates (and weights) changed, update the mesh in place
+        if same_faces and not merge and \
+                cached.mesh_pointer == ob.data.as_pointer() and \
+                len(ob.data.vertices) == data.coords.shape[0] * data.n_verts:
+            ob.data.vertices.foreach_set("co", data.coords.ravel())
+            tessellate_weights(ob, data, data.updated_faces)
+            ob.data.update()
+            data.mesh_pointer = cached.mesh_pointer
+            return {'FINISHED'}
+
+        temp_ob = tessellate_object(data, use_weights=False)
         ob.data = temp_ob.data
         bpy.data.objects.remove(temp_ob)
+        tessellate_weights(ob, data)
+        if not merge:
+            data.mesh_pointer = ob.data.as_pointer()
         if merge:
             bpy.ops.object.mode_set(mode='EDIT')
             bpy.ops.mesh.select_mode(
@@ -1562,6 +1758,7 @@ def register():
 
 
 def unregister():
+    tessellate_cache.clear()
     bpy.utils.unregister_class(tissue_tessellate_prop)
     bpy.utils.unregister_class(tessellate)
     bpy.utils.unregister_class(update_tessellate)
@@ -0,0 +1,310 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+"""
+Shared frame I/O for vertex point caches (NewTek MDD and PC2).
+
+Both formats store a fixed size header followed by one block of
+``points * 3`` 32bit floats per frame, MDD in big-endian and PC2 in
+little-endian byte order. Frames are moved between files and meshes as a
+single flat buffer, read and written with ``foreach_get``/``foreach_set``
+and ``array.tofile``/``numpy.fromfile``, instead of one vertex at a time.
+
+Since the header and frame sizes are fixed, every frame has a known file
+offset. ``export_frames_parallel`` uses this to split a frame range across
+background Blender processes (this file run with ``--python``), each one
+evaluating its slice of frames and writing them in place.
+"""
+
+__all__ = (
+    "MDD",
+    "PC2",
+    "frame_size",
+    "frame_coords",
+    "frame_coords_set",
+    "write_floats",
+    "read_floats",
+    "read_frames",
+    "mdd_header_read",
+    "mdd_header_write",
+    "pc2_header_read",
+    "pc2_header_write",
+    "VertexCountError",
+    "sample_frame",
+    "export_frames_parallel",
+    )
+
+import sys
+from array import array
+from struct import pack, unpack, calcsize
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# byte order of the float data for each format
+MDD = 'big'
+PC2 = 'little'
+
+_MDD_HEADER = ">2i"
+_PC2_HEADER = "<12siiffi"
+_PC2_SIGNATURE = b'POINTCACHE2\0'
+
+MDD_HEADER_SIZE = calcsize(_MDD_HEADER)
+PC2_HEADER_SIZE = calcsize(_PC2_HEADER)
+
+
+class VertexCountError(Exception):
+    pass
+
+
+def frame_size(points):
+    """Size in bytes of a single frame of ``points`` vertices."""
+    return points * 3 * 4
+
+
+def frame_coords(verts):
+    """Flat float array of all vertex coordinates of ``verts``
+    (mesh vertices or shape key points)."""
+    coords = array('f', bytes(frame_size(len(verts))))
+    verts.foreach_get("co", coords)
+    return coords
+
+
+def frame_coords_set(verts, coords):
+    """Assign a flat float buffer to all vertex coordinates of ``verts``."""
+    verts.foreach_set("co", coords)
+
+
+def write_floats(file, floats, byteorder):
+    """Write a float array (or sequence) to ``file`` in ``byteorder``."""
+    if not isinstance(floats, array):
+        floats = array('f', floats)
+    if byteorder != sys.byteorder:
+        floats = array('f', floats)
+        floats.byteswap()
+    floats.tofile(file)
+
+
+def read_floats(file, count, byteorder):
+    """Read ``count`` floats stored in ``byteorder`` into a native float array."""
+    floats = array('f')
+    floats.fromfile(file, count)
+    if byteorder != sys.byteorder:
+        floats.byteswap()
+    return floats
+
+
+def _read_frames(file, frames, count, byteorder):
+    if numpy is not None:
+        dtype = numpy.dtype('>f4' if byteorder == 'big' else '<f4')
+        for _ in range(frames):
+            yield numpy.fromfile(file, dtype=dtype, count=count).astype(numpy.float32)
+    else:
+        for _ in range(frames):
+            yield read_floats(file, count, byteorder)
+
+
+def read_frames(file, frames, points, byteorder):
+    """
+    Iterate over ``frames`` consecutive frames starting at the current file
+    position, each frame is only read when it is reached.
+
+    Yields a native float32 numpy array of ``points * 3`` values per frame
+    when numpy is available, otherwise a float array.
+    Raises ``EOFError`` right away when the file is too short.
+    """
+    import os
+
+    if os.fstat(file.fileno()).st_size - file.tell() < frames * frame_size(points):
+        raise EOFError("point cache is truncated, expected %d frames" % frames)
+
+    return _read_frames(file, frames, points * 3, byteorder)
+
+
+def mdd_header_size(frames):
+    """Size in bytes of an MDD header (including the frame times)."""
+    return MDD_HEADER_SIZE + frames * 4
+
+
+def mdd_header_read(file):
+    """Return ``(frames, points, times)`` from an MDD header."""
+    frames, points = unpack(_MDD_HEADER, file.read(calcsize(_MDD_HEADER)))
+    times = read_floats(file, frames, MDD)
+    return frames, points, times
+
+
+def mdd_header_write(file, frames, points, times):
+    file.write(pack(_MDD_HEADER, frames, points))
+    write_floats(file, times, MDD)
+
+
+def pc2_header_read(file):
+    """Return ``(points, start, sampling, samples)`` from a PC2 header."""
+    (signature, _version, points,
+     start, sampling, samples) = unpack(_PC2_HEADER, file.read(calcsize(_PC2_HEADER)))
+    if signature != _PC2_SIGNATURE:
+        raise ValueError("not a PC2 point cache")
+    return points, start, sampling, samples
+
+
+def pc2_header_write(file, points, start, sampling, samples):
+    file.write(pack(_PC2_HEADER, _PC2_SIGNATURE, 1, points, start, sampling, samples))
+
+
+# -----------------------------------------------------------------------------
+# Frame evaluation
+
+def sample_frame(scene, obj, frame, apply_modifiers=True, use_world_space=False, matrix=None):
+    """
+    Evaluate ``obj`` at a (possibly fractional) ``frame``,
+    returns its vertex coordinates as a flat float array.
+    """
+    import math
+    import bpy
+
+    subframe, frame = math.modf(frame)
+    scene.frame_set(int(frame), subframe)
+
+    me = obj.to_mesh(scene, apply_modifiers, 'PREVIEW')
+    try:
+        if use_world_space:
+            me.transform(obj.matrix_world)
+        if matrix is not None:
+            me.transform(matrix)
+        return frame_coords(me.vertices)
+    finally:
+        bpy.data.meshes.remove(me, do_unlink=True)
+
+
+def _write_frames(job):
+    """
+    Evaluate and write the frames of one job (see ``export_frames_parallel``),
+    each frame goes to its fixed offset in the already allocated file.
+    """
+    import bpy
+    from mathutils import Matrix
+
+    scene = bpy.context.scene
+    obj = bpy.data.objects[job["object"]]
+    matrix = Matrix(job["matrix"]) if job["matrix"] else None
+    points = job["points"]
+
+    with open(job["filepath"], 'r+b') as file:
+        file.seek(job["offset"] + job["index"] * frame_size(points))
+        for frame in job["frames"]:
+            coords = sample_frame(scene, obj, frame,
+                                  job["apply_modifiers"], job["use_world_space"], matrix)
+            if len(coords) != points * 3:
+                raise VertexCountError("vertex count changed at frame %r: %d, expected %d" %
+                                       (frame, len(coords) // 3, points))
+            write_floats(file, coords, job["byteorder"])
+
+
+def export_frames_parallel(obj, filepath, byteorder, offset, index, frames, points,
+                           workers=0, apply_modifiers=True, use_world_space=False, matrix=None):
+    """
+    Evaluate ``frames`` in background Blender processes, writing them to
+    ``filepath`` starting at frame ``index`` of the cache.
+
+    ``offset`` is the header size, the caller writes the header first.
+    The blend-file is saved to a temporary copy which the workers load, each
+    one evaluates a contiguous slice of the frame range. Raises
+    ``VertexCountError`` when a worker found a different vertex count than
+    ``points`` and ``RuntimeError`` when a worker failed otherwise.
+    """
+    import json
+    import os
+    import shutil
+    import subprocess
+    import tempfile
+    import bpy
+
+    if not frames:
+        return
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(frames)))
+
+    # Allocate the whole file so workers can write their frames in any order.
+    with open(filepath, 'r+b') as file:
+        file.truncate(offset + (index + len(frames)) * frame_size(points))
+
+    temp_dir = tempfile.mkdtemp(prefix="point_cache_")
+    try:
+        blend_path = os.path.join(temp_dir, "scene.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+
+        procs = []
+        chunk = (len(frames) + workers - 1) // workers
+        for start in range(0, len(frames), chunk):
+            job = {
+                "filepath": os.path.abspath(filepath),
+                "object": obj.name,
+                "byteorder": byteorder,
+                "offset": offset,
+                "index": index + start,
+                "frames": list(frames[start:start + chunk]),
+                "points": points,
+                "apply_modifiers": apply_modifiers,
+                "use_world_space": use_world_space,
+                "matrix": [list(row) for row in matrix] if matrix is not None else None,
+                }
+            job_path = os.path.join(temp_dir, "job_%d.json" % start)
+            with open(job_path, 'w') as file:
+                json.dump(job, file)
+
+            # Output goes to a log file per worker, a pipe which isn't
+            # read while the other workers run could fill up and block it.
+            log_path = os.path.join(temp_dir, "job_%d.log" % start)
+            with open(log_path, 'wb') as log:
+                proc = subprocess.Popen(
+                    [bpy.app.binary_path, "--background", blend_path,
+                     "--python-exit-code", "1",
+                     "--python", __file__, "--", job_path],
+                    stdout=log, stderr=subprocess.STDOUT)
+            procs.append((proc, log_path))
+
+        failed = []
+        for proc, log_path in procs:
+            if proc.wait() != 0:
+                with open(log_path, 'rb') as log:
+                    failed.append(log.read().decode('utf-8', 'replace'))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    for output in failed:
+        if VertexCountError.__name__ in output:
+            raise VertexCountError("number of verts has changed during animation")
+    if failed:
+        raise RuntimeError("point cache worker failed:\n%s" % failed[0])
+
+
+def main(argv):
+    import json
+    job_path, = argv[argv.index("--") + 1:]
+    with open(job_path, 'r') as file:
+        _write_frames(json.load(file))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -17,6 +17,7 @@
 
 __all__ = (
     "SnapContext",
+    "SnapContextCPU",
     )
 
 import bgl
@@ -45,6 +46,11 @@ class _Internal:
     from mathutils.geometry import intersect_line_plane
 
 
+# Relative distance a face hit must be in front of an edge or vertex to hide it,
+# plays the role of the depth range offset used when drawing edges.
+_OCCLUSION_EPS = 1e-4
+
+
 class _SnapObjectData():
     __slots__ = ('data', 'mat')
     def __init__(self, data, omat):
@@ -320,3 +326,231 @@ class SnapContext():
     def free(self):
         self.__del__()
         self.freed = True
+
+
+class SnapContextCPU(SnapContext):
+    """
+    Snap context that finds the elements with ray casts and screen space
+    searches on the CPU instead of reading back an ID buffer, so it works
+    without an OpenGL context (background mode).
+
+    Faces are ray cast against a `BVHTree` of each object, edges, loose
+    vertices and faces near the cursor are searched in the region with the
+    projection of the current view and ranked by their distance in pixels.
+    The API and the returned values are the same as `SnapContext`.
+
+    :arg region: region of the 3D viewport, typically bpy.context.region.
+    :type region: :class:`bpy.types.Region`
+    :arg space: 3D region data, typically bpy.context.space_data.
+    :type space: :class:`bpy.types.SpaceView3D`
+    """
+
+    def __init__(self, region, space):
+        self.freed = False
+        self.snap_objects = []
+        self.drawn_count = 0
+        self.region = region
+        self.rv3d = space.region_3d
+
+        if self.rv3d.is_perspective:
+            self.depth_range = Vector((space.clip_start, space.clip_end))
+        else:
+            self.depth_range = Vector((-space.clip_end, space.clip_end))
+
+        self.proj_mat = None
+        self.mval = Vector((0, 0))
+        self._snap_mode = VERT | EDGE | FACE
+        self._clip_planes = None
+
+        self.set_pixel_dist(12)
+
+        self.winsize = Vector((self.region.width, self.region.height))
+
+    ## PRIVATE ##
+
+    def _ray_orig_get(self, co):
+        """Origin of the view ray passing through `co`."""
+        if self.rv3d.is_perspective:
+            return self.last_ray[1]
+        ray_dir = self.last_ray[0]
+        return co - ray_dir * (ray_dir.dot(co - self.last_ray[1]) - self.depth_range[0])
+
+    def _is_clipped(self, co):
+        if self._clip_planes:
+            for plane in self._clip_planes:
+                if plane.xyz.dot(co) + plane.w < 0.0:
+                    return True
+        return False
+
+    def _ray_cast(self, ray_orig, ray_dir):
+        """Nearest face hit of the drawn objects as `(dist, snap_obj, co, tri_index)`."""
+        ret = None
+        for snap_obj in self.snap_objects[:self.drawn_count]:
+            data = snap_obj.data[1]
+            if not data.draw_tris:
+                continue
+            mat_inv = snap_obj.mat.inverted()
+            co, index = data.ray_cast(mat_inv * ray_orig, mat_inv.to_3x3() * ray_dir)
+            if co is not None:
+                co = snap_obj.mat * co
+                dist = (co - ray_orig).length
+                if ret is None or dist < ret[0]:
+                    ret = dist, snap_obj, co, index
+        return ret
+
+    def _is_occluded(self, co):
+        ray_orig = self._ray_orig_get(co)
+        ray_dir = co - ray_orig
+        dist = ray_dir.length
+        if dist == 0.0:
+            return False
+        hit = self._ray_cast(ray_orig, ray_dir / dist)
+        return hit is not None and hit[0] < dist * (1.0 - _OCCLUSION_EPS)
+
+    def _get_nearest_elem(self, snap_face):
+        """
+        Nearest visible edge or loose vertex closer than the pixel distance,
+        as `(snap_obj, index)` with indices as in `SnapContext`.
+        Candidates are ranked by their distance to the cursor in the region,
+        like the search around the cursor in the ID buffer.
+        """
+        elems = []
+        for snap_obj in self.snap_objects[:self.drawn_count]:
+            data = snap_obj.data[1]
+            index = data.num_tris if data.draw_tris else 0
+            for dist_sq, i, co in data.find_edges(self.mval, self._dist_px):
+                elems.append((dist_sq, snap_obj, index + i, co))
+
+            if data.draw_edges:
+                index += data.num_edges
+            for dist_sq, i, co in data.find_looseverts(self.mval, self._dist_px):
+                elems.append((dist_sq, snap_obj, index + i, co))
+
+        elems.sort(key=lambda elem: elem[0])
+        for dist_sq, snap_obj, index, co in elems:
+            co = snap_obj.mat * co
+            if self._is_clipped(co):
+                continue
+            # Faces are only drawn (and hide edges) when snapping to them.
+            if snap_face and self._is_occluded(co):
+                continue
+            return snap_obj, index
+
+        return None, None
+
+    def _get_nearest_face(self):
+        """
+        Nearest visible face closer than the pixel distance to the cursor,
+        as `(snap_obj, index)`. The face hit by the ray through the nearest
+        point of each candidate is the one the ID buffer has at that pixel.
+        """
+        elems = []
+        for snap_obj in self.snap_objects[:self.drawn_count]:
+            for dist_sq, i, co in snap_obj.data[1].find_tris(self.mval, self._dist_px):
+                elems.append((dist_sq, co))
+
+        elems.sort(key=lambda elem: elem[0])
+        for dist_sq, co in elems:
+            ray_dir, ray_orig = _Internal.region_2d_to_orig_and_view_vector(self.region, self.rv3d, co)
+            hit = self._ray_cast(self._ray_orig_get(ray_orig), ray_dir)
+            if hit is not None and not self._is_clipped(hit[2]):
+                return hit[1], hit[3]
+
+        return None, None
+
+    def __del__(self):
+        if not self.freed:
+            # Some objects may still be being referenced
+            for snap_obj in self.snap_objects:
+                del snap_obj.data
+                del snap_obj.mat
+                del snap_obj
+            del self.snap_objects
+
+    ## PUBLIC ##
+
+    def update_all(self):
+        self.drawn_count = 0
+
+    def update_drawn_snap_object(self, snap_obj):
+        """
+        Rebuild the trees of `snap_obj` on the next `snap_get` call,
+        the other objects keep theirs.
+        """
+        data = snap_obj.data
+        if len(data) > 1:
+            del data[1:]
+            drawn = self.snap_objects[:self.drawn_count]
+            self.snap_objects = (
+                [s for s in drawn if s.data is not data] +
+                [s for s in drawn if s.data is data] +
+                self.snap_objects[self.drawn_count:])
+            self.drawn_count = sum(1 for s in drawn if s.data is not data)
+
+    def use_clip_planes(self, value):
+        if value and self.rv3d.use_clip_planes:
+            planes = self.rv3d.clip_planes
+            self._clip_planes = [Vector(planes[i]) for i in range(4)]
+        else:
+            self._clip_planes = None
+
+    def set_pixel_dist(self, dist_px):
+        self._dist_px = int(dist_px)
+        self._dist_px_sq = self._dist_px ** 2
+        self.threshold = 2 * self._dist_px + 1
+
+    def snap_get(self, mval):
+        ret = None, None
+        self.mval[:] = mval
+        snap_vert = self._snap_mode & VERT != 0
+        snap_edge = self._snap_mode & EDGE != 0
+        snap_face = self._snap_mode & FACE != 0
+
+        proj_mat = self.rv3d.perspective_matrix.copy()
+        if self.proj_mat != proj_mat:
+            self.proj_mat = proj_mat
+            self.update_all()
+
+        ray_dir, ray_orig = self.get_ray(mval)
+        for i, snap_obj in enumerate(self.snap_objects[self.drawn_count:], self.drawn_count):
+            obj = snap_obj.data[0]
+            bbmin = Vector(obj.bound_box[0])
+            bbmax = Vector(obj.bound_box[6])
+
+            if bbmin != bbmax:
+                MVP = proj_mat * snap_obj.mat
+                mat_inv = snap_obj.mat.inverted()
+                ray_orig_local = mat_inv * ray_orig
+                ray_dir_local = mat_inv.to_3x3() * ray_dir
+                in_threshold = _Internal.intersect_boundbox_threshold(self, MVP, ray_orig_local, ray_dir_local, bbmin, bbmax)
+            else:
+                proj_co = _Internal.project_co_v3(self, snap_obj.mat.translation)
+                dist = self.mval - proj_co
+                in_threshold = abs(dist.x) < self._dist_px and abs(dist.y) < self._dist_px
+
+            if in_threshold:
+                if len(snap_obj.data) == 1:
+                    from .mesh_trees import CPU_Trees_Mesh
+                    snap_obj.data.append(CPU_Trees_Mesh(obj, snap_face, snap_edge, snap_vert))
+                snap_obj.data[1].set_draw_mode(snap_face, snap_edge, snap_vert)
+                snap_obj.data[1].set_ModelViewMatrix(proj_mat * snap_obj.mat, self.winsize)
+
+                self.snap_objects[self.drawn_count], self.snap_objects[i] = self.snap_objects[i], self.snap_objects[self.drawn_count]
+                self.drawn_count += 1
+
+        snap_obj = None
+        if snap_vert or snap_edge:
+            snap_obj, index = self._get_nearest_elem(snap_face)
+
+        if snap_obj is None and snap_face:
+            hit = self._ray_cast(self._ray_orig_get(ray_orig), ray_dir)
+            if hit is not None and not self._is_clipped(hit[2]):
+                snap_obj, index = hit[1], hit[3]
+            else:
+                # No face under the cursor, the nearest one around it.
+                snap_obj, index = self._get_nearest_face()
+
+        if snap_obj:
+            ret = self._get_loc(snap_obj, index)
+
+        return snap_obj, ret[0], ret[1]
@@ -0,0 +1,408 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+import numpy as np
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+from mathutils.kdtree import KDTree
+
+from .mesh_drawing import _Mesh_Arrays
+
+
+# Points with a smaller `w` are behind (or on) the view plane.
+_W_MIN = 1e-5
+
+# Edges whose screen bounds cover more grid cells than this are not binned,
+# they are tested on every query instead.
+_GRID_MAX_SPAN = 16
+
+
+class CPU_Trees_Mesh():
+    """
+    CPU counterpart of `GPU_Indices_Mesh`.
+
+    Faces are kept in a `BVHTree` in object space, edges and loose vertices
+    are projected to the region once per view and searched there, edges
+    through a uniform grid of screen cells and loose vertices with a `KDTree`.
+    Element indices, `get_tot_elems` and the `get_*` accessors follow
+    `GPU_Indices_Mesh` so `SnapContext._get_loc` works on both.
+    """
+    # All indices are local, see `SnapContextCPU`.
+    first_index = 0
+
+    def __init__(self, obj, draw_tris, draw_edges, draw_verts):
+        self.obj = obj
+        self.draw_tris = draw_tris
+        self.draw_edges = draw_edges
+        self.draw_verts = draw_verts
+
+        self.bvhtree = None
+        self.tri_verts = self.edge_verts = self.looseverts = None
+        self.num_tris = self.num_edges = self.num_verts = 0
+        self.MVP = None
+
+        ## Init Array ##
+        mesh_arrays = _Mesh_Arrays(obj, draw_tris, draw_edges, draw_verts)
+
+        self.verts_co = mesh_arrays.verts_co
+        if self.verts_co is None:
+            self.draw_tris = False
+            self.draw_edges = False
+            self.draw_verts = False
+            return
+
+        ## Create BVHTree for Tris ##
+        if mesh_arrays.tri_verts is not None:
+            self.tri_verts = mesh_arrays.tri_verts
+            self.num_tris = len(self.tri_verts)
+            self.bvhtree = BVHTree.FromPolygons(
+                    self.verts_co.tolist(), self.tri_verts.tolist(), all_triangles=True)
+        else:
+            self.draw_tris = False
+
+        if mesh_arrays.edge_verts is not None:
+            self.edge_verts = mesh_arrays.edge_verts
+            self.num_edges = len(self.edge_verts)
+        else:
+            self.draw_edges = False
+
+        if mesh_arrays.looseverts is not None:
+            self.looseverts = mesh_arrays.looseverts
+            self.num_verts = len(self.looseverts)
+        else:
+            self.draw_verts = False
+
+        del mesh_arrays
+
+
+    def get_tot_elems(self):
+        tot = 0
+
+        if self.draw_tris:
+            tot += self.num_tris
+
+        if self.draw_edges:
+            tot += self.num_edges
+
+        if self.draw_verts:
+            tot += self.num_verts
+
+        return tot
+
+
+    def set_draw_mode(self, draw_tris, draw_edges, draw_verts):
+        self.draw_tris = draw_tris and self.bvhtree is not None
+        self.draw_edges = draw_edges and self.edge_verts is not None
+        self.draw_verts = draw_verts and self.looseverts is not None
+
+
+    def set_ModelViewMatrix(self, MVP, winsize):
+        """
+        Project the vertices to the region, `MVP` is the projection matrix
+        multiplied by the object matrix. Does nothing if the view is unchanged.
+        """
+        MVP = MVP.copy()
+        winsize = winsize.copy()
+        if self.MVP == MVP and self.winsize == winsize:
+            return
+
+        self.MVP = MVP
+        self.winsize = winsize
+
+        # Cleared, built on demand.
+        self._tris_view = None
+        self._edges_view = None
+        self._edges_grid = None
+        self._looseverts_kdtree = None
+
+        if self.verts_co is None:
+            self._proj_co = None
+            return
+
+        mat = np.array(MVP, 'f8')
+        self._proj_co = self.verts_co.dot(mat[:, :3].T) + mat[:, 3]
+
+
+    def _to_window(self, co):
+        win_half = np.array(self.winsize, 'f8') * 0.5
+        return (co[:, :2] / co[:, 3:4] + 1.0) * win_half
+
+
+    def _get_tris_view(self):
+        """
+        Triangles entirely in front of the view plane, in window coordinates,
+        as `(index, a, b, c, bmin, bmax)`.
+        """
+        if self._tris_view is None:
+            proj_co = self._proj_co[self.tri_verts]
+            index = np.nonzero((proj_co[:, :, 3] > _W_MIN).all(1))[0]
+            a, b, c = (self._to_window(proj_co[index, i]) for i in range(3))
+            self._tris_view = (
+                index, a, b, c,
+                np.minimum(np.minimum(a, b), c), np.maximum(np.maximum(a, b), c))
+
+        return self._tris_view
+
+
+    def _get_edges_view(self):
+        """
+        Edges clipped to the front of the view plane, in window coordinates.
+        `c0` and `c1` are the edge factors of the clipped ends,
+        `wc0` and `wc1` their `w`.
+        """
+        if self._edges_view is None:
+            h0 = self._proj_co[self.edge_verts[:, 0]]
+            h1 = self._proj_co[self.edge_verts[:, 1]]
+            w0 = h0[:, 3]
+            w1 = h1[:, 3]
+            index = np.nonzero((w0 > _W_MIN) | (w1 > _W_MIN))[0]
+            h0, h1, w0, w1 = h0[index], h1[index], w0[index], w1[index]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = (_W_MIN - w0) / (w1 - w0)
+            c0 = np.where(w0 > _W_MIN, 0.0, t)
+            c1 = np.where(w1 > _W_MIN, 1.0, t)
+            hc0 = h0 + c0[:, None] * (h1 - h0)
+            hc1 = h0 + c1[:, None] * (h1 - h0)
+
+            self._edges_view = (
+                index,
+                self._to_window(hc0), self._to_window(hc1),
+                c0, c1, hc0[:, 3], hc1[:, 3])
+
+        return self._edges_view
+
+
+    def _get_edges_grid(self, cell):
+        """
+        Bins the clipped edges by their window bounds into cells of `cell`
+        pixels, as `(cell, grid_x, grid_y, offsets, indices, long_edges)`.
+        The grid has a margin of one cell around the region.
+        """
+        if self._edges_grid is not None and self._edges_grid[0] == cell:
+            return self._edges_grid
+
+        index, a0, a1 = self._get_edges_view()[:3]
+        grid_x = int(self.winsize[0] // cell) + 3
+        grid_y = int(self.winsize[1] // cell) + 3
+
+        bmin = np.floor(np.minimum(a0, a1) / cell).astype('i8') + 1
+        bmax = np.floor(np.maximum(a0, a1) / cell).astype('i8') + 1
+        inside = ((bmax[:, 0] >= 0) & (bmin[:, 0] < grid_x) &
+                  (bmax[:, 1] >= 0) & (bmin[:, 1] < grid_y))
+        bmin[:, 0].clip(0, grid_x - 1, out=bmin[:, 0])
+        bmin[:, 1].clip(0, grid_y - 1, out=bmin[:, 1])
+        bmax[:, 0].clip(0, grid_x - 1, out=bmax[:, 0])
+        bmax[:, 1].clip(0, grid_y - 1, out=bmax[:, 1])
+
+        span_x = bmax[:, 0] - bmin[:, 0] + 1
+        span = span_x * (bmax[:, 1] - bmin[:, 1] + 1)
+        is_long = inside & (span > _GRID_MAX_SPAN)
+        binned = np.nonzero(inside & ~is_long)[0]
+
+        span = span[binned]
+        span_x = span_x[binned]
+        start = np.cumsum(span) - span
+        k = np.arange(int(span.sum())) - np.repeat(start, span)
+        cells = ((np.repeat(bmin[binned, 1], span) + k // np.repeat(span_x, span)) * grid_x +
+                 np.repeat(bmin[binned, 0], span) + k % np.repeat(span_x, span))
+
+        order = np.argsort(cells, kind='mergesort')
+        indices = np.repeat(binned, span)[order]
+        offsets = np.zeros(grid_x * grid_y + 1, 'i8')
+        np.cumsum(np.bincount(cells, minlength=grid_x * grid_y), out=offsets[1:])
+
+        self._edges_grid = (cell, grid_x, grid_y, offsets, indices, np.nonzero(is_long)[0])
+        return self._edges_grid
+
+
+    def find_edges(self, mval, dist_px):
+        """
+        Edges closer than `dist_px` to `mval` in the region.
+        Returns a list of `(dist_sq, edge_index, local_co)` where `local_co`
+        is the nearest point of the edge under `mval`, in object space.
+        """
+        if not self.draw_edges or self._proj_co is None:
+            return []
+
+        cell = max(2 * dist_px, 16)
+        cell, grid_x, grid_y, offsets, indices, long_edges = self._get_edges_grid(cell)
+
+        x0, y0 = (int((v - dist_px) // cell) + 1 for v in mval)
+        x1, y1 = (int((v + dist_px) // cell) + 1 for v in mval)
+        candidates = [long_edges]
+        for y in range(max(y0, 0), min(y1, grid_y - 1) + 1):
+            for x in range(max(x0, 0), min(x1, grid_x - 1) + 1):
+                i = y * grid_x + x
+                candidates.append(indices[offsets[i]:offsets[i + 1]])
+        candidates = np.unique(np.concatenate(candidates))
+        if not len(candidates):
+            return []
+
+        index, a0, a1, c0, c1, wc0, wc1 = (arr[candidates] for arr in self._get_edges_view())
+        m = np.array(mval[:2], 'f8')
+        d = a1 - a0
+        len_sq = (d * d).sum(1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = np.where(len_sq > 0.0, ((m - a0) * d).sum(1) / len_sq, 0.0)
+        s.clip(0.0, 1.0, out=s)
+        dist_sq = ((a0 + s[:, None] * d - m) ** 2).sum(1)
+
+        near = np.nonzero(dist_sq < dist_px * dist_px)[0]
+        if not len(near):
+            return []
+
+        s = s[near]
+        # Window factor to edge factor (perspective correct).
+        t = s * wc0[near] / ((1.0 - s) * wc1[near] + s * wc0[near])
+        t = c0[near] + t * (c1[near] - c0[near])
+
+        edges = self.edge_verts[index[near]]
+        v0 = self.verts_co[edges[:, 0]]
+        v1 = self.verts_co[edges[:, 1]]
+        local_co = v0 + t[:, None] * (v1 - v0)
+
+        return [(dist, i, Vector(co)) for dist, i, co in
+                zip(dist_sq[near].tolist(), index[near].tolist(), local_co.tolist())]
+
+
+    def find_tris(self, mval, dist_px):
+        """
+        Triangles closer than `dist_px` to `mval` in the region.
+        Returns a list of `(dist_sq, tri_index, win_co)` where `win_co` is
+        a point of the triangle nearest to `mval` in window coordinates,
+        moved half a pixel inside so a ray through it hits the triangle.
+        Triangles crossing the view plane are left out.
+        """
+        if not self.draw_tris or self._proj_co is None:
+            return []
+
+        index, a, b, c, bmin, bmax = self._get_tris_view()
+        m = np.array(mval[:2], 'f8')
+        near = np.nonzero(((bmin <= m + dist_px) & (bmax >= m - dist_px)).all(1))[0]
+        if not len(near):
+            return []
+
+        index, a, b, c = index[near], a[near], b[near], c[near]
+
+        # Nearest point on the edges, `mval` itself when it is inside.
+        co = None
+        for v0, v1 in ((a, b), (b, c), (c, a)):
+            d = v1 - v0
+            len_sq = (d * d).sum(1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                s = np.where(len_sq > 0.0, ((m - v0) * d).sum(1) / len_sq, 0.0)
+            s.clip(0.0, 1.0, out=s)
+            edge_co = v0 + s[:, None] * d
+            edge_dist_sq = ((edge_co - m) ** 2).sum(1)
+            if co is None:
+                co, dist_sq = edge_co, edge_dist_sq
+            else:
+                closer = edge_dist_sq < dist_sq
+                co[closer] = edge_co[closer]
+                dist_sq[closer] = edge_dist_sq[closer]
+
+        def cross(u, v, w):
+            return (v[:, 0] - u[:, 0]) * (w[:, 1] - u[:, 1]) - (v[:, 1] - u[:, 1]) * (w[:, 0] - u[:, 0])
+
+        mm = np.broadcast_to(m, a.shape)
+        area = cross(a, b, c)
+        s0 = cross(a, b, mm) * area
+        s1 = cross(b, c, mm) * area
+        s2 = cross(c, a, mm) * area
+        inside = (s0 >= 0.0) & (s1 >= 0.0) & (s2 >= 0.0) & (area != 0.0)
+        co[inside] = m
+        dist_sq[inside] = 0.0
+
+        near = np.nonzero(dist_sq < dist_px * dist_px)[0]
+        if not len(near):
+            return []
+
+        co = co[near]
+        center = (a[near] + b[near] + c[near]) / 3.0
+        to_center = center - co
+        length = np.sqrt((to_center * to_center).sum(1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fac = np.where(length > 0.5, 0.5 / length, 1.0)
+        fac[dist_sq[near] == 0.0] = 0.0
+        co += to_center * fac[:, None]
+
+        return list(zip(dist_sq[near].tolist(), index[near].tolist(), co.tolist()))
+
+
+    def find_looseverts(self, mval, dist_px):
+        """
+        Loose vertices closer than `dist_px` to `mval` in the region.
+        Returns a list of `(dist_sq, loosevert_index, local_co)`.
+        """
+        if not self.draw_verts or self._proj_co is None:
+            return []
+
+        if self._looseverts_kdtree is None:
+            proj_co = self._proj_co[self.looseverts]
+            index = np.nonzero(proj_co[:, 3] > _W_MIN)[0]
+            win_co = self._to_window(proj_co[index])
+
+            kd = KDTree(len(index))
+            for i, co in zip(index.tolist(), win_co.tolist()):
+                kd.insert((co[0], co[1], 0.0), i)
+            kd.balance()
+            self._looseverts_kdtree = kd
+
+        dist_sq = dist_px * dist_px
+        return [(dist * dist, i, Vector(self.verts_co[self.looseverts[i]]))
+                for co, i, dist in self._looseverts_kdtree.find_range((mval[0], mval[1], 0.0), dist_px)
+                if dist * dist < dist_sq]
+
+
+    def ray_cast(self, ray_orig_local, ray_dir_local):
+        """Nearest triangle hit as `(local_co, tri_index)` or `(None, None)`."""
+        if not self.draw_tris:
+            return None, None
+        co, normal, index, dist = self.bvhtree.ray_cast(ray_orig_local, ray_dir_local)
+        return co, index
+
+
+    def get_tri_co(self, index):
+        return self.verts_co[self.tri_verts[index]]
+
+
+    def get_edge_co(self, index):
+        return self.verts_co[self.edge_verts[index]]
+
+
+    def get_loosevert_co(self, index):
+        return self.verts_co[self.looseverts[index]]
+
+
+    def get_tri_verts(self, index):
+        return self.tri_verts[index]
+
+
+    def get_edge_verts(self, index):
+        return self.edge_verts[index]
+
+
+    def get_loosevert_index(self, index):
+        return self.looseverts[index]
+
+
+    def __del__(self):
+        del self.bvhtree
+        del self.tri_verts, self.edge_verts, self.looseverts
+        del self.verts_co
@@ -23,6 +23,11 @@
 import bmesh
 import array
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 def bmesh_copy_from_object(obj, transform=True, triangulate=True, apply_modifiers=False):
     """
@@ -101,19 +106,47 @@ def bmesh_check_self_intersect_object(obj):
 
     returns an array of edge index values.
     """
-    import bpy
+    analysis = MeshAnalysis(obj)
+    try:
+        return analysis.faces_intersect()
+    finally:
+        analysis.free()
 
-    if not obj.data.polygons:
-        return array.array('i', ())
 
-    bm = bmesh_copy_from_object(obj, transform=False, triangulate=False)
-
-    import mathutils
-    tree = mathutils.bvhtree.BVHTree.FromBMesh(bm, epsilon=0.00001)
+def mesh_data_hash(obj):
+    """
+    Hash of the object's geometry (vertex locations, edges, faces)
+    and world matrix, used to tell if check results are still valid.
+    """
+    import hashlib
 
-    overlap = tree.overlap(tree)
-    faces_error = {i for i_pair in overlap for i in i_pair}
-    return array.array('i', faces_error)
+    me = obj.data
+    digest = hashlib.md5()
+    if obj.mode == 'EDIT':
+        bm = bmesh.from_edit_mesh(me)
+        digest.update(array.array(
+            'f', [c for v in bm.verts for c in v.co]).tobytes())
+        bm.verts.index_update()
+        digest.update(array.array(
+            'i', [v.index for e in bm.edges for v in e.verts]).tobytes())
+        for f in bm.faces:
+            digest.update(array.array(
+                'i', [v.index for v in f.verts]).tobytes())
+            digest.update(b'|')
+    else:
+        co = array.array('f', bytes(len(me.vertices) * 3 * 4))
+        me.vertices.foreach_get("co", co)
+        edges = array.array('i', bytes(len(me.edges) * 2 * 4))
+        me.edges.foreach_get("vertices", edges)
+        loop_total = array.array('i', bytes(len(me.polygons) * 4))
+        me.polygons.foreach_get("loop_total", loop_total)
+        loops = array.array('i', bytes(len(me.loops) * 4))
+        me.loops.foreach_get("vertex_index", loops)
+        for data in (co, edges, loop_total, loops):
+            digest.update(data.tobytes())
+    digest.update(array.array(
+        'f', [c for row in obj.matrix_world for c in row]).tobytes())
+    return digest.hexdigest()
 
 
 def bmesh_face_points_random(f, num_points=1, margin=0.05):
@@ -142,76 +175,251 @@ def bmesh_face_points_random(f, num_points=1, margin=0.05):
 
 
 def bmesh_check_thick_object(obj, thickness):
+    """
+    Check for faces closer than ``thickness`` to the geometry behind them.
 
-    import bpy
-
-    # Triangulate
-    bm = bmesh_copy_from_object(obj, transform=True, triangulate=False)
-    # map original faces to their index.
-    face_index_map_org = {f: i for i, f in enumerate(bm.faces)}
-    ret = bmesh.ops.triangulate(bm, faces=bm.faces)
-    face_map = ret["face_map"]
-    del ret
-    # old edge -> new mapping
-
-    # Convert new/old map to index dict.
-
-    # Create a real mesh (lame!)
-    context = bpy.context
-    scene = context.scene
-    me_tmp = bpy.data.meshes.new(name="~temp~")
-    bm.to_mesh(me_tmp)
-    # bm.free()  # delay free
-    obj_tmp = bpy.data.objects.new(name=me_tmp.name, object_data=me_tmp)
-    base = scene.objects.link(obj_tmp)
-
-    # Add new object to local view layer
-    v3d = None
-    if context.space_data and context.space_data.type == 'VIEW_3D':
-        v3d = context.space_data
-
-    if v3d and v3d.local_view:
-        base.layers_from_view(context.space_data)
+    returns an array of face index values.
+    """
+    analysis = MeshAnalysis(obj)
+    try:
+        return analysis.faces_thick(thickness)
+    finally:
+        analysis.free()
 
-    scene.update()
-    ray_cast = obj_tmp.ray_cast
 
-    EPS_BIAS = 0.0001
+class MeshAnalysis:
+    """
+    Transformed copy of an object's mesh, shared by the checks of one run.
 
-    faces_error = set()
+    The copy, its triangulation and BVH tree are created the first time a
+    check needs them, no data is added to the scene.
+    """
 
-    bm_faces_new = bm.faces[:]
+    # number of triangles sampled at once by faces_thick
+    CHUNK_FACES = 1 << 16
+
+    def __init__(self, obj, apply_modifiers=False):
+        self.obj = obj
+        self.apply_modifiers = apply_modifiers
+        self._bm = None
+        self._bm_local = None
+        self._bm_tri = None
+        self._tri_face = None
+        self._tree = None
+
+    def free(self):
+        for bm in (self._bm, self._bm_local, self._bm_tri):
+            if bm is not None:
+                bm.free()
+        self._bm = self._bm_local = self._bm_tri = None
+        self._tri_face = self._tree = None
+
+    @property
+    def bm_local(self):
+        """
+        Copy in object space (not transformed or triangulated).
+        """
+        if self._bm_local is None:
+            self._bm_local = bmesh_copy_from_object(
+                self.obj, transform=False, triangulate=False,
+                apply_modifiers=self.apply_modifiers)
+        return self._bm_local
+
+    @property
+    def bm(self):
+        """
+        Transformed (not triangulated) copy with updated normals.
+        """
+        if self._bm is None:
+            self._bm = bmesh_copy_from_object(
+                self.obj, transform=True, triangulate=False,
+                apply_modifiers=self.apply_modifiers)
+            self._bm.normal_update()
+        return self._bm
+
+    def _triangulate(self):
+        from mathutils.bvhtree import BVHTree
+
+        bm = self.bm.copy()
+        # map original faces to their index.
+        face_index_map_org = {f: i for i, f in enumerate(bm.faces)}
+        face_map = bmesh.ops.triangulate(bm, faces=bm.faces)["face_map"]
+        bm.faces.index_update()
+        bm.normal_update()
+
+        # if the face wasn't triangulated, just use existing
+        self._tri_face = array.array(
+            'i', (face_index_map_org[face_map.get(f, f)] for f in bm.faces))
+        self._tree = BVHTree.FromBMesh(bm)
+        self._bm_tri = bm
+
+    @property
+    def bm_tri(self):
+        """
+        Triangulated copy, ``tri_face`` maps its faces to ``bm`` faces.
+        """
+        if self._bm_tri is None:
+            self._triangulate()
+        return self._bm_tri
+
+    @property
+    def tri_face(self):
+        if self._bm_tri is None:
+            self._triangulate()
+        return self._tri_face
+
+    @property
+    def tree(self):
+        """
+        BVH tree of the triangulated copy.
+        """
+        if self._bm_tri is None:
+            self._triangulate()
+        return self._tree
+
+    def faces_intersect(self):
+        """
+        Faces intersecting other faces of the mesh.
+
+        returns an array of face index values.
+        """
+        import mathutils
+
+        bm = self.bm_local
+        if not bm.faces:
+            return array.array('i', ())
+
+        tree = mathutils.bvhtree.BVHTree.FromBMesh(bm, epsilon=0.00001)
+
+        overlap = tree.overlap(tree)
+        faces_error = {i for i_pair in overlap for i in i_pair}
+        return array.array('i', faces_error)
+
+    def _thick_rays(self, faces, thickness, num_points=6):
+        """
+        Yield ``(face, origin, direction, distance)`` for the rays cast
+        backwards from random points on the triangles ``faces``.
+        """
+        EPS_BIAS = 0.0001
+
+        if numpy is None:
+            for f in faces:
+                no = f.normal
+                no_sta = no * EPS_BIAS
+                no_end = no * thickness
+                for p in bmesh_face_points_random(f, num_points=num_points):
+                    p_a = p - no_sta
+                    p_dir = (p - no_end) - p_a
+                    yield f.index, p_a, p_dir, p_dir.length
+            return
+
+        from mathutils import Vector
+
+        # for predictable results
+        rng = numpy.random.RandomState(0)
+        margin = 0.05
+        for i in range(0, len(faces), self.CHUNK_FACES):
+            chunk = faces[i:i + self.CHUNK_FACES]
+            co = numpy.array([v.co[:] for f in chunk for v in f.verts])
+            co.shape = (len(chunk), 3, 3)
+            no = numpy.array([f.normal[:] for f in chunk])
+
+            u = rng.uniform(margin, 1.0 - margin,
+                            (len(chunk), num_points, 2))
+            flip = u.sum(axis=2) > 1.0
+            u[flip] = 1.0 - u[flip]
+            side1 = co[:, 1] - co[:, 0]
+            side2 = co[:, 2] - co[:, 0]
+            points = (co[:, None, 0] +
+                      u[..., 0, None] * side1[:, None] +
+                      u[..., 1, None] * side2[:, None])
 
-    for f in bm_faces_new:
-        no = f.normal
-        no_sta = no * EPS_BIAS
-        no_end = no * thickness
-        for p in bmesh_face_points_random(f, num_points=6):
             # Cast the ray backwards
-            p_a = p - no_sta
-            p_b = p - no_end
-            p_dir = p_b - p_a
-
-            ok, co, no, index = ray_cast(p_a, p_dir, p_dir.length)
-
-            if ok:
+            origins = points - (no * EPS_BIAS)[:, None]
+            dirs = numpy.repeat(no * (EPS_BIAS - thickness), num_points,
+                                axis=0)
+            lengths = numpy.sqrt((dirs ** 2).sum(axis=1))
+            origins.shape = (-1, 3)
+
+            face_index = numpy.repeat(
+                numpy.arange(i, i + len(chunk)), num_points)
+            for f_index, p_a, p_dir, length in zip(
+                    face_index.tolist(), origins.tolist(), dirs.tolist(),
+                    lengths.tolist()):
+                yield f_index, Vector(p_a), Vector(p_dir), length
+
+    def faces_thick(self, thickness):
+        """
+        Faces closer than ``thickness`` to the geometry behind them
+        (relies on correct normals).
+
+        returns an array of face index values.
+        """
+        bm_tri = self.bm_tri
+        tri_face = self.tri_face
+        ray_cast = self.tree.ray_cast
+
+        faces_error = set()
+        for f_index, p_a, p_dir, length in self._thick_rays(
+                bm_tri.faces[:], thickness):
+            co, no, index, dist = ray_cast(p_a, p_dir, length)
+            if index is not None:
                 # Add the face we hit
-                for f_iter in (f, bm_faces_new[index]):
-                    # if the face wasn't triangulated, just use existing
-                    f_org = face_map.get(f_iter, f_iter)
-                    f_org_index = face_index_map_org[f_org]
-                    faces_error.add(f_org_index)
-
-    # finished with bm
-    bm.free()
-
-    scene.objects.unlink(obj_tmp)
-    bpy.data.objects.remove(obj_tmp)
-    bpy.data.meshes.remove(me_tmp)
-
-    scene.update()
-
-    return array.array('i', faces_error)
+                faces_error.add(tri_face[f_index])
+                faces_error.add(tri_face[index])
+
+        return array.array('i', sorted(faces_error))
+
+    def faces_overhang(self, angle_overhang):
+        """
+        Faces pointing down, less than ``angle_overhang`` from -Z.
+        """
+        faces = self.bm.faces
+        if numpy is None:
+            from mathutils import Vector
+            z_down_angle = Vector((0, 0, -1.0)).angle
+            # 4.0 ignores zero area faces
+            return array.array('i', (
+                i for i, ele in enumerate(faces)
+                if z_down_angle(ele.normal, 4.0) < angle_overhang))
+
+        no = numpy.array([f.normal[:] for f in faces]).reshape(-1, 3)
+        length = numpy.sqrt((no ** 2).sum(axis=1))
+        # zero area faces are ignored
+        valid = length != 0.0
+        angle = numpy.arccos(numpy.clip(
+            -no[valid, 2] / length[valid], -1.0, 1.0))
+        index = numpy.flatnonzero(valid)[angle < angle_overhang]
+        return array.array('i', index.tolist())
+
+    def edges_sharp(self, angle_sharp):
+        """
+        Manifold edges with a face angle above ``angle_sharp``.
+        """
+        return array.array('i', (
+            i for i, ele in enumerate(self.bm.edges)
+            if ele.is_manifold and
+            ele.calc_face_angle_signed() > angle_sharp))
+
+    def faces_distorted(self, angle_distort):
+        """
+        Faces with a corner normal deviating more than ``angle_distort``
+        from the face normal.
+        """
+        def face_is_distorted(ele):
+            no = ele.normal
+            angle_fn = no.angle
+            for loop in ele.loops:
+                loopno = loop.calc_normal()
+                if loopno.dot(no) < 0.0:
+                    loopno.negate()
+                if angle_fn(loopno, 1000.0) > angle_distort:
+                    return True
+            return False
+
+        return array.array('i', (
+            i for i, ele in enumerate(self.bm.faces)
+            if face_is_distorted(ele)))
 
 
 def object_merge(context, objects):
@@ -105,12 +105,63 @@ class MESH_OT_Print3D_Info_Area(Operator):
 # ---------------
 # Geometry Checks
 
+class CheckSession:
+    """
+    Results of the geometry checks, re-used by later runs while the mesh
+    and the settings a check depends on stay the same.
+    """
+
+    def __init__(self):
+        # bl_idname -> (key, info, seconds)
+        self.results = {}
+
+    def run(self, obj, check_cls, print_3d):
+        import time
+
+        data_hash = mesh_helpers.mesh_data_hash(obj)
+        # mesh copies, triangulation and BVH are shared by all checks
+        # and only created if a check has to run
+        analysis = mesh_helpers.MeshAnalysis(obj)
+
+        info = []
+        timings = []
+        try:
+            for cls in check_cls:
+                key = (obj.name, data_hash,
+                       tuple(getattr(print_3d, attr)
+                             for attr in cls.check_settings))
+                result = self.results.get(cls.bl_idname)
+                cached = result is not None and result[0] == key
+                if cached:
+                    check_info, seconds = result[1], result[2]
+                else:
+                    check_info = []
+                    time_start = time.time()
+                    cls.main_check(obj, check_info, analysis)
+                    seconds = time.time() - time_start
+                    self.results[cls.bl_idname] = (key, check_info, seconds)
+
+                count = sum(len(data[1]) for text, data in check_info if data)
+                label = cls.bl_label.replace("Print3D Check ", "")
+                info.extend(check_info)
+                timings.append((label, count, seconds, cached))
+        finally:
+            analysis.free()
+
+        report.update(*info)
+        report.update_timings(*timings)
+
+    def clear(self):
+        self.results.clear()
+
+
+check_session = CheckSession()
+
+
 def execute_check(self, context):
     obj = context.active_object
 
-    info = []
-    self.main_check(obj, info)
-    report.update(*info)
+    check_session.run(obj, (self.__class__,), context.scene.print_3d)
 
     multiple_obj_warning(self, context)
 
@@ -127,11 +178,13 @@ class MESH_OT_Print3D_Check_Solid(Operator):
     bl_idname = "mesh.print3d_check_solid"
     bl_label = "Print3D Check Solid"
 
+    check_settings = ()
+
     @staticmethod
-    def main_check(obj, info):
+    def main_check(obj, info, analysis):
         import array
 
-        bm = mesh_helpers.bmesh_copy_from_object(obj, transform=False, triangulate=False)
+        bm = analysis.bm_local
 
         edges_non_manifold = array.array('i', (i for i, ele in enumerate(bm.edges)
                 if not ele.is_manifold))
@@ -144,8 +197,6 @@ class MESH_OT_Print3D_Check_Solid(Operator):
         info.append(("Bad Contig. Edges: %d" % len(edges_non_contig),
                     (bmesh.types.BMEdge, edges_non_contig)))
 
-        bm.free()
-
     def execute(self, context):
         return execute_check(self, context)
 
@@ -155,9 +206,11 @@ class MESH_OT_Print3D_Check_Intersections(Operator):
     bl_idname = "mesh.print3d_check_intersect"
     bl_label = "Print3D Check Intersections"
 
+    check_settings = ()
+
     @staticmethod
-    def main_check(obj, info):
-        faces_intersect = mesh_helpers.bmesh_check_self_intersect_object(obj)
+    def main_check(obj, info, analysis):
+        faces_intersect = analysis.faces_intersect()
         info.append(("Intersect Face: %d" % len(faces_intersect),
                     (bmesh.types.BMFace, faces_intersect)))
 
@@ -171,14 +224,16 @@ class MESH_OT_Print3D_Check_Degenerate(Operator):
     bl_idname = "mesh.print3d_check_degenerate"
     bl_label = "Print3D Check Degenerate"
 
+    check_settings = ("threshold_zero",)
+
     @staticmethod
-    def main_check(obj, info):
+    def main_check(obj, info, analysis):
         import array
         scene = bpy.context.scene
         print_3d = scene.print_3d
         threshold = print_3d.threshold_zero
 
-        bm = mesh_helpers.bmesh_copy_from_object(obj, transform=False, triangulate=False)
+        bm = analysis.bm_local
 
         faces_zero = array.array('i', (i for i, ele in enumerate(bm.faces) if ele.calc_area() <= threshold))
         edges_zero = array.array('i', (i for i, ele in enumerate(bm.edges) if ele.calc_length() <= threshold))
@@ -189,8 +244,6 @@ class MESH_OT_Print3D_Check_Degenerate(Operator):
         info.append(("Zero Edges: %d" % len(edges_zero),
                     (bmesh.types.BMEdge, edges_zero)))
 
-        bm.free()
-
     def execute(self, context):
         return execute_check(self, context)
 
@@ -200,35 +253,19 @@ class MESH_OT_Print3D_Check_Distorted(Operator):
     bl_idname = "mesh.print3d_check_distort"
     bl_label = "Print3D Check Distorted Faces"
 
-    @staticmethod
-    def main_check(obj, info):
-        import array
+    check_settings = ("angle_distort",)
 
+    @staticmethod
+    def main_check(obj, info, analysis):
         scene = bpy.context.scene
         print_3d = scene.print_3d
         angle_distort = print_3d.angle_distort
 
-        def face_is_distorted(ele):
-            no = ele.normal
-            angle_fn = no.angle
-            for loop in ele.loops:
-                loopno = loop.calc_normal()
-                if loopno.dot(no) < 0.0:
-                    loopno.negate()
-                if angle_fn(loopno, 1000.0) > angle_distort:
-                    return True
-            return False
-
-        bm = mesh_helpers.bmesh_copy_from_object(obj, transform=True, triangulate=False)
-        bm.normal_update()
-
-        faces_distort = array.array('i', (i for i, ele in enumerate(bm.faces) if face_is_distorted(ele)))
+        faces_distort = analysis.faces_distorted(angle_distort)
 
         info.append(("Non-Flat Faces: %d" % len(faces_distort),
                     (bmesh.types.BMFace, faces_distort)))
 
-        bm.free()
-
     def execute(self, context):
         return execute_check(self, context)
 
@@ -239,12 +276,14 @@ class MESH_OT_Print3D_Check_Thick(Operator):
     bl_idname = "mesh.print3d_check_thick"
     bl_label = "Print3D Check Thickness"
 
+    check_settings = ("thickness_min",)
+
     @staticmethod
-    def main_check(obj, info):
+    def main_check(obj, info, analysis):
         scene = bpy.context.scene
         print_3d = scene.print_3d
 
-        faces_error = mesh_helpers.bmesh_check_thick_object(obj, print_3d.thickness_min)
+        faces_error = analysis.faces_thick(print_3d.thickness_min)
 
         info.append(("Thin Faces: %d" % len(faces_error),
                     (bmesh.types.BMFace, faces_error)))
@@ -258,21 +297,18 @@ class MESH_OT_Print3D_Check_Sharp(Operator):
     bl_idname = "mesh.print3d_check_sharp"
     bl_label = "Print3D Check Sharp"
 
+    check_settings = ("angle_sharp",)
+
     @staticmethod
-    def main_check(obj, info):
+    def main_check(obj, info, analysis):
         scene = bpy.context.scene
         print_3d = scene.print_3d
         angle_sharp = print_3d.angle_sharp
 
-        bm = mesh_helpers.bmesh_copy_from_object(obj, transform=True, triangulate=False)
-        bm.normal_update()
-
-        edges_sharp = [ele.index for ele in bm.edges
-                       if ele.is_manifold and ele.calc_face_angle_signed() > angle_sharp]
+        edges_sharp = analysis.edges_sharp(angle_sharp)
 
         info.append(("Sharp Edge: %d" % len(edges_sharp),
                     (bmesh.types.BMEdge, edges_sharp)))
-        bm.free()
 
     def execute(self, context):
         return execute_check(self, context)
@@ -283,10 +319,11 @@ class MESH_OT_Print3D_Check_Overhang(Operator):
     bl_idname = "mesh.print3d_check_overhang"
     bl_label = "Print3D Check Overhang"
 
+    check_settings = ("angle_overhang",)
+
     @staticmethod
-    def main_check(obj, info):
+    def main_check(obj, info, analysis):
         import math
-        from mathutils import Vector
 
         scene = bpy.context.scene
         print_3d = scene.print_3d
@@ -296,19 +333,10 @@ class MESH_OT_Print3D_Check_Overhang(Operator):
             info.append(("Skipping Overhang", ()))
             return
 
-        bm = mesh_helpers.bmesh_copy_from_object(obj, transform=True, triangulate=False)
-        bm.normal_update()
-
-        z_down = Vector((0, 0, -1.0))
-        z_down_angle = z_down.angle
-
-        # 4.0 ignores zero area faces
-        faces_overhang = [ele.index for ele in bm.faces
-                          if z_down_angle(ele.normal, 4.0) < angle_overhang]
+        faces_overhang = analysis.faces_overhang(angle_overhang)
 
         info.append(("Overhang Face: %d" % len(faces_overhang),
                     (bmesh.types.BMFace, faces_overhang)))
-        bm.free()
 
     def execute(self, context):
         return execute_check(self, context)
@@ -332,11 +360,7 @@ class MESH_OT_Print3D_Check_All(Operator):
     def execute(self, context):
         obj = context.active_object
 
-        info = []
-        for cls in self.check_cls:
-            cls.main_check(obj, info)
-
-        report.update(*info)
+        check_session.run(obj, self.check_cls, context.scene.print_3d)
 
         multiple_obj_warning(self, context)
 
@@ -22,11 +22,22 @@
 
 
 _data = []
+_timings = []
 
 
 def update(*args):
     _data[:] = args
+    _timings[:] = ()
+
+
+def update_timings(*args):
+    # (label, count, seconds, cached) for each check of the last run
+    _timings[:] = args
 
 
 def info():
     return tuple(_data)
+
+
+def timings():
+    return tuple(_timings)
@@ -63,6 +63,19 @@ class Print3D_ToolBar:
                 else:
                     col.label(text)
 
+        timings = report.timings()
+        if timings:
+            layout.label("Timings:")
+            box = layout.box()
+            col = box.column(align=True)
+            for label, count, seconds, cached in timings:
+                row = col.row()
+                row.label("%s: %d" % (label, count))
+                if cached:
+                    row.label("cached")
+                else:
+                    row.label("%.3f s" % seconds)
+
 
     def draw(self, context):
         layout = self.layout
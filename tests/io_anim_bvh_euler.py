@@ -0,0 +1,73 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Compare the bulk matrix to euler conversion of the BVH importer
+# with Matrix.to_euler(order, prev_euler), frame by frame:
+#
+#   blender -b --factory-startup --python tests/io_anim_bvh_euler.py
+
+import os
+import sys
+
+import numpy
+from mathutils import Euler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from io_anim_bvh.import_bvh import _matrix_to_euler_array
+
+
+def sweep(order, frames=720):
+    """
+    Rotations passing the middle axis of the order through +-90 degrees
+    (close to, but not exactly at gimbal lock).
+    """
+    t = numpy.linspace(-numpy.pi, numpy.pi, frames)
+    eul = numpy.empty((frames, 3))
+    eul[:, 0] = 0.4 * t
+    eul[:, 1] = 0.7 * numpy.sin(2.0 * t)
+    eul[:, 2] = -0.3 * t
+    eul[:, 'XYZ'.index(order[1])] = t
+    return [Euler(e, order).to_matrix() for e in eul]
+
+
+def check(order):
+    matrices = sweep(order)
+
+    result = _matrix_to_euler_array(numpy.array(matrices), order)
+
+    prev_euler = Euler((0.0, 0.0, 0.0))
+    expected = []
+    for mat in matrices:
+        prev_euler = mat.to_euler(order, prev_euler)
+        expected.append(prev_euler)
+
+    error = numpy.abs(result - numpy.array(expected)).max()
+    print("%s: max difference %.3g" % (order, error))
+    assert error < 1e-4, order
+
+
+def main():
+    for order in ('XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX'):
+        check(order)
+
+
+if __name__ == "__main__":
+    main()
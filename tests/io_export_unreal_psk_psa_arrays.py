@@ -0,0 +1,231 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Compare the numpy path of the PSK/PSA export (parse_mesh_arrays,
+# unique_rows, sample_action_keys) with the struct object path
+# (parse_mesh_objects, ObjMap, the frame loop of parse_animation)
+# on a small mesh with materials, UVs and a vertex group and on an
+# action of a three bone armature:
+#
+#   blender -b --factory-startup --python tests/io_export_unreal_psk_psa_arrays.py
+
+import os
+import random
+import sys
+
+import bmesh
+import bpy
+from mathutils import Quaternion, Vector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io_export_unreal_psk_psa as psk
+
+numpy = psk.numpy
+
+
+def check_unique_rows(seed, count=500):
+    rng = random.Random(seed)
+    rows = [(rng.randrange(8), rng.randrange(3), rng.random() < 0.5) for _ in range(count)]
+
+    objmap = psk.ObjMap()
+    reference = [objmap.get(row) for row in rows]
+    reference_first = [reference.index(i) for i in range(objmap.next)]
+
+    index, first = psk.unique_rows(*(numpy.array(column) for column in zip(*rows)))
+    assert index.tolist() == reference, "unique_rows numbering differs from ObjMap"
+    assert first.tolist() == reference_first, "unique_rows first rows differ"
+
+
+def mesh_object(seed, size=6):
+    rng = random.Random(seed)
+
+    bm = bmesh.new()
+    bmesh.ops.create_grid(bm, x_segments=size, y_segments=size, size=1.0)
+    bmesh.ops.triangulate(bm, faces=bm.faces)
+    uv_layer = bm.loops.layers.uv.new()
+    deform_layer = bm.verts.layers.deform.new()
+    for face in bm.faces:
+        face.material_index = rng.randrange(2)
+        face.smooth = rng.random() > 0.5
+        for loop in face.loops:
+            # shared corners with equal UVs become one wedge
+            co = loop.vert.co
+            loop[uv_layer].uv = (co.x * 0.5 + 0.5, co.y * 0.5 + 0.5)
+    for edge in bm.edges:
+        edge.smooth = rng.random() > 0.2
+    for vert in bm.verts:
+        if rng.random() < 0.5:
+            vert[deform_layer][0] = rng.random()
+
+    me = bpy.data.meshes.new("psk_arrays_%d" % seed)
+    bm.to_mesh(me)
+    bm.free()
+    me.update(calc_tessface=True)
+
+    ob = bpy.data.objects.new(me.name, me)
+    bpy.context.scene.objects.link(ob)
+    ob.vertex_groups.new("group")
+    for i in range(2):
+        ob.data.materials.append(bpy.data.materials.new("%s_mat_%d" % (me.name, i)))
+    return ob
+
+
+def mesh_sections(ob):
+    psk.MaterialName[:] = [slot.name for slot in ob.material_slots]
+    data = psk.PSKFile()
+    if psk.numpy is not None:
+        psk.parse_mesh_arrays(ob, data)
+        points = [tuple(p) for p in numpy.concatenate(data.Points.Arrays)['Point'].tolist()]
+        wedges = numpy.concatenate(data.Wedges.Arrays)
+        wedges = list(zip(wedges['PointIndex'].tolist(), wedges['U'].tolist(),
+                          wedges['V'].tolist(), wedges['MatIndex'].tolist()))
+        faces = numpy.concatenate(data.Faces.Arrays)
+        faces = list(zip(*(faces['WedgeIndex'][:, i].tolist() for i in range(3)),
+                         faces['MatIndex'].tolist(), faces['SmoothingGroups'].tolist()))
+        groups = {name: list(zip(group['PointIndex'].tolist(), group['Weight'].tolist()))
+                  for name, group in data.VertexGroups.items()}
+    else:
+        psk.parse_mesh_objects(ob, data)
+        f4 = numpy.float32
+        points = [tuple(f4(v).item() for v in (p.Point.X, p.Point.Y, p.Point.Z))
+                  for p in data.Points.Data]
+        wedges = [(w.PointIndex, f4(w.U).item(), f4(w.V).item(), w.MatIndex)
+                  for w in data.Wedges.Data]
+        faces = [(f.WedgeIndex0, f.WedgeIndex1, f.WedgeIndex2, f.MatIndex, f.SmoothingGroups)
+                 for f in data.Faces.Data]
+        groups = {name: [(i, f4(w).item()) for i, w in group]
+                  for name, group in data.VertexGroups.items()}
+    return points, wedges, faces, groups
+
+
+def check_mesh(seed, use_smoothing_groups):
+    scene = bpy.context.scene
+    scene.udk_option_smoothing_groups = use_smoothing_groups
+    ob = mesh_object(seed)
+
+    psk.numpy = None
+    reference = mesh_sections(ob)
+    psk.numpy = numpy
+    result = mesh_sections(ob)
+
+    for name, a, b in zip(("points", "wedges", "faces", "vertex groups"), reference, result):
+        assert a == b, "%s differ" % name
+
+    points, wedges, faces, _groups = result
+    print("mesh seed %d, smoothing groups %r: %d points, %d wedges, %d faces, OK" %
+          (seed, use_smoothing_groups, len(points), len(wedges), len(faces)))
+
+    me = ob.data
+    bpy.data.objects.remove(ob, do_unlink=True)
+    bpy.data.meshes.remove(me, do_unlink=True)
+
+
+def armature_object(seed, frames=12):
+    rng = random.Random(seed)
+    scene = bpy.context.scene
+
+    arm = bpy.data.armatures.new("psk_arrays_arm")
+    ob = bpy.data.objects.new(arm.name, arm)
+    scene.objects.link(ob)
+    scene.objects.active = ob
+
+    bpy.ops.object.mode_set(mode='EDIT')
+    root = arm.edit_bones.new("root")
+    root.head, root.tail = (0.0, 0.0, 0.0), (0.0, 0.0, 1.0)
+    child = arm.edit_bones.new("child")
+    child.head, child.tail = (0.0, 0.0, 1.0), (0.0, 1.0, 2.0)
+    child.parent = root
+    tip = arm.edit_bones.new("tip")
+    tip.head, tip.tail = (0.5, 1.0, 2.0), (1.0, 1.0, 3.0)
+    tip.parent = child
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    ob.animation_data_create()
+    ob.animation_data.action = bpy.data.actions.new("psk_arrays_action")
+    for frame in range(1, frames + 1):
+        for pose_bone in ob.pose.bones:
+            pose_bone.rotation_mode = 'QUATERNION'
+            pose_bone.location = Vector([rng.uniform(-1.0, 1.0) for _ in range(3)])
+            axis = Vector([rng.uniform(-1.0, 1.0) for _ in range(3)]).normalized()
+            pose_bone.rotation_quaternion = Quaternion(axis, rng.uniform(-3.0, 3.0))
+            pose_bone.keyframe_insert("location", frame=frame)
+            pose_bone.keyframe_insert("rotation_quaternion", frame=frame)
+    return ob
+
+
+def action_keys(ob):
+    data = psk.PSAFile()
+    for bone in ob.data.bones:
+        data.StoreBone(psk.make_namedbonebinary(bone.name, 0, 0, psk.FQuat(), Vector(), 1))
+    psk.parse_animation(ob, list(ob.data.bones), [ob.animation_data.action], data)
+
+    if data.RawKeys.Arrays:
+        keys = numpy.concatenate(data.RawKeys.Arrays)
+        return numpy.concatenate((keys['Position'], keys['Orientation'], keys['Time'][:, None]), axis=1)
+    return numpy.array([(k.Position.X, k.Position.Y, k.Position.Z,
+                         k.Orientation.X, k.Orientation.Y, k.Orientation.Z, k.Orientation.W,
+                         k.Time) for k in data.RawKeys.Data])
+
+
+def check_action(seed):
+    ob = armature_object(seed)
+
+    psk.numpy = None
+    reference = action_keys(ob)
+    psk.numpy = numpy
+    result = action_keys(ob)
+
+    assert reference.shape == result.shape, "different key count"
+    # quaternions with opposite signs are the same rotation
+    same_sign = (reference[:, 3:7] * result[:, 3:7]).sum(axis=1) >= 0.0
+    result[~same_sign, 3:7] *= -1.0
+    error = abs(reference - result).max()
+    assert error < 1e-4, "keys differ by %g" % error
+
+    print("action seed %d: %d keys, max difference %g, OK" % (seed, len(result), error))
+
+    action = ob.animation_data.action
+    arm = ob.data
+    bpy.data.objects.remove(ob, do_unlink=True)
+    bpy.data.armatures.remove(arm, do_unlink=True)
+    bpy.data.actions.remove(action, do_unlink=True)
+
+
+def main():
+    if numpy is None:
+        print("numpy is not available, nothing to compare")
+        return
+
+    psk.register()
+    try:
+        for seed in range(4):
+            check_unique_rows(seed)
+            check_mesh(seed, use_smoothing_groups=False)
+            check_mesh(seed, use_smoothing_groups=True)
+        for seed in range(2):
+            check_action(seed)
+    finally:
+        psk.numpy = numpy
+        psk.unregister()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Compare the smoothing groups of the PSK export (numpy and pure Python
+# paths of smooth_group_ids) with the recursive parse_smooth_groups,
+# on random meshes of triangles and quads with random sharp edges:
+#
+#   blender -b --factory-startup --python tests/io_export_unreal_psk_psa_smooth_groups.py
+
+import os
+import random
+import sys
+
+import bmesh
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io_export_unreal_psk_psa as psk
+
+
+def random_mesh(seed, size=16):
+    rng = random.Random(seed)
+
+    bm = bmesh.new()
+    bmesh.ops.create_grid(bm, x_segments=size, y_segments=size, size=1.0)
+    bmesh.ops.triangulate(bm, faces=[f for f in bm.faces if rng.random() < 0.3])
+    for edge in bm.edges:
+        edge.smooth = rng.random() > 0.15
+
+    me = bpy.data.meshes.new("smooth_groups_%d" % seed)
+    bm.to_mesh(me)
+    bm.free()
+    me.update(calc_tessface=True)
+    return me
+
+
+def check(mesh, reference_groups):
+    """
+    Same partition of the faces as the reference, and groups meeting at a
+    sharp edge never get the same smoothing group bit.
+    """
+    reference = [0] * len(mesh.tessfaces)
+    for group_i, group in enumerate(reference_groups):
+        for face in group.faces:
+            reference[face.index] = group_i
+
+    face_groups, group_pairs = psk.smooth_group_components(mesh)
+    face_groups = list(face_groups)
+    assert len(set(face_groups)) == len(reference_groups), "different group count"
+    assert len(set(zip(reference, face_groups))) == len(reference_groups), "different grouping"
+
+    face_ids = psk.smooth_group_ids(mesh)
+    for group in reference_groups:
+        face_id = face_ids[group.faces[0].index]
+        for face in group.neighboring_faces:
+            if not group.contains_face(face):
+                assert face_id != face_ids[face.index], "neighbors share a smoothing group bit"
+
+    return face_ids
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    numpy = psk.numpy
+
+    for seed in range(8):
+        me = random_mesh(seed)
+
+        reference_groups = psk.parse_smooth_groups(me)
+
+        psk.numpy = None
+        ids_pure = check(me, reference_groups)
+        psk.numpy = numpy
+
+        if numpy is not None:
+            ids_numpy = check(me, reference_groups)
+            assert ids_numpy == ids_pure, "numpy and pure Python paths differ"
+
+        print("seed %d: %d faces, %d groups, OK" %
+              (seed, len(me.tessfaces), len(reference_groups)))
+        bpy.data.meshes.remove(me, do_unlink=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Time the array based line merger against _LineMerger on a shuffled grid of
+# LINE entities and check that both give the same polylines.
+# Doesn't need Blender, only numpy:
+#
+#   python tests/io_import_dxf_line_merger_benchmark.py [grid size]
+
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "io_import_dxf"))
+
+from dxfimport.line_merger import _LineMerger, _array_line_merger
+
+_Line = namedtuple("_Line", "start end")
+
+
+def grid_lines(size, seed=0):
+    """Horizontal and vertical lines of a size x size grid, some doubled or reversed."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(size):
+        for j in range(size):
+            lines.append(_Line((i * .1, j * .1, 0.), ((i + 1) * .1, j * .1, 0.)))
+            lines.append(_Line((i * .1, j * .1, 0.), (i * .1, (j + 1) * .1, 0.)))
+    lines.extend(_Line(line.end, line.start) for line in rng.sample(lines, len(lines) // 10))
+    lines.append(_Line((0., 0., 0.), (0., 0., 0.)))
+    rng.shuffle(lines)
+    return lines
+
+
+def chain_lines(count, seed=0):
+    lines = [_Line((i * .5, 0., 0.), ((i + 1) * .5, 0., 0.)) for i in range(count)]
+    random.Random(seed).shuffle(lines)
+    return lines
+
+
+def compare(name, lines):
+    t = time.perf_counter()
+    reference = _LineMerger(lines, 6).polylines
+    t_reference = time.perf_counter() - t
+
+    t = time.perf_counter()
+    result = _array_line_merger(lines, 6)
+    t_result = time.perf_counter() - t
+
+    print("%s: %d lines -> %d polylines, _LineMerger %.3fs, _array_line_merger %.3fs" %
+          (name, len(lines), len(reference), t_reference, t_result))
+    assert result == reference, "%s: different polylines" % name
+
+
+def main(size=300):
+    size = int(size)
+    compare("grid", grid_lines(size))
+    compare("chain", chain_lines(size * size))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
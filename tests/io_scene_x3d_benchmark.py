@@ -0,0 +1,90 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Time the list and array based IndexedFaceSet importers of io_scene_x3d
+# on a generated grid:
+#
+#   blender -b --factory-startup --python tests/io_scene_x3d_benchmark.py -- /tmp/grid.wrl 1500
+
+import os
+import sys
+
+import bpy
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from io_scene_x3d.import_x3d import (
+        vrml_parse,
+        importMesh_IndexedFaceSet,
+        importMesh_IndexedFaceSetArrays,
+        )
+
+
+def benchmark(filepath, size=1500):
+    """
+    Write a size x size grid of colored, textured quads as a single
+    IndexedFaceSet (2.25 million faces by default) to filepath, then time
+    the list and array based importers on it.
+    """
+    import time
+    size = int(size)
+    n = size + 1
+
+    t = time.time()
+    x, y = numpy.meshgrid(numpy.arange(n), numpy.arange(n))
+    points = numpy.column_stack((x.ravel(), y.ravel(), numpy.zeros(n * n))) / size
+    v = (numpy.arange(size)[:, None] * n + numpy.arange(size)).ravel()
+    faces = numpy.column_stack((v, v + 1, v + n + 1, v + n, numpy.full(len(v), -1)))
+    colors = numpy.random.random((len(v), 3))
+
+    with open(filepath, 'w', encoding='utf-8') as file:
+        file.write("#VRML V2.0 utf8\nShape {\n"
+                   " appearance Appearance { texture ImageTexture { url \"grid.png\" } }\n"
+                   " geometry IndexedFaceSet {\n  coord Coordinate { point [\n")
+        numpy.savetxt(file, points, fmt="%.6g", delimiter=" ", newline=",\n")
+        file.write("  ] }\n  coordIndex [\n")
+        numpy.savetxt(file, faces, fmt="%d", delimiter=" ")
+        file.write("  ]\n  colorPerVertex FALSE\n  color Color { color [\n")
+        numpy.savetxt(file, colors, fmt="%.4g", delimiter=" ", newline=",\n")
+        file.write("  ] }\n  texCoord TextureCoordinate { point [\n")
+        numpy.savetxt(file, points[:, :2], fmt="%.6g", delimiter=" ", newline=",\n")
+        file.write("  ] }\n  texCoordIndex [\n")
+        numpy.savetxt(file, faces, fmt="%d", delimiter=" ")
+        file.write("  ]\n }\n}\n")
+    print("%d faces written in %.2fs" % (len(faces), time.time() - t))
+
+    t = time.time()
+    root, msg = vrml_parse(filepath)
+    geom = root.children[0].getChildBySpec('IndexedFaceSet')
+    print("Parsed in %.2fs" % (time.time() - t))
+
+    bpyima = bpy.data.images.new("grid.png", 4, 4)
+    for importer in (importMesh_IndexedFaceSet, importMesh_IndexedFaceSetArrays):
+        geom.getChildBySpec('Coordinate').parsed = None
+        t = time.time()
+        bpymesh = importer(geom, [], bpyima)
+        print("%s: %.2fs" % (importer.__name__, time.time() - t))
+        bpy.data.meshes.remove(bpymesh, do_unlink=True)
+    bpy.data.images.remove(bpyima, do_unlink=True)
+
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[sys.argv.index("--") + 1:])
@@ -0,0 +1,138 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Check the bevels of mesh_inset (Offset.Build through
+# model.BevelPolyAreaInModel) on generated polygons against the output of
+# the original recursive, full scan Build, stored in
+# mesh_inset_offset_baseline.json. Doesn't need Blender:
+#
+#   python tests/mesh_inset_offset.py
+#
+# The baseline was written by running this script with --write on the
+# mesh_inset modules of the baseline commit (418d33a), given as the
+# directory to load them from:
+#
+#   python tests/mesh_inset_offset.py --write /path/to/old/mesh_inset
+
+import hashlib
+import importlib.machinery
+import importlib.util
+import json
+import math
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(TESTS_DIR, "mesh_inset_offset_baseline.json")
+
+
+def load_mesh_inset(path):
+    """Import the geometry modules of mesh_inset from path, without its
+    __init__ (which registers the Blender operator)."""
+    spec = importlib.machinery.ModuleSpec("mesh_inset", None, is_package=True)
+    package = importlib.util.module_from_spec(spec)
+    package.__path__ = [path]
+    sys.modules["mesh_inset"] = package
+    from mesh_inset import geom, model
+    return geom, model
+
+
+def star(n, r0, r1, phase=0.0, cx=0.0, cy=0.0):
+    return [(cx + (r0 if i % 2 == 0 else r1) * math.cos(phase + math.pi * i / n),
+             cy + (r0 if i % 2 == 0 else r1) * math.sin(phase + math.pi * i / n),
+             0.0) for i in range(2 * n)]
+
+
+def ngon(n, r, cx=0.0, cy=0.0):
+    return [(cx + r * math.cos(2.0 * math.pi * i / n),
+             cy + r * math.sin(2.0 * math.pi * i / n), 0.0) for i in range(n)]
+
+
+def comb(n, width=1.0, depth=4.0):
+    # teeth along the bottom, CCW
+    coords = []
+    for i in range(n):
+        x = i * 2.0 * width
+        coords.extend(((x, 0.0, 0.0), (x + width, 0.0, 0.0),
+                       (x + width, depth, 0.0), (x + 2.0 * width, depth, 0.0)))
+    coords.extend(((2.0 * n * width, depth + 2.0, 0.0), (0.0, depth + 2.0, 0.0)))
+    return coords
+
+
+# name, outer polygon (CCW), holes (CW), amount in percent of the maximum
+CASES = [
+    ("square", ngon(4, 1.0), [], 50.0),
+    ("ngon_12", ngon(12, 2.0), [], 100.0),
+    ("star_5", star(5, 2.0, 0.8), [], 100.0),
+    ("star_9_half", star(9, 3.0, 1.0, 0.1), [], 50.0),
+    ("star_40", star(40, 5.0, 3.5, 0.05), [], 100.0),
+    ("star_40_hole", star(40, 6.0, 4.5), [ngon(24, 1.5)[::-1]], 100.0),
+    ("comb_6", comb(6), [], 100.0),
+    ("comb_20", comb(20, 1.0, 6.0), [], 80.0),
+    ("ngon_90_holes", ngon(90, 10.0),
+     [ngon(16, 1.5, -4.0, 0.0)[::-1], ngon(16, 1.5, 4.0, 0.5)[::-1]], 100.0),
+]
+
+
+def bevel(geom, model, outer, holes, amount):
+    """Points and faces of the bevel of the polygon with holes."""
+    mdl = geom.Model()
+    pa = geom.PolyArea(mdl.points)
+    pa.poly = [mdl.points.AddPoint(p) for p in outer]
+    pa.holes = [[mdl.points.AddPoint(p) for p in hole] for hole in holes]
+    model.BevelPolyAreaInModel(mdl, pa, amount, math.radians(30.0), False, True)
+    return mdl.points.pos, mdl.faces
+
+
+def summary(points, faces):
+    """Counts and a digest of the coordinates (to 1e-6) and faces."""
+    data = repr(([tuple(round(c, 6) + 0.0 for c in p) for p in points], faces))
+    return {"points": len(points), "faces": len(faces),
+            "digest": hashlib.sha1(data.encode("ascii")).hexdigest()}
+
+
+def main(argv):
+    write = "--write" in argv
+    paths = [arg for arg in argv if arg != "--write"]
+    path = paths[0] if paths else os.path.join(os.path.dirname(TESTS_DIR), "mesh_inset")
+    geom, model = load_mesh_inset(os.path.abspath(path))
+
+    results = {}
+    for name, outer, holes, amount in CASES:
+        results[name] = summary(*bevel(geom, model, outer, holes, amount))
+
+    if write:
+        with open(BASELINE, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print("wrote %d cases to %s" % (len(results), BASELINE))
+        return
+
+    with open(BASELINE) as file:
+        baseline = json.load(file)
+    for name, _outer, _holes, _amount in CASES:
+        result = results[name]
+        assert result == baseline[name], "%s differs from the baseline: %r != %r" % \
+            (name, result, baseline[name])
+        print("%s: %d points, %d faces, OK" % (name, result["points"], result["faces"]))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,163 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# Time the batched numpy kernels of LoopTools against the per-loop code
+# they replace, and check that both give the same results:
+#
+#   blender -b --factory-startup --python tests/mesh_looptools_benchmark.py -- 50 200
+
+import math
+import os
+import random
+import sys
+import time
+
+import bmesh
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mesh_looptools as looptools
+
+
+def make_loops(bm, count, size, seed=0):
+    """
+    Noisy circles of size vertices, every other loop is circular
+    (first knot repeated at the end).
+    """
+    rng = random.Random(seed)
+    loops = []
+    for i in range(count):
+        knots = []
+        for j in range(size):
+            angle = 2.0 * math.pi * j / size
+            radius = 1.0 + 0.1 * rng.random()
+            bm.verts.new((radius * math.cos(angle) + i,
+                                 radius * math.sin(angle),
+                                 0.1 * rng.random()))
+            knots.append(len(bm.verts) - 1)
+        if i % 2:
+            knots.append(knots[0])
+        loops.append(knots)
+    bm.verts.index_update()
+    bm.verts.ensure_lookup_table()
+    return loops
+
+
+def timed(func, *args):
+    best = None
+    for i in range(3):
+        t = time.time()
+        result = func(*args)
+        t = time.time() - t
+        best = t if best is None else min(best, t)
+    return result, best
+
+
+def report(name, t_loop, t_batch, error):
+    print("%-24s per loop %8.4fs  batched %8.4fs  (%5.1fx)  max difference %.3g" %
+          (name, t_loop, t_batch, t_loop / max(t_batch, 1e-9), error))
+    assert error < 1e-5, name
+
+
+def with_numpy(use_numpy, func, *args):
+    numpy = looptools.numpy
+    if not use_numpy:
+        looptools.numpy = None
+    try:
+        return func(*args)
+    finally:
+        looptools.numpy = numpy
+
+
+def benchmark_splines(bm, loops, all_tknots):
+    # cubic_splines_extend extends the knot parameters of circular loops,
+    # always pass copies and return them with the splines
+    def solve(use_numpy):
+        tknots = [tknots[:] for tknots in all_tknots]
+        splines = with_numpy(use_numpy, looptools.calculate_splines_batch, 'cubic', bm,
+                             tknots, loops)
+        return splines, tknots
+
+    (reference, tknots), t_loop = timed(solve, False)
+    (result, tknots), t_batch = timed(solve, True)
+
+    error = max(abs(a - b)
+                for splines_a, splines_b in zip(reference, result)
+                for spline_a, spline_b in zip(splines_a, splines_b)
+                for axis_a, axis_b in zip(spline_a, spline_b)
+                for a, b in zip(axis_a, axis_b))
+    report("cubic_splines_solve", t_loop, t_batch, error)
+    return result, tknots
+
+
+def benchmark_evaluate(bm, loops, all_tknots, all_tpoints, all_splines):
+    def evaluate(use_numpy):
+        return with_numpy(use_numpy, looptools.relax_calculate_verts, bm, 'cubic',
+                          all_tknots, loops, all_tpoints, loops, all_splines)
+
+    reference, t_loop = timed(evaluate, False)
+    result, t_batch = timed(evaluate, True)
+
+    reference = dict(reference)
+    error = max((reference[p] - loc).length for p, loc in result)
+    report("splines_evaluate", t_loop, t_batch, error)
+
+
+def benchmark_circles(count, size, seed=0):
+    rng = random.Random(seed)
+    all_locs_2d = []
+    for i in range(count):
+        x0, y0, r = rng.uniform(-5, 5), rng.uniform(-5, 5), rng.uniform(0.5, 3)
+        all_locs_2d.append([(x0 + r * math.cos(a) + 0.05 * rng.random(),
+                             y0 + r * math.sin(a) + 0.05 * rng.random())
+                            for a in (2.0 * math.pi * j / size for j in range(size))])
+
+    reference, t_loop = timed(with_numpy, False, looptools.circle_calculate_best_fits,
+                              all_locs_2d)
+    result, t_batch = timed(with_numpy, True, looptools.circle_calculate_best_fits,
+                            all_locs_2d)
+
+    error = max(abs(a - b) for fit_a, fit_b in zip(reference, result)
+                for a, b in zip(fit_a, fit_b))
+    report("circle_calculate_best_fits", t_loop, t_batch, error)
+
+
+def main(count=50, size=200):
+    count = int(count)
+    size = int(size)
+
+    bm = bmesh.new()
+    loops = make_loops(bm, count, size)
+    all_tknots = []
+    all_tpoints = []
+    for knots in loops:
+        tknots, tpoints = looptools.space_calculate_t(bm, knots)
+        all_tknots.append(tknots)
+        all_tpoints.append(tpoints)
+
+    splines, all_tknots = benchmark_splines(bm, loops, all_tknots)
+    benchmark_evaluate(bm, loops, all_tknots, all_tpoints, splines)
+    benchmark_circles(count, size)
+    bm.free()
+
+
+if __name__ == "__main__":
+    argv = sys.argv
+    main(*(argv[argv.index("--") + 1:] if "--" in argv else ()))
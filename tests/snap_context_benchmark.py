@@ -0,0 +1,162 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 3
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Query latency of the snap context backends on a grid of about 1M polygons:
+#
+#   blender -b --factory-startup --python tests/snap_context_benchmark.py -- 1000
+#
+# In background mode only `SnapContextCPU` runs, on a synthetic perspective
+# view. Run without `-b` to also time the OpenGL `SnapContext` in the first
+# 3D view of the screen and compare the elements both of them snap to.
+
+import math
+import os
+import random
+import sys
+import time
+
+import bpy
+import numpy as np
+from mathutils import Matrix, Vector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+
+from snap_context import SnapContext, SnapContextCPU
+
+
+class _Region:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+
+class _RegionView3D:
+    is_perspective = True
+    use_clip_planes = False
+    clip_planes = ()
+
+    def __init__(self, view_matrix, window_matrix):
+        self.view_matrix = view_matrix
+        self.perspective_matrix = window_matrix * view_matrix
+
+
+class _SpaceView3D:
+    def __init__(self, region_3d, clip_start, clip_end):
+        self.region_3d = region_3d
+        self.clip_start = clip_start
+        self.clip_end = clip_end
+
+
+def synthetic_view(width=1920, height=1080, clip_start=0.1, clip_end=100.0):
+    """
+    Region and space looking down at the grid from an angle,
+    enough of them for the snap context.
+    """
+    view_matrix = (Matrix.Rotation(math.radians(-30.0), 4, 'X') *
+                   Matrix.Translation((0.0, 0.0, -8.0)))
+
+    f = 1.0 / math.tan(math.radians(50.0) / 2.0)
+    near, far = clip_start, clip_end
+    window_matrix = Matrix((
+        (f * height / width, 0.0, 0.0, 0.0),
+        (0.0, f, 0.0, 0.0),
+        (0.0, 0.0, (far + near) / (near - far), 2.0 * far * near / (near - far)),
+        (0.0, 0.0, -1.0, 0.0)))
+
+    rv3d = _RegionView3D(view_matrix, window_matrix)
+    return _Region(width, height), _SpaceView3D(rv3d, clip_start, clip_end)
+
+
+def grid_object(size):
+    """Object with a size x size grid of quads, 10 units wide."""
+    n = size + 1
+    x, y = np.meshgrid(np.linspace(-5.0, 5.0, n), np.linspace(-5.0, 5.0, n))
+    co = np.column_stack((x.ravel(), y.ravel(), 0.2 * np.sin(x.ravel() * y.ravel())))
+    v = (np.arange(size)[:, None] * n + np.arange(size)).ravel()
+    loops = np.column_stack((v, v + 1, v + n + 1, v + n))
+
+    me = bpy.data.meshes.new("snap_grid")
+    me.vertices.add(len(co))
+    me.vertices.foreach_set("co", co.ravel())
+    me.loops.add(loops.size)
+    me.loops.foreach_set("vertex_index", loops.ravel())
+    me.polygons.add(len(loops))
+    me.polygons.foreach_set("loop_start", np.arange(0, loops.size, 4))
+    me.polygons.foreach_set("loop_total", np.full(len(loops), 4))
+    me.update(calc_edges=True)
+
+    obj = bpy.data.objects.new("snap_grid", me)
+    bpy.context.scene.objects.link(obj)
+    bpy.context.scene.update()
+    return obj
+
+
+def benchmark(sctx, obj, queries, snap_mode):
+    sctx.set_snap_mode(*snap_mode)
+    sctx.add_obj(obj, obj.matrix_world)
+
+    t = time.time()
+    sctx.snap_get(queries[0])
+    t_first = time.time() - t
+
+    results = []
+    t = time.time()
+    for mval in queries:
+        snap_obj, loc, elem = sctx.snap_get(mval)
+        results.append(None if elem is None else tuple(elem))
+    t_query = (time.time() - t) / len(queries)
+
+    return t_first, t_query, results
+
+
+def main(size=1000, query_count=200):
+    size = int(size)
+    query_count = int(query_count)
+
+    obj = grid_object(size)
+    print("%d polygons" % len(obj.data.polygons))
+
+    backends = [("CPU", SnapContextCPU)]
+    if bpy.app.background:
+        region, space = synthetic_view()
+    else:
+        area = next(area for area in bpy.context.screen.areas if area.type == 'VIEW_3D')
+        region = next(region for region in area.regions if region.type == 'WINDOW')
+        space = area.spaces.active
+        backends.append(("GPU", SnapContext))
+
+    rng = random.Random(0)
+    queries = [Vector((rng.uniform(0, region.width), rng.uniform(0, region.height)))
+               for i in range(query_count)]
+
+    for snap_mode in ((True, True, True), (True, True, False), (False, False, True)):
+        results = {}
+        for name, backend in backends:
+            sctx = backend(region, space)
+            t_first, t_query, results[name] = benchmark(sctx, obj, queries, snap_mode)
+            sctx.free()
+            print("%s vert/edge/face %s: first snap %.3fs (builds the trees), %.2fms per snap" %
+                  (name, snap_mode, t_first, t_query * 1000.0))
+
+        if len(results) > 1:
+            same = sum(a == b for a, b in zip(results["CPU"], results["GPU"]))
+            print("  same element in %d of %d snaps" % (same, query_count))
+
+
+if __name__ == "__main__":
+    argv = sys.argv
+    main(*(argv[argv.index("--") + 1:] if "--" in argv else ()))